@@ -1,4 +1,37 @@
-from src import app
+import sys
+
+from src.args import (
+    BENCHMARK_COMMAND,
+    CONVERT_COMMAND,
+    GENERATE_COMMAND,
+    REPORT_COMMAND,
+    STORE_COMMAND,
+)
 
 if __name__ == "__main__":
-    app.run()
+    # Commands are imported on use, so the ones without a dashboard never import Dash
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == CONVERT_COMMAND:
+        from src import convert
+
+        convert.run()
+    elif command == REPORT_COMMAND:
+        from src import report
+
+        report.run()
+    elif command == GENERATE_COMMAND:
+        from src import generate
+
+        generate.run()
+    elif command == BENCHMARK_COMMAND:
+        from src import benchmark
+
+        benchmark.run()
+    elif command == STORE_COMMAND:
+        from src import store
+
+        store.run()
+    else:
+        from src import app
+
+        app.run()
@@ -1,22 +1,75 @@
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from threading import Thread
+
 import pandas as pd
+import pyarrow as pa
+import pysubgroup as ps
 from dash import Dash
+from flask import Response
 from pandas import DataFrame
 
-from src.args import get_args
+from src.args import Args, get_args
+from src.grouping.cache import (
+    fingerprint,
+    load_search_space,
+    load_subgroups,
+    save_search_space,
+    save_subgroups,
+)
 from src.grouping.clean import remove_redundant_subgroups
-from src.grouping.discovery import subgroup_discovery
+from src.grouping.comparison import add_model_statistics
+from src.grouping.discovery import (
+    create_sampled_search_space,
+    subgroup_discovery,
+    subgroup_discovery_all_classes,
+)
+from src.grouping.progress import SearchProgress
+from src.grouping.rescoring import ranking_shift, rescore_subgroups
+from src.layout.components.graph import FigureCache, class_rows
+from src.layout.components.subgroups.geometry import feature_axes
 from src.layout.layout import create_layout
+from src.loading import (
+    memory_report,
+    model_names,
+    read_dataset,
+    read_errors,
+    select_classes,
+)
+from src.metrics import (
+    CONTENT_TYPE,
+    STAGE,
+    enable_profiling,
+    metrics_text,
+    profiled,
+    record,
+    register_counter,
+    timed,
+)
+from src.state import DiscoveryState, ServedFrames, publish
+from src.watch import signatures, watch_files
 
 
-def get_dfs(dataset_path: str, errors_path: str) -> None | tuple[DataFrame, DataFrame]:
+def get_dfs(
+    dataset_path: Path, errors_path: Path, target_column: str, current_class: str
+) -> None | tuple[DataFrame, DataFrame]:
     try:
-        dataset_df = pd.read_csv(dataset_path)
-        errors_df = pd.read_csv(errors_path)
+        dataset_df = read_dataset(dataset_path, target_column)
+        # Errors of classes absent from the dataset are never used
+        classes = (
+            {*dataset_df[target_column].unique(), current_class}
+            if target_column in dataset_df.columns
+            else None
+        )
+        errors_df = read_errors(errors_path, classes)
     except FileNotFoundError as e:
         print(f"File '{e}' not found")
         return None
-    except pd.errors.ParserError:
-        print("Error parsing input files. Make sure they are CSVs")
+    except (pd.errors.ParserError, pa.ArrowInvalid):
+        print(
+            "Error parsing input files. Make sure they are CSV, Parquet or Arrow files"
+        )
         return None
     except Exception as e:
         print(f"Unexpected error: {e}")
@@ -25,43 +78,231 @@ def get_dfs(dataset_path: str, errors_path: str) -> None | tuple[DataFrame, Data
     return (dataset_df, errors_df)
 
 
-def run() -> None:
-    dataset_file_path, errors_file_path, target_column, current_class, size = get_args()
-    dfs = get_dfs(dataset_file_path, errors_file_path)
-    if dfs is None:
-        return
-    dataset_df, errors_df = dfs
+# Why the errors of a model can't be compared with the others, if they can't
+def errors_mismatch(
+    path: Path, errors_df: DataFrame, classes: Iterable[str], n_rows: int
+) -> str | None:
+    missing = set(classes) - set(errors_df.columns)
+    if missing:
+        return f"'{path}' is missing the errors of {', '.join(sorted(missing))}"
+    if len(errors_df) != n_rows:
+        return f"'{path}' has {len(errors_df)} rows, but the dataset has {n_rows}"
+    return None
 
-    if target_column not in dataset_df.columns:
-        print(f"Missing target column '{target_column}' in dataset")
-        return
 
-    if current_class not in errors_df.columns:
-        print(f"Missing current column '{current_class}' in errors dataframe")
-        return
+# Errors of every compared model, by name, starting with the one the subgroups are
+# discovered on. Only the classes of the first model are read
+def get_models(
+    errors_paths: list[Path], dataset_df: DataFrame, errors_df: DataFrame
+) -> dict[str, DataFrame] | None:
+    names = model_names(errors_paths)
+    errors_by_model = {names[0]: errors_df}
+    for name, path in zip(names[1:], errors_paths[1:], strict=True):
+        try:
+            model_df = read_errors(path, set(errors_df.columns))
+        except FileNotFoundError as e:
+            print(f"File '{e}' not found")
+            return None
+        except (pd.errors.ParserError, pa.ArrowInvalid):
+            print(
+                f"Error parsing '{path}'. Make sure it's a CSV, Parquet or Arrow file"
+            )
+            return None
+
+        mismatch = errors_mismatch(path, model_df, errors_df.columns, len(dataset_df))
+        if mismatch is not None:
+            print(mismatch)
+            return None
+        errors_by_model[name] = model_df[errors_df.columns]
+    return errors_by_model
+
+
+# Selectors searched for every class. They only depend on the dataset and the binning,
+# so they're cached apart from the subgroups, and created once across classes and runs
+def get_search_space(
+    args: Args, dataset_df: DataFrame, errors_df: DataFrame
+) -> list[ps.SelectorBase]:
+    path = None
+    if args.use_cache:
+        path = args.cache_dir / (
+            "selectors-"
+            + fingerprint(
+                [args.data],
+                target=args.target,
+                bins=args.bins,
+                binning=args.binning,
+                sample=args.sample or 0,
+            )
+            + ".json"
+        )
+        search_space = load_search_space(path)
+        if search_space is not None:
+            return search_space
+
+    with timed("binning"):
+        search_space = create_sampled_search_space(
+            dataset_df,
+            errors_df,
+            args.target,
+            args.sample,
+            bins=args.bins,
+            binning=args.binning,
+        )
+    if path is not None:
+        save_search_space(search_space, path)
+    return search_space
+
+
+# Runs the search of every class, handing the subgroups to the dashboard as they come:
+# cached entries right away, then the partial results of the running searches, and
+# finally the complete sets, which are also cached
+def discover_subgroups(
+    args: Args,
+    dataset_df: DataFrame,
+    errors_by_model: dict[str, DataFrame],
+    state: DiscoveryState,
+    *,
+    classes: list[str] | None = None,
+) -> None:
+    deadline = None if args.time_budget is None else time.time() + args.time_budget
+    errors_df = next(iter(errors_by_model.values()))
+
+    publishing = 0.0
+
+    # Results are deduplicated and published from this thread while the search goes on,
+    # so the time this takes is left out of the discovery stage
+    def publish_deduplicated(current_class: str, subgroups_df: DataFrame) -> DataFrame:
+        nonlocal publishing
+        start = time.perf_counter()
+        with timed("dedup"):
+            subgroups_df = remove_redundant_subgroups(
+                subgroups_df, args.dedup_threshold
+            )
+        publish(
+            state,
+            current_class,
+            prepare_model_subgroups(subgroups_df, errors_by_model, current_class),
+        )
+        publishing += time.perf_counter() - start
+        return subgroups_df
+
+    def publish_final(current_class: str, subgroups_df: DataFrame) -> None:
+        subgroups_df = publish_deduplicated(current_class, subgroups_df)
+        # Results cut short by the time budget would be served as complete ones later
+        if deadline is not None and time.time() >= deadline:
+            state.interrupted.add(current_class)
+        elif current_class in cache_paths:
+            save_subgroups(subgroups_df, cache_paths[current_class])
+
+    cache_paths = {}
+    missing = []
+    for current_class in state.classes if classes is None else classes:
+        if args.use_cache:
+            cache_paths[current_class] = args.cache_dir / (
+                fingerprint(
+                    # Only the first model's errors are searched
+                    [args.data, args.errors[0]],
+                    target=args.target,
+                    current_class=current_class,
+                    size=args.size,
+                    dedup_threshold=args.dedup_threshold,
+                    engine=args.engine,
+                    sample=args.sample or 0,
+                    bins=args.bins,
+                    binning=args.binning,
+                )
+                + ".npz"
+            )
+            with timed("cache"):
+                cached_df = load_subgroups(cache_paths[current_class])
+            if cached_df is not None:
+                print(f"Loaded subgroups from cache '{cache_paths[current_class]}'")
+                publish(
+                    state,
+                    current_class,
+                    prepare_model_subgroups(cached_df, errors_by_model, current_class),
+                )
+                continue
+        missing.append(current_class)
 
-    if current_class not in dataset_df[target_column].unique():
-        print(f"Current class '{current_class}' doesn't appear in dataset")
+    if len(missing) == 0:
         return
+    search_space = get_search_space(args, dataset_df, errors_df)
+    start = time.perf_counter()
+    if len(missing) == 1:
+        subgroups_df = subgroup_discovery(
+            dataset_df,
+            errors_df,
+            args.size,
+            args.target,
+            missing[0],
+            engine=args.engine,
+            sample_size=args.sample,
+            search_space=search_space,
+            progress=SearchProgress(
+                on_progress=lambda df: publish_deduplicated(missing[0], df),
+                deadline=deadline,
+            ),
+        )
+        record(STAGE, "discovery", time.perf_counter() - start - publishing)
+        publish_final(missing[0], subgroups_df)
+    else:
+        # The classes are searched in parallel, and published as each one is done
+        subgroup_discovery_all_classes(
+            dataset_df,
+            errors_df,
+            args.size,
+            args.target,
+            missing,
+            engine=args.engine,
+            sample_size=args.sample,
+            search_space=search_space,
+            deadline=deadline,
+            on_result=publish_final,
+        )
+        record(STAGE, "discovery", time.perf_counter() - start - publishing)
 
-    features = dataset_df.columns.tolist()
-    features.remove(target_column)
-    dataset_with_errors_df = pd.concat([dataset_df, errors_df], axis=1)
-    subgroups_df = subgroup_discovery(
-        dataset_df, errors_df, size, target_column, current_class
-    )
-    subgroups_df = remove_redundant_subgroups(subgroups_df)
 
+def run_discovery(
+    args: Args,
+    dataset_df: DataFrame,
+    errors_by_model: dict[str, DataFrame],
+    state: DiscoveryState,
+    *,
+    classes: list[str] | None = None,
+) -> None:
+    classes = state.classes if classes is None else classes
+    try:
+        with profiled("discovery"):
+            discover_subgroups(
+                args, dataset_df, errors_by_model, state, classes=classes
+            )
+    finally:
+        state.done = True
+
+    if state.interrupted:
+        print("Time budget reached, showing the best subgroups found so far")
+
+    for class_name in classes:
+        if not state.subgroups_by_class.get(class_name, DataFrame()).empty:
+            continue
+        if class_name in state.interrupted:
+            print(f"Time budget reached before any subgroup of class '{class_name}'")
+        else:
+            print(f"No subgroups have been found for class '{class_name}'")
+
+
+def prepare_subgroups(subgroups_df: DataFrame) -> DataFrame:
     # Remove subgroups with only group, so we don't have to worry about visualization
-    subgroups_df = subgroups_df[
+    # An empty mask is of objects, which [] would take for a list of columns
+    subgroups_df = subgroups_df.loc[
         subgroups_df["subgroup"].apply(lambda x: len(x.selectors) > 1)
     ]
 
     subgroups_df = subgroups_df.reset_index(drop=True)
 
     if subgroups_df.empty:
-        print("No subgroups have been found")
-        return
+        return subgroups_df
 
     # adding columns for axis of each rule
     subgroups_df["x_column"] = subgroups_df["subgroup"].apply(
@@ -71,6 +312,212 @@ def run() -> None:
         lambda x: x.selectors[1].attribute_name
     )
 
+    return subgroups_df
+
+
+def serve_frames(
+    dataset_df: DataFrame,
+    errors_by_model: dict[str, DataFrame],
+    target_column: str,
+    generation: int = 0,
+) -> ServedFrames:
+    # Every frame shares the dataset's columns, and keeps those of its errors, so this
+    # doesn't copy them. Unlike concat, the columns aren't consolidated into 2-D blocks,
+    # so memory-mapped ones stay mapped
+    return ServedFrames(
+        {
+            model: DataFrame({**dataset_df, **errors_df}, copy=False)
+            for model, errors_df in errors_by_model.items()
+        },
+        class_rows(dataset_df, target_column),
+        feature_axes(dataset_df, dataset_df.columns.drop(target_column).tolist()),
+        generation,
+    )
+
+
+# Subgroups as the dashboard shows them, with the statistics of every compared model
+def prepare_model_subgroups(
+    subgroups_df: DataFrame, errors_by_model: dict[str, DataFrame], current_class: str
+) -> DataFrame:
+    return add_model_statistics(
+        prepare_subgroups(subgroups_df), errors_by_model, current_class
+    )
+
+
+# The inputs read again after some of them changed on disk, or None when they can't be
+# read or no longer match the dashboard, which then keeps showing the old ones. The
+# dataset is only read when it changed, and must keep its columns, which the layout shows
+def reload_inputs(
+    args: Args,
+    dataset_df: DataFrame,
+    errors_by_model: dict[str, DataFrame],
+    *,
+    dataset_changed: bool,
+) -> tuple[DataFrame, dict[str, DataFrame]] | None:
+    classes = next(iter(errors_by_model.values())).columns
+    if dataset_changed:
+        dfs = get_dfs(args.data, args.errors[0], args.target, args.current_class)
+        if dfs is None:
+            return None
+        new_dataset_df, errors_df = dfs
+        if new_dataset_df.columns.tolist() != dataset_df.columns.tolist():
+            print("The columns of the dataset changed, restart to see the new ones")
+            return None
+    else:
+        new_dataset_df = dataset_df
+        try:
+            errors_df = read_errors(args.errors[0], set(classes))
+        except (OSError, pd.errors.ParserError, pa.ArrowInvalid) as e:
+            print(f"Error reading '{args.errors[0]}': {e}")
+            return None
+
+    mismatch = errors_mismatch(args.errors[0], errors_df, classes, len(new_dataset_df))
+    if mismatch is not None:
+        print(mismatch)
+        return None
+    errors_by_model = get_models(args.errors, new_dataset_df, errors_df[classes])
+    if errors_by_model is None:
+        return None
+    return new_dataset_df, errors_by_model
+
+
+# Brings the subgroups shown up to date with new inputs. When only errors changed, the
+# subgroups are rescored on their coverages, and a class is only searched again when its
+# ranking shifted by more than --watch-shift, or when it had no subgroups to rescore
+def refresh_subgroups(
+    args: Args,
+    dataset_df: DataFrame,
+    errors_by_model: dict[str, DataFrame],
+    state: DiscoveryState,
+    *,
+    dataset_changed: bool,
+) -> None:
+    errors_df = next(iter(errors_by_model.values()))
+    stale = []
+    for current_class in state.classes:
+        subgroups_df = state.subgroups_by_class.get(current_class)
+        if dataset_changed or subgroups_df is None or subgroups_df.empty:
+            stale.append(current_class)
+            continue
+
+        rescored_df = rescore_subgroups(
+            subgroups_df, errors_df[current_class].to_numpy(dtype=float)
+        )
+        shift = ranking_shift(subgroups_df["quality"], rescored_df["quality"])
+        if shift > args.watch_shift:
+            print(
+                f"Ranking of '{current_class}' shifted by {shift:.2f}, searching again"
+            )
+            stale.append(current_class)
+            continue
+        rescored_df = rescored_df.sort_values(
+            "quality", ascending=False, kind="stable"
+        ).reset_index(drop=True)
+        publish(
+            state,
+            current_class,
+            add_model_statistics(rescored_df, errors_by_model, current_class),
+        )
+
+    if stale:
+        state.done = False
+        state.interrupted.difference_update(stale)
+        run_discovery(args, dataset_df, errors_by_model, state, classes=stale)
+
+
+# Runs the discovery, then refreshes the dashboard whenever the dataset or errors change
+def watch_inputs(
+    args: Args,
+    dataset_df: DataFrame,
+    errors_by_model: dict[str, DataFrame],
+    state: DiscoveryState,
+) -> None:
+    # Taken before the discovery, so changes made while it runs aren't missed
+    seen = signatures([args.data, *args.errors])
+    run_discovery(args, dataset_df, errors_by_model, state)
+
+    for changed in watch_files(seen, args.watch_interval):
+        print(f"Reloading {', '.join(map(str, changed))}")
+        dataset_changed = args.data in changed
+        inputs = reload_inputs(
+            args, dataset_df, errors_by_model, dataset_changed=dataset_changed
+        )
+        if inputs is None:
+            continue
+        dataset_df, errors_by_model = inputs
+        with timed("refresh"):
+            # The plots show the new inputs before the subgroups found on them
+            state.frames = serve_frames(
+                dataset_df,
+                errors_by_model,
+                args.target,
+                generation=state.frames.generation + 1,
+            )
+            refresh_subgroups(
+                args,
+                dataset_df,
+                errors_by_model,
+                state,
+                dataset_changed=dataset_changed,
+            )
+
+
+# Everything the dashboard does before serving: loading the inputs, starting the
+# discovery thread and building the app
+def start_dashboard(args: Args) -> Dash | None:
+    target_column, current_class = args.target, args.current_class
+    with timed("load"):
+        dfs = get_dfs(args.data, args.errors[0], target_column, current_class)
+    if dfs is None:
+        return None
+    dataset_df, errors_df = dfs
+
+    if target_column not in dataset_df.columns:
+        print(f"Missing target column '{target_column}' in dataset")
+        return None
+
+    try:
+        classes = select_classes(dataset_df, errors_df, target_column, current_class)
+    except ValueError as e:
+        print(e)
+        return None
+
+    errors_by_model = get_models(args.errors, dataset_df, errors_df)
+    if errors_by_model is None:
+        return None
+    print(memory_report(dataset_df, errors_df))
+
+    # The dashboard starts right away, and shows the subgroups as they are found
+    state = DiscoveryState(classes, watching=args.watch)
+    Thread(
+        target=watch_inputs if args.watch else run_discovery,
+        args=(args, dataset_df, errors_by_model, state),
+        daemon=True,
+    ).start()
+
+    return create_dash_app(
+        dataset_df,
+        errors_by_model,
+        state,
+        target_column,
+        args.figure_cache_size,
+        clientside_threshold=args.clientside_threshold,
+    )
+
+
+def create_dash_app(  # noqa: PLR0913
+    dataset_df: DataFrame,
+    errors_by_model: dict[str, DataFrame],
+    state: DiscoveryState,
+    target_column: str,
+    figure_cache_size: int,
+    *,
+    clientside_threshold: bool = False,
+) -> Dash:
+    features = dataset_df.columns.tolist()
+    features.remove(target_column)
+    state.frames = serve_frames(dataset_df, errors_by_model, target_column)
+
     app = Dash(
         __name__,
         external_scripts=[{"src": "https://cdn.tailwindcss.com"}],
@@ -78,12 +525,36 @@ def run() -> None:
 
     app.title = "Heisenpy"  # TODO temporary name
 
-    app.layout = create_layout(
-        dataset_with_errors_df,
-        features,
-        subgroups_df,
-        target_column,
-        current_class,
+    figure_cache = FigureCache(figure_cache_size)
+    register_counter(
+        "figure_cache_hits",
+        "Subgroup plots served from the cache",
+        lambda: figure_cache.hits,
+    )
+    register_counter(
+        "figure_cache_misses",
+        "Subgroup plots rendered because they weren't cached",
+        lambda: figure_cache.misses,
+    )
+    app.server.route("/metrics")(
+        lambda: Response(metrics_text(), content_type=CONTENT_TYPE)
     )
 
-    app.run()
+    with timed("layout"):
+        app.layout = create_layout(
+            features,
+            state,
+            figure_cache,
+            clientside_threshold=clientside_threshold,
+        )
+
+    return app
+
+
+def run() -> None:
+    args = get_args()
+    enable_profiling(args.profile)
+    with profiled("startup"):
+        app = start_dashboard(args)
+    if app is not None:
+        app.run()
@@ -1,9 +1,107 @@
-from argparse import ArgumentParser
+import sys
+from argparse import ArgumentParser, Namespace
+from dataclasses import dataclass
 from pathlib import Path
 
+from src.grouping.binning import BINNINGS, DEFAULT_BINS
+from src.grouping.cache import DEFAULT_CACHE_DIR
+from src.grouping.discovery import ENGINES
+from src.loading import ALL_CLASSES, FORMATS
 
-def get_args() -> tuple[Path, Path, str, str, int]:
-    argparser = ArgumentParser(description="Visualize uncertainty regions in ML models")
+
+@dataclass
+class Args:
+    data: Path
+    # Errors of each compared model, the subgroups are discovered on the first one
+    errors: list[Path]
+    target: str
+    current_class: str
+    size: int
+    bins: int
+    binning: str
+    cache_dir: Path
+    use_cache: bool
+    dedup_threshold: float
+    engine: str
+    time_budget: float | None
+    sample: int | None
+    figure_cache_size: int
+    clientside_threshold: bool
+    profile: Path | None
+    watch: bool
+    watch_interval: float
+    watch_shift: float
+
+
+@dataclass
+class ConvertArgs:
+    data: Path
+    errors: Path
+    target: str
+    suffix: str
+
+
+@dataclass
+class StoreArgs:
+    output: Path
+    dashboard: Args
+
+
+# Kept here rather than next to the cache, so the commands don't import the dashboard
+DEFAULT_FIGURE_CACHE_SIZE = 32
+
+
+@dataclass
+class ReportArgs:
+    manifest: Path
+    output: Path
+    workers: int | None
+    format: str
+    html: bool
+    threshold: float
+
+
+@dataclass
+class GenerateArgs:
+    output: Path
+    name: str
+    rows: int
+    numeric: int
+    categorical: int
+    classes: int
+    error_rate: float
+    seed: int
+
+
+@dataclass
+class BenchmarkArgs:
+    rows: list[int]
+    sizes: list[int]
+    numeric: int
+    categorical: int
+    classes: int
+    error_rate: float
+    engine: str
+    repeat: int
+    output: Path
+    baseline: Path | None
+    tolerance: float
+
+
+CONVERT_COMMAND = "convert"
+CONVERT_SUFFIXES = {"arrow": ".arrow", "parquet": ".parquet"}
+REPORT_COMMAND = "report"
+REPORT_FORMATS = ("json", "parquet")
+GENERATE_COMMAND = "generate"
+BENCHMARK_COMMAND = "benchmark"
+STORE_COMMAND = "store"
+
+
+def get_convert_args() -> ConvertArgs:
+    argparser = ArgumentParser(
+        prog=f"python -m src {CONVERT_COMMAND}",
+        description="Convert the input CSVs to a format that loads faster. Files are written next to the CSVs",
+    )
     argparser.add_argument(
         "-d", "--data", dest="data", required=True, type=Path, help="Path to dataset"
     )
@@ -13,7 +111,309 @@ def get_args() -> tuple[Path, Path, str, str, int]:
         dest="errors",
         required=True,
         type=Path,
-        help="Path to model errros",
+        help="Path to model errors",
+    )
+    argparser.add_argument(
+        "-t",
+        "--target",
+        dest="target",
+        required=False,
+        type=str,
+        help="Target column",
+        default="target",
+    )
+    argparser.add_argument(
+        "-f",
+        "--format",
+        dest="format",
+        choices=list(CONVERT_SUFFIXES),
+        required=False,
+        help="Output format. Arrow files are memory-mapped when loaded, so they start the fastest",
+        default="arrow",
+    )
+    args = argparser.parse_args(sys.argv[2:])
+    for path in (args.data, args.errors):
+        if path.suffix != ".csv":
+            argparser.error(f"'{path}' isn't a CSV")
+    return ConvertArgs(
+        data=args.data,
+        errors=args.errors,
+        target=args.target,
+        suffix=CONVERT_SUFFIXES[args.format],
+    )
+
+
+def get_report_args() -> ReportArgs:
+    argparser = ArgumentParser(
+        prog=f"python -m src {REPORT_COMMAND}",
+        description="Discover the subgroups of every job of a manifest and write them to files, without starting the dashboard",
+    )
+    argparser.add_argument(
+        "manifest",
+        type=Path,
+        help="JSON list of jobs. Each one has 'data', 'errors' and 'class', like the dashboard's options, and optionally 'name', 'target', 'size', 'engine', 'dedup_threshold', 'sample', 'bins' and 'binning'. Paths are relative to the manifest",
+    )
+    argparser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        required=True,
+        type=Path,
+        help="Directory where each job writes its results, in a directory named after it",
+    )
+    argparser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        type=int,
+        required=False,
+        help="Number of jobs run at once. By default, as many as there are CPUs",
+        default=None,
+    )
+    argparser.add_argument(
+        "-f",
+        "--format",
+        dest="format",
+        choices=REPORT_FORMATS,
+        required=False,
+        help="Format of the subgroup tables",
+        default=REPORT_FORMATS[0],
+    )
+    argparser.add_argument(
+        "--html",
+        dest="html",
+        action="store_true",
+        help="Also write a static HTML page with the subgroups of each job",
+    )
+    argparser.add_argument(
+        "--threshold",
+        dest="threshold",
+        type=float,
+        required=False,
+        help="Distance up to which similar subgroups are clustered together, as with the dashboard's threshold slider",
+        default=0.5,
+    )
+    args = argparser.parse_args(sys.argv[2:])
+    if args.workers is not None and args.workers <= 0:
+        argparser.error("--workers must be positive")
+    if not 0 <= args.threshold <= 1:
+        argparser.error("--threshold must be in the interval [0, 1]")
+    return ReportArgs(
+        manifest=args.manifest,
+        output=args.output,
+        workers=args.workers,
+        format=args.format,
+        html=args.html,
+        threshold=args.threshold,
+    )
+
+
+def _add_synthetic_arguments(argparser: ArgumentParser) -> None:
+    argparser.add_argument(
+        "--numeric",
+        dest="numeric",
+        type=int,
+        required=False,
+        help="Number of numeric features",
+        default=4,
+    )
+    argparser.add_argument(
+        "--categorical",
+        dest="categorical",
+        type=int,
+        required=False,
+        help="Number of categorical features",
+        default=1,
+    )
+    argparser.add_argument(
+        "--classes",
+        dest="classes",
+        type=int,
+        required=False,
+        help="Number of classes",
+        default=3,
+    )
+    argparser.add_argument(
+        "--error-rate",
+        dest="error_rate",
+        type=float,
+        required=False,
+        help="Fraction of the rows misclassified by the model",
+        default=0.1,
+    )
+
+
+def _check_synthetic_arguments(argparser: ArgumentParser, args: Namespace) -> None:
+    if args.numeric < 0 or args.categorical < 0:
+        argparser.error("Feature counts can't be negative")
+    if args.numeric + args.categorical < 2:  # noqa: PLR2004
+        argparser.error("Subgroups need at least 2 features")
+    if args.classes < 2:  # noqa: PLR2004
+        argparser.error("--classes must be at least 2")
+    if not 0 <= args.error_rate <= 1:
+        argparser.error("--error-rate must be in the interval [0, 1]")
+
+
+def get_generate_args() -> GenerateArgs:
+    argparser = ArgumentParser(
+        prog=f"python -m src {GENERATE_COMMAND}",
+        description="Write a synthetic dataset and model errors, laid out like the ones in data/",
+    )
+    argparser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        required=True,
+        type=Path,
+        help="Directory of the dataset. The errors go to its errors/ directory",
+    )
+    argparser.add_argument(
+        "--name",
+        dest="name",
+        type=str,
+        required=False,
+        help="Name of the CSVs",
+        default="synthetic",
+    )
+    argparser.add_argument(
+        "--rows",
+        dest="rows",
+        type=int,
+        required=False,
+        help="Number of rows",
+        default=10_000,
+    )
+    _add_synthetic_arguments(argparser)
+    argparser.add_argument(
+        "--seed",
+        dest="seed",
+        type=int,
+        required=False,
+        help="Seed of the random generator",
+        default=0,
+    )
+    args = argparser.parse_args(sys.argv[2:])
+    if args.rows <= 0:
+        argparser.error("--rows must be positive")
+    _check_synthetic_arguments(argparser, args)
+    return GenerateArgs(
+        output=args.output,
+        name=args.name,
+        rows=args.rows,
+        numeric=args.numeric,
+        categorical=args.categorical,
+        classes=args.classes,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+
+def get_benchmark_args() -> BenchmarkArgs:
+    argparser = ArgumentParser(
+        prog=f"python -m src {BENCHMARK_COMMAND}",
+        description="Time every stage of the pipeline on synthetic datasets of growing size",
+    )
+    argparser.add_argument(
+        "--rows",
+        dest="rows",
+        type=int,
+        nargs="+",
+        required=False,
+        help="Numbers of rows of the datasets",
+        default=[1_000, 10_000, 100_000],
+    )
+    argparser.add_argument(
+        "--sizes",
+        dest="sizes",
+        type=int,
+        nargs="+",
+        required=False,
+        help="Numbers of subgroups searched for",
+        default=[20, 100],
+    )
+    _add_synthetic_arguments(argparser)
+    argparser.add_argument(
+        "--engine",
+        dest="engine",
+        choices=ENGINES,
+        required=False,
+        help="Subgroup discovery implementation",
+        default=ENGINES[0],
+    )
+    argparser.add_argument(
+        "--repeat",
+        dest="repeat",
+        type=int,
+        required=False,
+        help="Number of times each stage is timed. The median time is kept",
+        default=3,
+    )
+    argparser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        type=Path,
+        required=False,
+        help="JSON file where the timings are written",
+        default=Path("benchmark.json"),
+    )
+    argparser.add_argument(
+        "--baseline",
+        dest="baseline",
+        type=Path,
+        required=False,
+        help="Timings written by an earlier run, to compare against. Fails when a stage got slower",
+        default=None,
+    )
+    argparser.add_argument(
+        "--tolerance",
+        dest="tolerance",
+        type=float,
+        required=False,
+        help="Fraction by which a stage may be slower than in the baseline",
+        default=0.25,
+    )
+    args = argparser.parse_args(sys.argv[2:])
+    if min(args.rows) <= 0 or min(args.sizes) <= 0:
+        argparser.error("--rows and --sizes must be positive")
+    if args.repeat <= 0:
+        argparser.error("--repeat must be positive")
+    if args.tolerance < 0:
+        argparser.error("--tolerance can't be negative")
+    _check_synthetic_arguments(argparser, args)
+    return BenchmarkArgs(
+        rows=args.rows,
+        sizes=args.sizes,
+        numeric=args.numeric,
+        categorical=args.categorical,
+        classes=args.classes,
+        error_rate=args.error_rate,
+        engine=args.engine,
+        repeat=args.repeat,
+        output=args.output,
+        baseline=args.baseline,
+        tolerance=args.tolerance,
+    )
+
+
+def _dashboard_parser(**kwargs: str) -> ArgumentParser:
+    argparser = ArgumentParser(**kwargs)
+    argparser.add_argument(
+        "-d",
+        "--data",
+        dest="data",
+        required=True,
+        type=Path,
+        help=f"Path to dataset ({', '.join(FORMATS)})",
+    )
+    argparser.add_argument(
+        "-e",
+        "--errors",
+        dest="errors",
+        required=True,
+        type=Path,
+        nargs="+",
+        help=f"Paths to model errors ({', '.join(FORMATS)}). With several models, the subgroups are found on the errors of the first one, and their statistics are computed for every model",
     )
     argparser.add_argument(
         "-t",
@@ -30,7 +430,7 @@ def get_args() -> tuple[Path, Path, str, str, int]:
         dest="currrent_class",
         required=True,
         type=str,
-        help="Current Class",
+        help=f"Current Class, or '{ALL_CLASSES}' to discover subgroups for every class",
     )
     argparser.add_argument(
         "-n",
@@ -41,5 +441,183 @@ def get_args() -> tuple[Path, Path, str, str, int]:
         help="Number of max subgroups to generate",
         default=20,
     )
-    args = argparser.parse_args()
-    return (args.data, args.errors, args.target, args.currrent_class, args.size)
+    argparser.add_argument(
+        "--bins",
+        dest="bins",
+        type=int,
+        required=False,
+        help="Number of intervals each numeric feature is cut into. Fewer bins make a smaller search space, which is faster to search",
+        default=DEFAULT_BINS,
+    )
+    argparser.add_argument(
+        "--binning",
+        dest="binning",
+        choices=BINNINGS,
+        required=False,
+        help="How numeric features are cut: into intervals of about as many rows, of the same width, or where they best separate the target classes",
+        default=BINNINGS[0],
+    )
+    argparser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        type=Path,
+        required=False,
+        help="Directory where discovered subgroups are cached",
+        default=DEFAULT_CACHE_DIR,
+    )
+    argparser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Always run the subgroup discovery, ignoring and not updating the cache",
+    )
+    argparser.add_argument(
+        "--dedup-threshold",
+        dest="dedup_threshold",
+        type=float,
+        required=False,
+        help="Also merge subgroups whose coverage Jaccard similarity is at least this value. By default, only subgroups with identical coverage are merged",
+        default=1.0,
+    )
+    argparser.add_argument(
+        "--engine",
+        dest="engine",
+        choices=ENGINES,
+        required=False,
+        help="Subgroup discovery implementation. 'numpy' runs the same beam search over precomputed selector coverages, and 'exhaustive' finds the best pairs of selectors out of all of them",
+        default=ENGINES[0],
+    )
+    argparser.add_argument(
+        "--time-budget",
+        dest="time_budget",
+        type=float,
+        required=False,
+        help="Stop the subgroup discovery after this many seconds, and show the best subgroups found so far",
+        default=None,
+    )
+    argparser.add_argument(
+        "--sample",
+        dest="sample",
+        type=int,
+        required=False,
+        help="Search a sample of this many rows, stratified by class and error, and rescore the best candidates on the whole dataset",
+        default=None,
+    )
+    argparser.add_argument(
+        "--figure-cache-size",
+        dest="figure_cache_size",
+        type=int,
+        required=False,
+        help="Number of subgroup plots kept in memory, so plotting them again is instant",
+        default=DEFAULT_FIGURE_CACHE_SIZE,
+    )
+    argparser.add_argument(
+        "--clientside-threshold",
+        dest="clientside_threshold",
+        action="store_true",
+        help="Filter the subgroups by the threshold in the browser, without asking the server",
+    )
+    argparser.add_argument(
+        "--profile",
+        dest="profile",
+        type=Path,
+        required=False,
+        help="Directory where cProfile stats of the startup, the discovery and every callback are written",
+        default=None,
+    )
+    argparser.add_argument(
+        "--watch",
+        dest="watch",
+        action="store_true",
+        help="Refresh the dashboard when the dataset or errors files change. When only errors change, the subgroups shown are rescored, and searched again only if their ranking shifted",
+    )
+    argparser.add_argument(
+        "--watch-interval",
+        dest="watch_interval",
+        type=float,
+        required=False,
+        help="Seconds between checks of the watched files",
+        default=2.0,
+    )
+    argparser.add_argument(
+        "--watch-shift",
+        dest="watch_shift",
+        type=float,
+        required=False,
+        help="Fraction of the pairs of subgroups whose order by quality may change before a class is searched again",
+        default=0.1,
+    )
+    return argparser
+
+
+def _check_watch_arguments(argparser: ArgumentParser, args: Namespace) -> None:
+    if args.watch_interval <= 0:
+        argparser.error("--watch-interval must be positive")
+    if not 0 <= args.watch_shift <= 1:
+        argparser.error("--watch-shift must be in the interval [0, 1]")
+
+
+def _dashboard_args(argparser: ArgumentParser, args: Namespace) -> Args:
+    for path in (args.data, *args.errors):
+        if path.suffix not in FORMATS:
+            argparser.error(f"'{path}' isn't one of {', '.join(FORMATS)}")
+    if len(set(args.errors)) < len(args.errors):
+        argparser.error("Every errors file must be a different model")
+    if not 0 < args.dedup_threshold <= 1:
+        argparser.error("--dedup-threshold must be in the interval (0, 1]")
+    if args.time_budget is not None and args.time_budget <= 0:
+        argparser.error("--time-budget must be positive")
+    if args.sample is not None and args.sample <= 0:
+        argparser.error("--sample must be positive")
+    if args.bins < 2:  # noqa: PLR2004
+        argparser.error("--bins must be at least 2")
+    if args.figure_cache_size < 0:
+        argparser.error("--figure-cache-size can't be negative")
+    if args.time_budget is not None and args.engine == ENGINES[0]:
+        argparser.error(f"--time-budget isn't supported by the '{ENGINES[0]}' engine")
+    _check_watch_arguments(argparser, args)
+    return Args(
+        data=args.data,
+        errors=args.errors,
+        target=args.target,
+        current_class=args.currrent_class,
+        size=args.size,
+        bins=args.bins,
+        binning=args.binning,
+        cache_dir=args.cache_dir,
+        use_cache=args.use_cache,
+        dedup_threshold=args.dedup_threshold,
+        engine=args.engine,
+        time_budget=args.time_budget,
+        sample=args.sample,
+        figure_cache_size=args.figure_cache_size,
+        clientside_threshold=args.clientside_threshold,
+        profile=args.profile,
+        watch=args.watch,
+        watch_interval=args.watch_interval,
+        watch_shift=args.watch_shift,
+    )
+
+
+def get_args() -> Args:
+    argparser = _dashboard_parser(
+        description="Visualize uncertainty regions in ML models"
+    )
+    return _dashboard_args(argparser, argparser.parse_args())
+
+
+def get_store_args() -> StoreArgs:
+    argparser = _dashboard_parser(
+        prog=f"python -m src {STORE_COMMAND}",
+        description="Discover the subgroups and cluster them once, into a store the dashboard's WSGI workers share",
+    )
+    argparser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        required=True,
+        type=Path,
+        help="Directory of the store",
+    )
+    args = argparser.parse_args(sys.argv[2:])
+    return StoreArgs(output=args.output, dashboard=_dashboard_args(argparser, args))
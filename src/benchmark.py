@@ -0,0 +1,253 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from importlib.metadata import version
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from src.app import get_dfs, prepare_subgroups
+from src.args import BenchmarkArgs, get_benchmark_args
+from src.generate import generate_dataset
+from src.grouping.clean import remove_redundant_subgroups
+from src.grouping.clustering import get_linkage
+from src.grouping.discovery import create_search_space, subgroup_discovery
+from src.layout.components.dendrogram import generate_dendrogram_figure
+from src.layout.components.graph import class_rows, render_graph_and_subgroups
+from src.layout.components.subgroups.geometry import (
+    feature_axes,
+    subgroup_geometry,
+    subgroup_shapes,
+)
+from src.layout.components.threshold import filter_subgroups
+from src.loading import peak_memory_mib
+
+# Positions of the threshold slider timed by the threshold stage, per call
+THRESHOLD_POSITIONS = 50
+# Subgroups drawn over the scatter by the plot stage
+PLOTTED_SUBGROUPS = 5
+# Stages faster than this are mostly noise, so they aren't compared to the baseline
+MIN_COMPARED_SECONDS = 0.005
+
+Timing = dict[str, str | int | float | None]
+
+
+# Median of the times the function took, and its last result
+def time_stage(function: Callable[[], object], repeat: int) -> tuple[float, object]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)), result
+
+
+# The plot stage draws subgroups that share the axes of the first one, as selected in
+# the dropdown
+def plotted_subgroups(subgroups_df: DataFrame) -> DataFrame:
+    first = subgroups_df.iloc[0]
+    same_axes = subgroups_df[
+        (subgroups_df["x_column"] == first["x_column"])
+        & (subgroups_df["y_column"] == first["y_column"])
+    ]
+    return same_axes.head(PLOTTED_SUBGROUPS)
+
+
+def benchmark_rows(args: BenchmarkArgs, n_rows: int, directory: Path) -> list[Timing]:
+    dataset_df, errors_df = generate_dataset(
+        n_rows, args.numeric, args.categorical, args.classes, args.error_rate
+    )
+    data_path = directory / f"{n_rows}.csv"
+    errors_path = directory / f"{n_rows}-errors.csv"
+    dataset_df.to_csv(data_path, index=False)
+    errors_df.to_csv(errors_path, index=False)
+    current_class = errors_df.columns[0]
+
+    timings = []
+
+    def record(
+        stage: str, size: int | None, subgroups: int | None, seconds: float
+    ) -> None:
+        timings.append(
+            {
+                "stage": stage,
+                "rows": n_rows,
+                "size": size,
+                "subgroups": subgroups,
+                "seconds": seconds,
+            }
+        )
+        shown = f"{stage} ({n_rows} rows" + ("" if size is None else f", size {size}")
+        print(f"{shown}): {seconds:.4f}s")
+
+    seconds, dfs = time_stage(
+        lambda: get_dfs(data_path, errors_path, "target", current_class), args.repeat
+    )
+    dataset_df, errors_df = dfs
+    record("load", None, None, seconds)
+    seconds, _ = time_stage(
+        lambda: create_search_space(dataset_df, errors_df, "target"), args.repeat
+    )
+    record("binning", None, None, seconds)
+    dataset_with_errors_df = pd.concat([dataset_df, errors_df], axis=1, copy=False)
+    rows = class_rows(dataset_with_errors_df, "target")
+    axes = feature_axes(dataset_df, dataset_df.columns.drop("target").tolist())
+
+    for size in args.sizes:
+        seconds, subgroups_df = time_stage(
+            lambda size=size: subgroup_discovery(
+                dataset_df,
+                errors_df,
+                size,
+                "target",
+                current_class,
+                engine=args.engine,
+            ),
+            args.repeat,
+        )
+        record("discovery", size, len(subgroups_df), seconds)
+
+        seconds, subgroups_df = time_stage(
+            lambda subgroups_df=subgroups_df: remove_redundant_subgroups(
+                subgroups_df, 1.0
+            ),
+            args.repeat,
+        )
+        record("dedup", size, len(subgroups_df), seconds)
+
+        subgroups_df = prepare_subgroups(subgroups_df)
+        n_subgroups = len(subgroups_df)
+        if n_subgroups > 1:
+            seconds, _ = time_stage(
+                lambda subgroups_df=subgroups_df: get_linkage(subgroups_df), args.repeat
+            )
+            record("clustering", size, n_subgroups, seconds)
+
+        # The dendrogram of a set is cached, so each run builds it for a copy
+        seconds, _ = time_stage(
+            lambda subgroups_df=subgroups_df: generate_dendrogram_figure(
+                subgroups_df.copy(), None
+            ),
+            args.repeat,
+        )
+        record("dendrogram", size, n_subgroups, seconds)
+
+        # Moving the slider reuses the dendrogram, as in the dashboard
+        _, min_x, max_x = generate_dendrogram_figure(subgroups_df, None)
+        positions = np.linspace(min_x, max_x, THRESHOLD_POSITIONS)
+        seconds, _ = time_stage(
+            lambda subgroups_df=subgroups_df, positions=positions: [
+                filter_subgroups(subgroups_df, float(x), []) for x in positions
+            ],
+            args.repeat,
+        )
+        record("threshold", size, n_subgroups, seconds / THRESHOLD_POSITIONS)
+
+        if n_subgroups > 0:
+            plotted = plotted_subgroups(subgroups_df)
+            first = plotted.iloc[0]
+            # The geometry is resolved once per set of subgroups, as in the dashboard
+            shapes_df = subgroup_shapes(
+                subgroup_geometry(plotted, axes), plotted, first["x_column"]
+            )
+            seconds, _ = time_stage(
+                lambda first=first, shapes_df=shapes_df: render_graph_and_subgroups(
+                    dataset_with_errors_df,
+                    rows,
+                    first["x_column"],
+                    first["y_column"],
+                    shapes_df,
+                    axes=axes,
+                ),
+                args.repeat,
+            )
+            record("plot", size, len(plotted), seconds)
+
+    return timings
+
+
+def environment() -> dict[str, str | int | None]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        **{x: version(x) for x in ("numpy", "pandas", "pysubgroup", "scipy", "plotly")},
+    }
+
+
+def timing_key(timing: Timing) -> tuple:
+    return timing["stage"], timing["rows"], timing["size"]
+
+
+# Prints how each stage compares to the baseline, returning the ones that got slower
+# than the tolerance allows
+def compare(
+    timings: list[Timing], baseline: list[Timing], tolerance: float
+) -> list[Timing]:
+    baseline_seconds = {timing_key(x): x["seconds"] for x in baseline}
+    regressions = []
+    for timing in timings:
+        before = baseline_seconds.get(timing_key(timing))
+        if before is None:
+            continue
+        ratio = timing["seconds"] / before if before > 0 else float("inf")
+        slower = (
+            ratio > 1 + tolerance
+            and max(timing["seconds"], before) >= MIN_COMPARED_SECONDS
+        )
+        if slower:
+            regressions.append(timing)
+        stage, rows, size = timing_key(timing)
+        print(
+            f"{stage:<10} {rows:>9} {size if size is not None else '-':>5} "
+            f"{before:>9.4f}s {timing['seconds']:>9.4f}s {ratio:>6.2f}x"
+            + ("  slower" if slower else "")
+        )
+    return regressions
+
+
+def run() -> None:
+    args = get_benchmark_args()
+    baseline = None
+    if args.baseline is not None:
+        try:
+            baseline = json.loads(args.baseline.read_text())["timings"]
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            print(f"Invalid baseline '{args.baseline}': {e}")
+            raise SystemExit(1) from e
+
+    timings = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in args.rows:
+            timings.extend(benchmark_rows(args, n_rows, Path(directory)))
+
+    results = {
+        "environment": environment(),
+        "parameters": {
+            "numeric": args.numeric,
+            "categorical": args.categorical,
+            "classes": args.classes,
+            "error_rate": args.error_rate,
+            "engine": args.engine,
+            "repeat": args.repeat,
+        },
+        "peak_memory_mib": round(peak_memory_mib(), 1),
+        "timings": timings,
+    }
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"Wrote '{args.output}'")
+
+    if baseline is None:
+        return
+    print(f"{'stage':<10} {'rows':>9} {'size':>5} {'baseline':>10} {'current':>10}")
+    regressions = compare(timings, baseline, args.tolerance)
+    # Pipelines running the benchmark should notice regressions
+    if regressions:
+        print(f"{len(regressions)} stages are slower than the baseline")
+        raise SystemExit(1)
@@ -0,0 +1,19 @@
+from src.args import get_convert_args
+from src.loading import memory_report, read_dataset, read_errors, write_table
+
+
+def run() -> None:
+    args = get_convert_args()
+    try:
+        dataset_df = read_dataset(args.data, args.target)
+        errors_df = read_errors(args.errors, None)
+    except FileNotFoundError as e:
+        print(f"File '{e}' not found")
+        return
+
+    print(memory_report(dataset_df, errors_df))
+
+    for df, path in ((dataset_df, args.data), (errors_df, args.errors)):
+        output_path = path.with_suffix(args.suffix)
+        write_table(df, output_path)
+        print(f"Wrote '{output_path}'")
@@ -0,0 +1,74 @@
+import numpy as np
+from pandas import DataFrame
+
+from src.args import get_generate_args
+
+# Levels of every categorical feature
+CATEGORIES = 5
+# Rows inside the planted region are this many times more likely to be misclassified,
+# so there are subgroups to find
+REGION_ERROR_FACTOR = 4
+
+
+# A dataset and the errors of a model on it, as in data/: every class has an error
+# column, holding how far the predicted probability of the class is from the truth.
+# About error_rate of the rows are misclassified, mostly inside a region of the first
+# features
+def generate_dataset(  # noqa: PLR0913
+    rows: int,
+    numeric: int,
+    categorical: int,
+    classes: int,
+    error_rate: float,
+    *,
+    seed: int = 0,
+) -> tuple[DataFrame, DataFrame]:
+    rng = np.random.default_rng(seed)
+    dataset_df = DataFrame(
+        {f"num_{i}": rng.normal(size=rows).round(3) for i in range(numeric)}
+        | {
+            f"cat_{i}": rng.choice([f"c{j}" for j in range(CATEGORIES)], rows)
+            for i in range(categorical)
+        }
+    )
+    class_names = np.array([f"class_{i}" for i in range(classes)])
+    truth = rng.integers(classes, size=rows)
+    dataset_df["target"] = class_names[truth]
+
+    region = np.ones(rows, dtype=bool)
+    if numeric > 0:
+        region &= dataset_df["num_0"].to_numpy() > 1
+    if categorical > 0:
+        region &= dataset_df["cat_0"].to_numpy() == "c0"
+    weights = np.where(region, REGION_ERROR_FACTOR, 1.0)
+    wrong = rng.random(rows) < np.minimum(error_rate * weights / weights.mean(), 1)
+
+    # The predicted class gets most of the probability, and the others share the rest
+    predicted = np.where(
+        wrong, (truth + rng.integers(1, classes, rows)) % classes, truth
+    )
+    confidence = rng.uniform(0.5, 1.0, rows)
+    probabilities = np.repeat(((1 - confidence) / (classes - 1))[:, None], classes, 1)
+    probabilities[np.arange(rows), predicted] = confidence
+    errors = np.abs(probabilities - (truth[:, None] == np.arange(classes)))
+
+    return dataset_df, DataFrame(errors.round(4), columns=class_names)
+
+
+def run() -> None:
+    args = get_generate_args()
+    dataset_df, errors_df = generate_dataset(
+        args.rows,
+        args.numeric,
+        args.categorical,
+        args.classes,
+        args.error_rate,
+        seed=args.seed,
+    )
+
+    data_path = args.output / f"{args.name}.csv"
+    errors_path = args.output / "errors" / f"{args.name}.csv"
+    errors_path.parent.mkdir(parents=True, exist_ok=True)
+    dataset_df.to_csv(data_path, index=False)
+    errors_df.to_csv(errors_path, index=False)
+    print(f"Wrote '{data_path}' and '{errors_path}'")
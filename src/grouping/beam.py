@@ -0,0 +1,219 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from heapq import heappop, heappush
+
+import numpy as np
+import pysubgroup as ps
+from numpy.typing import NDArray
+from pandas import DataFrame
+
+from src.grouping.coverage import WORD_BITS, pack, unpack
+from src.grouping.lib import BidirectionalQFNumeric
+from src.grouping.progress import SearchProgress, expired, report
+
+# Upper bound for the unpacked blocks of rows multiplied at once
+_MAX_BLOCK_BYTES = 1 << 26
+# Number of subgroups of the beam extended by each product
+_EXTEND_CHUNK = 8
+
+
+# The coverage of every selector of the search space, computed once and shared by every
+# search over the same dataset
+@dataclass
+class SelectorIndex:
+    selectors: list[ps.SelectorBase]
+    bits: NDArray[np.uint64]
+    n_rows: int
+
+
+def build_selector_index(
+    merged_df: DataFrame, search_space: list[ps.SelectorBase]
+) -> SelectorIndex:
+    bits = pack(np.vstack([sel.covers(merged_df) for sel in search_space]))
+    return SelectorIndex(search_space, bits, len(merged_df))
+
+
+# Size and error sum of the intersection of every bitset of left with every bitset of
+# right, as two products of the unpacked bitsets, one block of rows at a time
+def intersection_statistics(
+    left: NDArray[np.uint64],
+    right: NDArray[np.uint64],
+    errors: NDArray[np.float64],
+    n_rows: int,
+) -> tuple[NDArray[np.int64], NDArray[np.float64]]:
+    total_words = left.shape[1]
+    n_sets = len(left) + len(right)
+    block_words = max(
+        1, min(_MAX_BLOCK_BYTES // (8 * WORD_BITS * max(n_sets, 1)), total_words)
+    )
+
+    sizes = np.zeros((len(left), len(right)))
+    sums = np.zeros((len(left), len(right)))
+    for start in range(0, total_words, block_words):
+        stop = min(start + block_words, total_words)
+        rows = slice(start * WORD_BITS, min(stop * WORD_BITS, n_rows))
+        n_block_rows = rows.stop - rows.start
+
+        left_block = unpack(
+            np.ascontiguousarray(left[:, start:stop]), n_block_rows
+        ).astype(float)
+        right_block = unpack(
+            np.ascontiguousarray(right[:, start:stop]), n_block_rows
+        ).astype(float)
+        sizes += left_block @ right_block.T
+        sums += left_block @ (right_block * errors[rows]).T
+
+    return sizes.astype(np.int64), sums
+
+
+# Size and error sum of the intersection of every selector with every one of the given
+# coverages
+def extend_statistics(
+    index: SelectorIndex, coverages: NDArray[np.uint64], errors: NDArray[np.float64]
+) -> tuple[NDArray[np.int64], NDArray[np.float64]]:
+    return intersection_statistics(index.bits, coverages, errors, index.n_rows)
+
+
+def coverage_of(
+    index: SelectorIndex, selector_ids: tuple[int, ...]
+) -> NDArray[np.uint64]:
+    covered = pack(np.ones(index.n_rows, dtype=bool))[0]
+    for i in selector_ids:
+        covered = covered & index.bits[i]
+    return covered
+
+
+def _statistic(function: Callable, values: NDArray) -> float:
+    # Statistics of an empty subgroup are undefined
+    return function(values) if len(values) > 0 else np.nan
+
+
+# Same statistics as pysubgroup's NumericTarget, for the final result set
+# Columns of the statistics of each subgroup, in the order describe computes them
+STATISTICS = [
+    f"{statistic}_{x}"
+    for statistic in ("size", "mean", "std", "median", "max", "min")
+    for x in ("sg", "dataset")
+] + ["mean_lift", "median_lift"]
+
+
+def describe(
+    covered: NDArray[np.uint64], errors: NDArray[np.float64], n_rows: int
+) -> dict:
+    sg_errors = errors[unpack(covered, n_rows)]
+    statistics = {
+        "size_sg": len(sg_errors),
+        "size_dataset": len(errors),
+        "mean_sg": _statistic(np.mean, sg_errors),
+        "mean_dataset": np.mean(errors),
+        "std_sg": _statistic(np.std, sg_errors),
+        "std_dataset": np.std(errors),
+        "median_sg": _statistic(np.median, sg_errors),
+        "median_dataset": np.median(errors),
+        "max_sg": _statistic(np.max, sg_errors),
+        "max_dataset": np.max(errors),
+        "min_sg": _statistic(np.min, sg_errors),
+        "min_dataset": np.min(errors),
+    }
+    statistics["mean_lift"] = statistics["mean_sg"] / statistics["mean_dataset"]
+    statistics["median_lift"] = statistics["median_sg"] / statistics["median_dataset"]
+    return statistics
+
+
+def _add_if_required(
+    beam: list[tuple[float, ps.Conjunction]],
+    candidate: tuple[float, ps.Conjunction],
+    beam_width: int,
+) -> None:
+    # Same policy as pysubgroup's add_if_required, so both engines agree on ties
+    if candidate in beam:
+        return
+    if len(beam) < beam_width:
+        heappush(beam, candidate)
+    elif candidate[0] > beam[0][0]:
+        heappop(beam)
+        heappush(beam, candidate)
+
+
+# Drop-in replacement for pysubgroup's BeamSearch with the bidirectional quality function.
+# Every level extends the beam a chunk of subgroups at a time: selector coverages are ANDed
+# with the chunk's coverages, and sizes and error sums come from matrix products instead of
+# pandas filters. Candidates are still added in the same order, so chunking doesn't change
+# the result, but it lets partial results be published and the deadline be honored
+def beam_search(  # noqa: PLR0913
+    index: SelectorIndex,
+    errors: NDArray[np.float64],
+    set_size: int,
+    depth: int = 2,
+    a: float = 0.5,
+    *,
+    progress: SearchProgress | None = None,
+) -> DataFrame:
+    mean_dataset = np.mean(errors)
+    # Selectors of each subgroup seen, by position in the index, to rebuild coverages
+    selector_ids: dict[ps.Conjunction, tuple[int, ...]] = {ps.Conjunction([]): ()}
+
+    def results() -> DataFrame:
+        return result_frame(
+            index, errors, sorted(beam, reverse=True)[:set_size], selector_ids
+        )
+
+    beam: list[tuple[float, ps.Conjunction]] = [(0, ps.Conjunction([]))]
+    # Like pysubgroup, visited marks the objects, so B AND A is extended even if A AND B was
+    visited: set[int] = set()
+    previous_beam = None
+    level = 0
+    while beam != previous_beam and level < depth and not expired(progress):
+        previous_beam = beam.copy()
+        to_extend = [sg for _, sg in previous_beam if id(sg) not in visited]
+        visited.update(id(sg) for sg in to_extend)
+        if len(to_extend) == 0:
+            break
+
+        for start in range(0, len(to_extend), _EXTEND_CHUNK):
+            if expired(progress):
+                break
+            chunk = to_extend[start : start + _EXTEND_CHUNK]
+            sizes, sums = extend_statistics(
+                index,
+                np.vstack([coverage_of(index, selector_ids[sg]) for sg in chunk]),
+                errors,
+            )
+            means = np.divide(sums, sizes, out=np.zeros(sums.shape), where=sizes > 0)
+            qualities = BidirectionalQFNumeric.bidirectional_qf_numeric(
+                a, mean_dataset, sizes, means
+            )
+
+            for j, last_sg in enumerate(chunk):
+                for i, sel in enumerate(index.selectors):
+                    if sel in last_sg.selectors:
+                        continue
+                    sg = ps.Conjunction((*last_sg.selectors, sel))
+                    selector_ids.setdefault(sg, (*selector_ids[last_sg], i))
+                    _add_if_required(beam, (qualities[i, j], sg), set_size)
+            report(progress, results)
+        level += 1
+
+    return results()
+
+
+# Same schema as pysubgroup's result frame, plus the coverage of each subgroup
+def result_frame(
+    index: SelectorIndex,
+    errors: NDArray[np.float64],
+    result: list[tuple[float, ps.Conjunction]],
+    selector_ids: dict[ps.Conjunction, tuple[int, ...]],
+) -> DataFrame:
+    coverages = [coverage_of(index, selector_ids[sg]) for _, sg in result]
+    return DataFrame(
+        [
+            {
+                "quality": quality,
+                "subgroup": sg,
+                **describe(covered, errors, index.n_rows),
+            }
+            for (quality, sg), covered in zip(result, coverages, strict=True)
+        ],
+        # Listed, so searches that found nothing still have every column
+        columns=["quality", "subgroup", *STATISTICS],
+    ).assign(covered=coverages)
@@ -0,0 +1,155 @@
+import itertools
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+import pysubgroup as ps
+from numpy.typing import NDArray
+from pandas import DataFrame
+
+# How the interval selectors of numeric features are cut. 'quantile' puts about as many
+# rows in each interval, as pysubgroup does, 'uniform' gives the intervals the same
+# width, and 'entropy' places the cuts where they best separate the target classes
+BINNINGS = ("quantile", "uniform", "entropy")
+DEFAULT_BINS = 5
+
+
+# Same cut points as pysubgroup's equal_frequency_discretization: the value at every
+# i/bins of the sorted values, moved past the values already taken
+def quantile_edges(sorted_values: NDArray, bins: int) -> NDArray:
+    n_values = len(sorted_values)
+    edges = []
+    for i in range(1, bins):
+        position = i * n_values // bins
+        if edges:
+            position = max(
+                position, np.searchsorted(sorted_values, edges[-1], side="right")
+            )
+        if position < n_values:
+            edges.append(sorted_values[position])
+    return np.array(edges, dtype=sorted_values.dtype)
+
+
+def uniform_edges(sorted_values: NDArray, bins: int) -> NDArray:
+    edges = np.linspace(sorted_values[0], sorted_values[-1], bins + 1)[1:-1]
+    return np.unique(edges)
+
+
+def _entropy(counts: NDArray[np.int64]) -> NDArray[np.float64]:
+    totals = counts.sum(axis=-1, keepdims=True)
+    p = np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+    return -(p * np.log2(p, out=np.zeros(p.shape), where=p > 0)).sum(axis=-1)
+
+
+# Best cut of a run of the sorted values, as the position of the first value right of it,
+# and by how much it lowers the entropy of the labels, summed over the rows of the run,
+# beyond the cost of describing the cut (Fayyad and Irani's MDL criterion), so cuts that
+# only fit noise don't pay off. Cuts can only fall between distinct values
+def _best_cut(
+    sorted_values: NDArray, one_hot: NDArray[np.int64], start: int, stop: int
+) -> tuple[float, int]:
+    positions = start + 1 + np.flatnonzero(np.diff(sorted_values[start:stop]) != 0)
+    if len(positions) == 0:
+        return 0.0, -1
+
+    cumulative = np.cumsum(one_hot[start:stop], axis=0)
+    left = cumulative[positions - start - 1]
+    right = cumulative[-1] - left
+    n_left, n_right = positions - start, stop - positions
+    split_entropy = n_left * _entropy(left) + n_right * _entropy(right)
+    best = int(np.argmin(split_entropy))
+
+    n_rows = stop - start
+    counts = [cumulative[-1], left[best], right[best]]
+    entropies = [float(_entropy(x)) for x in counts]
+    labels = [np.count_nonzero(x) for x in counts]
+    delta = np.log2(3 ** labels[0] - 2) - (
+        labels[0] * entropies[0] - labels[1] * entropies[1] - labels[2] * entropies[2]
+    )
+    gain = n_rows * entropies[0] - split_entropy[best]
+    return float(gain - np.log2(n_rows - 1) - delta), int(positions[best])
+
+
+# Top-down supervised cuts: the run of values whose best cut lowers the entropy of the
+# labels the most is split, until there are bins runs or no cut pays off. Rows without a
+# label are a class of their own
+def entropy_edges(sorted_values: NDArray, sorted_labels: NDArray, bins: int) -> NDArray:
+    codes = pd.factorize(sorted_labels, use_na_sentinel=False)[0]
+    one_hot = np.zeros((len(codes), codes.max() + 1), dtype=np.int64)
+    one_hot[np.arange(len(codes)), codes] = 1
+
+    runs = {(0, len(sorted_values)): _best_cut(sorted_values, one_hot, 0, len(codes))}
+    cuts = []
+    while len(cuts) < bins - 1:
+        (start, stop), (gain, position) = max(runs.items(), key=lambda x: x[1][0])
+        if gain <= 0:
+            break
+        cuts.append(position)
+        del runs[start, stop]
+        for run in ((start, position), (position, stop)):
+            runs[run] = _best_cut(sorted_values, one_hot, *run)
+    return sorted_values[np.sort(np.array(cuts, dtype=np.int64))]
+
+
+def _intervals(attribute: str, edges: NDArray) -> list[ps.SelectorBase]:
+    bounds = [float("-inf"), *edges, float("inf")]
+    return [
+        ps.IntervalSelector(attribute, lower, upper)
+        for lower, upper in itertools.pairwise(bounds)
+    ]
+
+
+# Selectors of a numeric feature, in the same order as pysubgroup's: missing values, then
+# each value when there are at most bins of them, and intervals between the edges
+# otherwise. Every feature is sorted once, and the edges are found on the sorted values
+def numeric_selectors(
+    dataset_df: DataFrame,
+    attribute: str,
+    labels: NDArray,
+    *,
+    bins: int = DEFAULT_BINS,
+    binning: str = BINNINGS[0],
+) -> list[ps.SelectorBase]:
+    column = dataset_df[attribute]
+    present = column.notna().to_numpy()
+    selectors = [] if present.all() else [ps.EqualitySelector(attribute, np.nan)]
+
+    values = column.to_numpy()[present]
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    if len(sorted_values) == 0:
+        return selectors
+    distinct = sorted_values[np.r_[True, sorted_values[1:] != sorted_values[:-1]]]
+    if len(distinct) <= bins:
+        return selectors + [ps.EqualitySelector(attribute, x) for x in distinct]
+
+    edges = np.empty(0)
+    if binning == "uniform":
+        edges = uniform_edges(sorted_values, bins)
+    elif binning == "entropy":
+        edges = entropy_edges(sorted_values, labels[present][order], bins)
+    # Features that don't tell the classes apart are still cut, by quantiles
+    if len(edges) == 0:
+        edges = quantile_edges(sorted_values, bins)
+    return selectors + _intervals(attribute, edges)
+
+
+# The search space of every class: a selector for each value of the nominal features,
+# and bins intervals for each numeric one
+def create_selectors(
+    dataset_df: DataFrame,
+    target_column: str,
+    *,
+    bins: int = DEFAULT_BINS,
+    binning: str = BINNINGS[0],
+    ignore: Iterable[str] = (),
+) -> list[ps.SelectorBase]:
+    ignore = [*ignore, target_column]
+    selectors = ps.create_nominal_selectors(dataset_df, ignore=ignore)
+    labels = dataset_df[target_column].to_numpy()
+    for attribute in dataset_df.select_dtypes(include="number").columns:
+        if attribute not in ignore:
+            selectors += numeric_selectors(
+                dataset_df, attribute, labels, bins=bins, binning=binning
+            )
+    return selectors
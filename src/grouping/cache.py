@@ -0,0 +1,93 @@
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pysubgroup as ps
+from pandas import DataFrame
+
+from src.grouping.coverage import coverage_matrix
+from src.grouping.lib import (
+    deserialize_selector,
+    deserialize_subgroup,
+    serialize_selector,
+    serialize_subgroup,
+)
+
+# Bump whenever the layout of the cached files changes, so stale entries are ignored
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "heisenpy"
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def fingerprint(paths: list[Path], **params: str | float) -> str:
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for path in paths:
+        with path.open("rb") as file:
+            while chunk := file.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def save_subgroups(subgroups_df: DataFrame, path: Path) -> None:
+    selectors = [serialize_subgroup(x) for x in subgroups_df["subgroup"]]
+    statistics = subgroups_df.drop(columns=["subgroup", "covered"])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("wb") as file:
+        np.savez_compressed(
+            file,
+            selectors=np.array(json.dumps(selectors)),
+            columns=np.array(subgroups_df.columns.tolist()),
+            covered=coverage_matrix(subgroups_df["covered"]),
+            **{f"stat_{c}": statistics[c].to_numpy() for c in statistics.columns},
+        )
+    # Rename at the end, so an interrupted write never leaves a half-written entry
+    tmp_path.replace(path)
+
+
+def load_subgroups(path: Path) -> DataFrame | None:
+    if not path.exists():
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as cached:
+            columns = cached["columns"].tolist()
+            covered = cached["covered"]
+            subgroups = [
+                deserialize_subgroup(x) for x in json.loads(str(cached["selectors"]))
+            ]
+            data = {
+                c: cached[f"stat_{c}"]
+                for c in columns
+                if c not in ("subgroup", "covered")
+            }
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Ignoring unreadable cache entry '{path}': {e}")
+        return None
+
+    data["subgroup"] = subgroups
+    data["covered"] = list(covered)
+    return DataFrame(data, columns=columns)
+
+
+# The search space depends only on the dataset and the binning, so one entry serves
+# every class and every run on the same dataset
+def save_search_space(search_space: list[ps.SelectorBase], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps([serialize_selector(x) for x in search_space]))
+    tmp_path.replace(path)
+
+
+def load_search_space(path: Path) -> list[ps.SelectorBase] | None:
+    if not path.exists():
+        return None
+
+    try:
+        return [deserialize_selector(x) for x in json.loads(path.read_text())]
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Ignoring unreadable cache entry '{path}': {e}")
+        return None
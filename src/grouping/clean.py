@@ -1,38 +1,93 @@
+import hashlib
+
+import numpy as np
+from numpy.typing import NDArray
 from pandas import DataFrame
 
+from src.grouping.coverage import coverage_matrix, minhash, popcount
+
+# Number of MinHash positions used to index near duplicate subgroups
+MINHASH_SIZE = 128
+# Minimum probability of a pair at exactly the threshold being compared
+MIN_CANDIDATE_PROBABILITY = 0.95
+
+
+def _exact_representatives(covered: NDArray[np.uint64]) -> NDArray[np.int64]:
+    representatives = np.arange(len(covered))
+    buckets: dict[bytes, list[int]] = {}
+
+    for i, bits in enumerate(covered):
+        key = hashlib.blake2b(bits.tobytes(), digest_size=16).digest()
+        bucket = buckets.setdefault(key, [])
+        # Compare the bytes too, in case two different coverages share a hash
+        match = next((j for j in bucket if np.array_equal(covered[j], bits)), None)
+        if match is None:
+            bucket.append(i)
+        else:
+            representatives[i] = match
+
+    return representatives
+
+
+# Split the signatures into bands of rows so that pairs at the threshold almost surely
+# share a band, while keeping the bands as selective as possible
+def _band_rows(threshold: float) -> int:
+    rows = 1
+    for r in range(1, MINHASH_SIZE + 1):
+        if MINHASH_SIZE % r != 0:
+            continue
+        bands = MINHASH_SIZE // r
+        if 1 - (1 - threshold**r) ** bands >= MIN_CANDIDATE_PROBABILITY:
+            rows = r
+    return rows
+
+
+def _jaccard(a: NDArray[np.uint64], b: NDArray[np.uint64]) -> float:
+    union = int(popcount(a | b))
+    # Two empty coverages are as identical as two coverages can be
+    return 1.0 if union == 0 else int(popcount(a & b)) / union
+
+
+def _near_representatives(
+    covered: NDArray[np.uint64], threshold: float
+) -> NDArray[np.int64]:
+    representatives = np.arange(len(covered))
+    signatures = minhash(covered, MINHASH_SIZE)
+    rows = _band_rows(threshold)
+    buckets: dict[tuple[int, bytes], list[int]] = {}
+
+    for i, signature in enumerate(signatures):
+        keys = [
+            (band, signature[start : start + rows].tobytes())
+            for band, start in enumerate(range(0, MINHASH_SIZE, rows))
+        ]
+        candidates = sorted({j for key in keys for j in buckets.get(key, [])})
+        match = next(
+            (j for j in candidates if _jaccard(covered[i], covered[j]) >= threshold),
+            None,
+        )
+        if match is None:
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+        else:
+            representatives[i] = match
+
+    return representatives
+
+
+# Reducing the redundancy in the subgroups mined, by unifying the names of equal coverage
+# subgroup descriptions. The first description of a coverage wins. With a threshold below
+# one, subgroups whose coverage Jaccard similarity reaches it are unified as well
+def remove_redundant_subgroups(
+    subgroups_df: DataFrame, threshold: float = 1.0
+) -> DataFrame:
+    covered = coverage_matrix(subgroups_df["covered"])
+
+    if threshold >= 1:
+        representatives = _exact_representatives(covered)
+    else:
+        representatives = _near_representatives(covered, threshold)
 
-# Reducing the redundancy in the subgroups mined, by unifying the names of equal coverage subgroup descriptions
-def remove_redundant_subgroups(subgroups_df: DataFrame) -> DataFrame:
-    list_of_rules: list[dict] = []
-
-    # First, we create a list of the subgroup descriptions and its coverage sets
-    for _, rule_row in subgroups_df.iterrows():
-        percent_equals = 0
-
-        row_subgroup = rule_row["subgroup"]
-        row_covered = rule_row["covered"]
-
-        for rule in list_of_rules:
-            percent_equals = sum(row_covered & rule["covered"]) / sum(
-                row_covered | rule["covered"]
-            )
-            if percent_equals == 1:
-                rule["subgroup"].add(row_subgroup)
-                break
-        if percent_equals != 1:
-            list_of_rules.append({"subgroup": {row_subgroup}, "covered": row_covered})
-
-    # Then, we create a dictionary to replace all descriptions by the first of them
-    duplicate_rules = [x["subgroup"] for x in list_of_rules if len(x["subgroup"]) > 1]
-    rule_map = {}
-    for duplicate in duplicate_rules:
-        first_rule = None
-        for rule in duplicate:
-            if first_rule is None:
-                first_rule = rule
-            else:
-                rule_map[rule] = first_rule
-
-    return subgroups_df.replace({"subgroup": rule_map}).drop_duplicates(
-        subset="subgroup"
-    )
+    # Every duplicate is renamed to a description that appears earlier, so only the
+    # first occurrence of each description is left
+    return subgroups_df[representatives == np.arange(len(subgroups_df))]
@@ -0,0 +1,111 @@
+import numpy as np
+from numpy.typing import NDArray
+from pandas import DataFrame
+from pysubgroup import Conjunction
+from scipy.cluster import hierarchy
+from scipy.sparse import csr_matrix
+
+from src.grouping.coverage import (
+    block_intersections,
+    coverage_matrix,
+    intersection_size,
+    popcount,
+    union_size,
+)
+
+
+def calculate_jaccard_similarity(
+    a: [NDArray, Conjunction], b: [NDArray, Conjunction]
+) -> float:
+    intersection = set(a[1].selectors).intersection(set(b[1].selectors))
+    union = set(a[1].selectors).union(set(b[1].selectors))
+    jaccard_selectors = len(intersection) / len(union)
+
+    jaccard_covered = intersection_size(a[0], b[0]) / union_size(a[0], b[0])
+
+    max_jaccard = max(jaccard_selectors, jaccard_covered)
+
+    return 1 - max_jaccard
+
+
+# Rows of the condensed distances computed at once
+_CONDENSED_BLOCK = 256
+
+
+def _jaccard_from_intersections(
+    intersections: NDArray[np.int64],
+    row_sizes: NDArray[np.int64],
+    column_sizes: NDArray[np.int64],
+) -> NDArray[np.float64]:
+    unions = row_sizes[:, None] + column_sizes[None, :] - intersections
+    return np.divide(
+        intersections.astype(float),
+        unions.astype(float),
+        out=np.zeros(intersections.shape),
+        where=unions > 0,
+    )
+
+
+# Sparse subgroup x selector incidence matrix, whose product with its transpose counts
+# the selectors shared by every pair of subgroups
+def _selector_incidence(subgroups_df: DataFrame) -> csr_matrix:
+    selector_ids: dict = {}
+    rows, columns = [], []
+    for i, subgroup in enumerate(subgroups_df["subgroup"]):
+        for selector in set(subgroup.selectors):
+            rows.append(i)
+            columns.append(selector_ids.setdefault(selector, len(selector_ids)))
+    return csr_matrix(
+        (np.ones(len(rows), dtype=np.int64), (rows, columns)),
+        shape=(len(subgroups_df), len(selector_ids)),
+    )
+
+
+# Same distances as calculate_jaccard_similarity, for every pair at once and in the
+# condensed form scipy takes (the upper triangle of the distance matrix, row by row).
+# Coverage intersections come from products of the coverage matrix, and selector
+# intersections from products of the incidence matrix. Both are computed a block of rows
+# at a time, against the rows after the block's start, so no square matrix is built and
+# memory stays within the condensed distances plus one block
+def condensed_jaccard_distances(subgroups_df: DataFrame) -> NDArray[np.float64]:
+    n_subgroups = len(subgroups_df)
+    bits = coverage_matrix(subgroups_df["covered"])
+    covered_sizes = np.asarray(popcount(bits))
+    incidence = _selector_incidence(subgroups_df)
+    selector_sizes = np.asarray(incidence.sum(axis=1)).ravel()
+
+    distances = np.empty(n_subgroups * (n_subgroups - 1) // 2)
+    offset = 0
+    for start in range(0, n_subgroups, _CONDENSED_BLOCK):
+        stop = min(start + _CONDENSED_BLOCK, n_subgroups)
+        jaccard_covered = _jaccard_from_intersections(
+            block_intersections(bits, start, stop),
+            covered_sizes[start:stop],
+            covered_sizes[start:],
+        )
+        jaccard_selectors = _jaccard_from_intersections(
+            (incidence[start:stop] @ incidence[start:].T).toarray(),
+            selector_sizes[start:stop],
+            selector_sizes[start:],
+        )
+        block = 1 - np.maximum(jaccard_selectors, jaccard_covered)
+        for i in range(stop - start):
+            row = block[i, i + 1 :]
+            distances[offset : offset + len(row)] = row
+            offset += len(row)
+
+    return distances
+
+
+# Average linkage of the subgroups, in scipy's format
+def get_linkage(subgroups_df: DataFrame) -> NDArray[np.float64]:
+    return hierarchy.linkage(condensed_jaccard_distances(subgroups_df), "average")
+
+
+# Cluster of every subgroup, numbered from 1, once the merges up to the threshold are
+# applied. Average linkage never merges closer clusters later, so these are the same
+# merges the dashboard applies for that threshold
+def cluster_labels(subgroups_df: DataFrame, threshold: float) -> NDArray[np.int32]:
+    if len(subgroups_df) <= 1:
+        return np.arange(1, len(subgroups_df) + 1, dtype=np.int32)
+    return hierarchy.fcluster(get_linkage(subgroups_df), threshold, "distance")
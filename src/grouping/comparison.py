@@ -0,0 +1,67 @@
+import numpy as np
+from pandas import DataFrame
+
+from src.grouping.coverage import coverage_matrix, coverage_sums, popcount
+from src.grouping.lib import BidirectionalQFNumeric
+
+# Statistics of the subgroups that depend on the model whose errors they're computed on
+MODEL_STATISTICS = ("mean_sg", "mean_dataset", "quality")
+
+
+# Column of a statistic computed on the errors of one of the compared models
+def model_column(statistic: str, model: str) -> str:
+    return f"{statistic}[{model}]"
+
+
+# The subgroups are found once, on the errors of the first model, and only their
+# statistics are computed for each model. Coverages don't depend on the errors, so every
+# model costs a single product of the coverage matrix with its error column
+def add_model_statistics(
+    subgroups_df: DataFrame,
+    errors_by_model: dict[str, DataFrame],
+    current_class: str,
+    a: float = 0.5,
+) -> DataFrame:
+    models = list(errors_by_model)
+    if len(models) <= 1:
+        return subgroups_df
+
+    subgroups_df = subgroups_df.copy()
+    if subgroups_df.empty:
+        for statistic in MODEL_STATISTICS:
+            for model in models:
+                subgroups_df[model_column(statistic, model)] = []
+        return subgroups_df
+
+    # Errors of the class under each model, one column per model
+    errors = np.column_stack(
+        [x[current_class].to_numpy(dtype=float) for x in errors_by_model.values()]
+    )
+    bits = coverage_matrix(subgroups_df["covered"])
+    sizes = popcount(bits)[:, None]
+    sums = coverage_sums(bits, errors)
+    means = np.divide(sums, sizes, out=np.full(sums.shape, np.nan), where=sizes > 0)
+    mean_dataset = errors.mean(axis=0)
+    qualities = BidirectionalQFNumeric.bidirectional_qf_numeric(
+        a, mean_dataset, sizes, means
+    )
+    for i, model in enumerate(models):
+        subgroups_df[model_column("mean_sg", model)] = means[:, i]
+        subgroups_df[model_column("mean_dataset", model)] = mean_dataset[i]
+        subgroups_df[model_column("quality", model)] = qualities[:, i]
+    return subgroups_df
+
+
+# The subgroups with the statistics of the model in the columns the dashboard reads, and
+# with deltas, the difference of each statistic from the first model
+def model_view(
+    subgroups_df: DataFrame, models: list[str], model: str, *, delta: bool = False
+) -> DataFrame:
+    if len(models) <= 1:
+        return subgroups_df
+    view_df = subgroups_df.copy(deep=False)
+    for statistic in MODEL_STATISTICS:
+        view_df[statistic] = subgroups_df[model_column(statistic, model)]
+        if delta:
+            view_df[statistic] -= subgroups_df[model_column(statistic, models[0])]
+    return view_df
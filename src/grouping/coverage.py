@@ -0,0 +1,132 @@
+import numpy as np
+from numpy.typing import NDArray
+from pandas import Series
+from scipy.linalg.blas import sgemm
+
+# The coverage of a subgroup is stored as a bitset: one bit per row of the dataset, packed
+# into uint64 words. The bitsets of a result set share a single 2-D array, one row each
+
+WORD_BITS = 64
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def n_words(n_rows: int) -> int:
+    return -(-n_rows // WORD_BITS)
+
+
+def pack(masks: NDArray[np.bool_]) -> NDArray[np.uint64]:
+    masks = np.atleast_2d(masks)
+    packed = np.zeros((masks.shape[0], n_words(masks.shape[1]) * 8), dtype=np.uint8)
+    packed_masks = np.packbits(masks, axis=1, bitorder="little")
+    packed[:, : packed_masks.shape[1]] = packed_masks
+    return packed.view(np.uint64)
+
+
+def unpack(bits: NDArray[np.uint64], n_rows: int) -> NDArray[np.bool_]:
+    return np.unpackbits(
+        bits.view(np.uint8), axis=-1, count=n_rows, bitorder="little"
+    ).astype(bool)
+
+
+# Number of rows covered by each bitset (along the last axis)
+def popcount(bits: NDArray[np.uint64]) -> NDArray[np.int64] | int:
+    return _BYTE_POPCOUNT[np.ascontiguousarray(bits).view(np.uint8)].sum(
+        axis=-1, dtype=np.int64
+    )
+
+
+def intersection_size(a: NDArray[np.uint64], b: NDArray[np.uint64]) -> int:
+    return int(popcount(a & b))
+
+
+def union_size(a: NDArray[np.uint64], b: NDArray[np.uint64]) -> int:
+    return int(popcount(a | b))
+
+
+def coverage_matrix(covered: Series) -> NDArray[np.uint64]:
+    if covered.empty:
+        return np.empty((0, 0), dtype=np.uint64)
+    return np.vstack(covered.tolist())
+
+
+# Pack the masks into one matrix and hand out its rows, which are views sharing its memory
+def coverage_column(masks: list[NDArray[np.bool_]]) -> list[NDArray[np.uint64]]:
+    if len(masks) == 0:
+        return []
+    return list(pack(np.vstack(masks)))
+
+
+# Upper bound for the unpacked block of rows multiplied at once by block_intersections
+_MAX_BLOCK_BYTES = 1 << 26
+
+
+# Size of the intersection of each bitset of bits[start:stop] with each one of
+# bits[start:], that is a block of rows of the upper triangle of the intersections of
+# every pair, as the product of the unpacked bitsets. Rows of the dataset are unpacked
+# in blocks to keep memory bounded, and each block has less than 2**24 rows so its
+# float32 products are exact integers
+def block_intersections(
+    bits: NDArray[np.uint64], start: int, stop: int
+) -> NDArray[np.int64]:
+    columns = bits[start:]
+    n_sets, total_words = columns.shape
+    block_words = max(
+        1, min(_MAX_BLOCK_BYTES // (4 * WORD_BITS * max(n_sets, 1)), total_words)
+    )
+    intersections = np.zeros((stop - start, n_sets), dtype=np.int64)
+    for word in range(0, total_words, block_words):
+        block = unpack(
+            np.ascontiguousarray(columns[:, word : word + block_words]),
+            block_words * WORD_BITS,
+        ).astype(np.float32)
+        # block.T is Fortran-ordered, so BLAS can use it without a copy. The rows of the
+        # block are its first columns
+        np.add(
+            intersections,
+            sgemm(1.0, block.T[:, : stop - start], block.T, trans_a=1),
+            out=intersections,
+            casting="unsafe",
+        )
+    return intersections
+
+
+# Sum of the values of the rows covered by each bitset, for every column of values, as
+# the product of the unpacked bitsets with the values, one block of rows at a time
+def coverage_sums(
+    bits: NDArray[np.uint64], values: NDArray[np.float64]
+) -> NDArray[np.float64]:
+    n_rows = len(values)
+    n_sets, total_words = bits.shape
+    block_words = max(
+        1, min(_MAX_BLOCK_BYTES // (8 * WORD_BITS * max(n_sets, 1)), total_words)
+    )
+    sums = np.zeros((n_sets, values.shape[1]))
+    for start in range(0, total_words, block_words):
+        rows = slice(start * WORD_BITS, min((start + block_words) * WORD_BITS, n_rows))
+        block = unpack(
+            np.ascontiguousarray(bits[:, start : start + block_words]),
+            rows.stop - rows.start,
+        ).astype(float)
+        sums += block @ values[rows]
+    return sums
+
+
+# One permutation MinHash signature of each bitset: rows are shuffled once, the shuffled
+# positions are split into n_hashes equal ranges, and each position of the signature keeps
+# the smallest covered row of its range (-1 when there's none). Two signatures agree on a
+# position with about the Jaccard similarity of their bitsets, at the cost of a single
+# pass over the covered rows
+def minhash(
+    bits: NDArray[np.uint64], n_hashes: int, seed: int = 0
+) -> NDArray[np.int64]:
+    n_rows = bits.shape[1] * WORD_BITS
+    permutation = np.random.default_rng(seed).permutation(n_rows)
+
+    signatures = np.full((bits.shape[0], n_hashes), -1, dtype=np.int64)
+    for i, row in enumerate(bits):
+        positions = np.sort(permutation[np.flatnonzero(unpack(row, n_rows))])
+        ranges = positions * n_hashes // n_rows
+        # positions are sorted, so the first one of each range is its minimum
+        present, first = np.unique(ranges, return_index=True)
+        signatures[i, present] = positions[first]
+    return signatures
@@ -1,21 +1,87 @@
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 import pandas as pd
 import pysubgroup as ps
+from numpy.typing import NDArray
 from pandas import DataFrame
 
-from src.grouping.lib import BidirectionalQFNumeric
+from src.grouping.beam import SelectorIndex, beam_search, build_selector_index
+from src.grouping.binning import BINNINGS, DEFAULT_BINS, create_selectors
+from src.grouping.coverage import coverage_column, coverage_matrix
+from src.grouping.exhaustive import exhaustive_search
+from src.grouping.lib import (
+    BidirectionalQFNumeric,
+    deserialize_selector,
+    deserialize_subgroup,
+    serialize_selector,
+    serialize_subgroup,
+)
+from src.grouping.progress import SearchProgress
+from src.grouping.sampling import POOL_FACTOR, rescore, strata, stratified_sample
 
+ENGINES = ("pysubgroup", "numpy", "exhaustive")
 
-def subgroup_discovery(
-    dataset_df: DataFrame,
+# State shared by every task of a worker process, set once by the pool's initializer
+_worker_merged_df: DataFrame | None = None
+_worker_search_space: list[ps.SelectorBase] = []
+_worker_index: SelectorIndex | None = None
+
+
+# The target column is kept and ignored by the search space instead, as dropping it would
+# copy every other column
+def merge_dataset_and_errors(dataset_df: DataFrame, errors_df: DataFrame) -> DataFrame:
+    return pd.concat([dataset_df, errors_df], axis=1, copy=False)
+
+
+def create_search_space(
+    merged_df: DataFrame,
     errors_df: DataFrame,
-    set_size: int,
     target_column: str,
+    *,
+    bins: int = DEFAULT_BINS,
+    binning: str = BINNINGS[0],
+) -> list[ps.SelectorBase]:
+    return create_selectors(
+        merged_df,
+        target_column,
+        bins=bins,
+        binning=binning,
+        ignore=errors_df.columns,
+    )
+
+
+def discover(  # noqa: PLR0913
+    merged_df: DataFrame,
+    search_space: list[ps.SelectorBase],
+    set_size: int,
     current_class: str,
+    *,
+    engine: str = "pysubgroup",
+    index: SelectorIndex | None = None,
+    progress: SearchProgress | None = None,
 ) -> DataFrame:
-    merged_df = pd.concat([dataset_df.drop(target_column, axis=1), errors_df], axis=1)
-    search_space = ps.create_selectors(merged_df, ignore=errors_df.columns.to_list())
+    if engine in {"numpy", "exhaustive"}:
+        if index is None:
+            index = build_selector_index(merged_df, search_space)
+        search = beam_search if engine == "numpy" else exhaustive_search
+        return search(
+            index,
+            merged_df[current_class].to_numpy(dtype=float),
+            set_size,
+            progress=progress,
+        )
+
+    # pysubgroup's search runs to completion, so it can neither publish partial results
+    # nor stop at a deadline.
+    # Errors may be stored as uint8 or float32, but pysubgroup's statistics accumulate in
+    # the precision of the target, so it gets a float64 copy of it (and only of it)
+    task_df = merged_df.copy(deep=False)
+    task_df[current_class] = merged_df[current_class].astype(float)
     task = ps.SubgroupDiscoveryTask(
-        data=merged_df,
+        data=task_df,
         target=ps.NumericTarget(current_class),
         search_space=search_space,
         result_set_size=set_size,
@@ -23,5 +89,210 @@ def subgroup_discovery(
         qf=BidirectionalQFNumeric(a=0.5),
     )
     df_rules = ps.BeamSearch(beam_width=set_size).execute(task=task).to_dataframe()
-    df_rules["covered"] = df_rules["subgroup"].apply(lambda x: x.covers(merged_df))
+    df_rules["covered"] = coverage_column(
+        [x.covers(merged_df) for x in df_rules["subgroup"]]
+    )
     return df_rules
+
+
+# Two phase search for large datasets: the search runs on a sample stratified by class
+# and error, for a pool of POOL_FACTOR times more candidates than needed, and the pool is
+# then rescored exactly on the full data
+def discover_sampled(  # noqa: PLR0913
+    merged_df: DataFrame,
+    search_space: list[ps.SelectorBase],
+    set_size: int,
+    current_class: str,
+    *,
+    target_column: str,
+    sample_size: int,
+    engine: str = "pysubgroup",
+    progress: SearchProgress | None = None,
+) -> DataFrame:
+    rows = stratified_sample(
+        strata(merged_df, target_column, current_class), sample_size
+    )
+    pool_df = discover(
+        merged_df.iloc[rows],
+        search_space,
+        set_size * POOL_FACTOR,
+        current_class,
+        engine=engine,
+        # Partial results would only hold the statistics of the sample
+        progress=None
+        if progress is None
+        else SearchProgress(deadline=progress.deadline),
+    )
+    if pool_df.empty:
+        return pool_df
+
+    df_rules = rescore(merged_df, pool_df["subgroup"].tolist(), current_class, set_size)
+    from_sample = len(
+        set(df_rules["subgroup"]) & set(pool_df["subgroup"].iloc[:set_size])
+    )
+    print(
+        f"{from_sample} of the {len(df_rules)} subgroups of class '{current_class}' "
+        f"were already among the best {set_size} of the {len(rows)} rows sample"
+    )
+    return df_rules
+
+
+def create_sampled_search_space(  # noqa: PLR0913
+    merged_df: DataFrame,
+    errors_df: DataFrame,
+    target_column: str,
+    sample_size: int | None,
+    *,
+    bins: int = DEFAULT_BINS,
+    binning: str = BINNINGS[0],
+) -> list[ps.SelectorBase]:
+    # Discretizing a sample is much faster, and its cut points are about the same
+    if sample_size is not None:
+        merged_df = merged_df.iloc[
+            stratified_sample(strata(merged_df, target_column), sample_size)
+        ]
+    return create_search_space(
+        merged_df, errors_df, target_column, bins=bins, binning=binning
+    )
+
+
+def subgroup_discovery(  # noqa: PLR0913
+    dataset_df: DataFrame,
+    errors_df: DataFrame,
+    set_size: int,
+    target_column: str,
+    current_class: str,
+    *,
+    engine: str = "pysubgroup",
+    progress: SearchProgress | None = None,
+    sample_size: int | None = None,
+    search_space: list[ps.SelectorBase] | None = None,
+) -> DataFrame:
+    merged_df = merge_dataset_and_errors(dataset_df, errors_df)
+    if search_space is None:
+        search_space = create_sampled_search_space(
+            merged_df, errors_df, target_column, sample_size
+        )
+    if sample_size is not None:
+        return discover_sampled(
+            merged_df,
+            search_space,
+            set_size,
+            current_class,
+            target_column=target_column,
+            sample_size=sample_size,
+            engine=engine,
+            progress=progress,
+        )
+    return discover(
+        merged_df,
+        search_space,
+        set_size,
+        current_class,
+        engine=engine,
+        progress=progress,
+    )
+
+
+def _init_worker(
+    merged_df: DataFrame, search_space: list[dict], bits: NDArray[np.uint64] | None
+) -> None:
+    global _worker_merged_df, _worker_search_space, _worker_index  # noqa: PLW0603
+    _worker_merged_df = merged_df
+    _worker_search_space = [deserialize_selector(x) for x in search_space]
+    if bits is not None:
+        _worker_index = SelectorIndex(_worker_search_space, bits, len(merged_df))
+
+
+def _discover_in_worker(  # noqa: PLR0913
+    set_size: int,
+    current_class: str,
+    engine: str,
+    deadline: float | None,
+    *,
+    target_column: str,
+    sample_size: int | None,
+) -> DataFrame:
+    assert _worker_merged_df is not None
+    if sample_size is not None:
+        df_rules = discover_sampled(
+            _worker_merged_df,
+            _worker_search_space,
+            set_size,
+            current_class,
+            target_column=target_column,
+            sample_size=sample_size,
+            engine=engine,
+            progress=SearchProgress(deadline=deadline),
+        )
+    else:
+        df_rules = discover(
+            _worker_merged_df,
+            _worker_search_space,
+            set_size,
+            current_class,
+            engine=engine,
+            index=_worker_index,
+            progress=SearchProgress(deadline=deadline),
+        )
+    df_rules["subgroup"] = df_rules["subgroup"].apply(serialize_subgroup)
+    return df_rules
+
+
+# Discover the subgroups of several classes at once, one class per process. The dataset
+# is parsed and the search space is created only once, and then shared by every worker.
+# Each class is handed to on_result as soon as its search is over
+def subgroup_discovery_all_classes(  # noqa: PLR0913
+    dataset_df: DataFrame,
+    errors_df: DataFrame,
+    set_size: int,
+    target_column: str,
+    classes: list[str],
+    *,
+    engine: str = "pysubgroup",
+    deadline: float | None = None,
+    on_result: Callable[[str, DataFrame], None] | None = None,
+    sample_size: int | None = None,
+    search_space: list[ps.SelectorBase] | None = None,
+) -> dict[str, DataFrame]:
+    merged_df = merge_dataset_and_errors(dataset_df, errors_df)
+    if search_space is None:
+        search_space = create_sampled_search_space(
+            merged_df, errors_df, target_column, sample_size
+        )
+    # The selector coverages of the numpy engines are computed once here, not in every
+    # worker. With a sample, each class searches its own sample instead
+    bits = (
+        build_selector_index(merged_df, search_space).bits
+        if engine in {"numpy", "exhaustive"} and sample_size is None
+        else None
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=min(len(classes), os.cpu_count() or 1),
+        initializer=_init_worker,
+        initargs=(merged_df, [serialize_selector(x) for x in search_space], bits),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _discover_in_worker,
+                set_size,
+                current_class,
+                engine,
+                deadline,
+                target_column=target_column,
+                sample_size=sample_size,
+            ): current_class
+            for current_class in classes
+        }
+        results = {}
+        for future in as_completed(futures):
+            df_rules = future.result()
+            df_rules["subgroup"] = df_rules["subgroup"].apply(deserialize_subgroup)
+            # Each row was unpickled on its own, so gather them back into a single matrix
+            df_rules["covered"] = list(coverage_matrix(df_rules["covered"]))
+            results[futures[future]] = df_rules
+            if on_result is not None:
+                on_result(futures[future], df_rules)
+
+    return {x: results[x] for x in classes}
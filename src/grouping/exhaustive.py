@@ -0,0 +1,93 @@
+import numpy as np
+import pysubgroup as ps
+from numpy.typing import NDArray
+from pandas import DataFrame
+
+from src.grouping.beam import SelectorIndex, intersection_statistics, result_frame
+from src.grouping.coverage import popcount
+from src.grouping.lib import BidirectionalQFNumeric
+from src.grouping.progress import SearchProgress, expired, report
+
+# Number of selectors whose pairs are scored by each product
+_SELECTOR_BLOCK = 64
+
+
+# Upper bound of the quality of any subgroup inside each selector: no subset of its
+# coverage is larger, nor has a mean further from the dataset's than the extreme errors
+def optimistic_estimates(
+    index: SelectorIndex, errors: NDArray[np.float64], a: float
+) -> NDArray[np.float64]:
+    mean_dataset = np.mean(errors)
+    deviation = max(np.max(errors) - mean_dataset, mean_dataset - np.min(errors))
+    return popcount(index.bits).astype(float) ** a * deviation
+
+
+# Top subgroups made of two selectors on distinct attributes, out of every such pair.
+# Pairs are scored a block of selectors at a time from the products of their coverages,
+# and selectors are visited by decreasing optimistic estimate: a pair can't beat the
+# estimate of either of its selectors, so once the estimate of the next selector is no
+# better than the current top set_size qualities, no remaining pair can enter it
+def exhaustive_search(
+    index: SelectorIndex,
+    errors: NDArray[np.float64],
+    set_size: int,
+    a: float = 0.5,
+    *,
+    progress: SearchProgress | None = None,
+) -> DataFrame:
+    mean_dataset = np.mean(errors)
+    estimates = optimistic_estimates(index, errors, a)
+    order = np.argsort(-estimates, kind="stable")
+    attributes = np.unique(
+        [sel.attribute_name for sel in index.selectors], return_inverse=True
+    )[1]
+
+    # Best pairs so far, as positions in the index
+    qualities = np.empty(0)
+    pairs = np.empty((0, 2), dtype=np.int64)
+
+    def results() -> DataFrame:
+        result = []
+        selector_ids: dict[ps.Conjunction, tuple[int, ...]] = {}
+        for quality, (i, j) in zip(qualities, pairs, strict=True):
+            sg = ps.Conjunction([index.selectors[i], index.selectors[j]])
+            selector_ids[sg] = (i, j)
+            result.append((quality, sg))
+        return result_frame(index, errors, result, selector_ids)
+
+    n_active = len(order)
+    for start in range(0, len(order), _SELECTOR_BLOCK):
+        if len(qualities) == set_size:
+            # Selectors past n_active can't be in any pair of the top set anymore
+            n_active = int(np.sum(estimates[order] >= qualities.min()))
+        if start >= n_active or expired(progress):
+            break
+
+        left = order[start : min(start + _SELECTOR_BLOCK, n_active)]
+        right = order[start:n_active]
+        sizes, sums = intersection_statistics(
+            index.bits[left], index.bits[right], errors, index.n_rows
+        )
+        means = np.divide(sums, sizes, out=np.zeros(sums.shape), where=sizes > 0)
+        block_qualities = BidirectionalQFNumeric.bidirectional_qf_numeric(
+            a, mean_dataset, sizes, means
+        )
+
+        # Each pair once, skipping empty ones and pairs on the same attribute
+        valid = (
+            (np.arange(len(left))[:, None] < np.arange(len(right))[None, :])
+            & (sizes > 0)
+            & (attributes[left][:, None] != attributes[right][None, :])
+        )
+        i, j = np.nonzero(valid)
+        qualities = np.concatenate([qualities, block_qualities[i, j]])
+        pairs = np.concatenate(
+            [pairs, np.sort(np.column_stack([left[i], right[j]]), axis=1)]
+        )
+
+        # Keep the best, breaking ties by the position of the selectors in the index
+        best = np.lexsort((pairs[:, 1], pairs[:, 0], -qualities))[:set_size]
+        qualities, pairs = qualities[best], pairs[best]
+        report(progress, results)
+
+    return results()
@@ -3,6 +3,43 @@ import pysubgroup as ps
 from pandas import DataFrame
 
 
+def _to_builtin(value: object) -> object:
+    # numpy scalars (e.g. cut points found by pysubgroup) aren't JSON serializable
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def serialize_selector(selector: ps.SelectorBase) -> dict:
+    if isinstance(selector, ps.IntervalSelector):
+        return {
+            "attribute": selector.attribute_name,
+            "lower": _to_builtin(selector.lower_bound),
+            "upper": _to_builtin(selector.upper_bound),
+        }
+    if isinstance(selector, ps.EqualitySelector):
+        return {
+            "attribute": selector.attribute_name,
+            "value": _to_builtin(selector.attribute_value),
+        }
+    message = f"Can't serialize selector of type {type(selector).__name__}"
+    raise NotImplementedError(message)
+
+
+def deserialize_selector(data: dict) -> ps.SelectorBase:
+    if "value" in data:
+        return ps.EqualitySelector(data["attribute"], data["value"])
+    return ps.IntervalSelector(data["attribute"], data["lower"], data["upper"])
+
+
+# Selectors can't be reliably pickled (pysubgroup deletes the pickling state after the
+# first dump), so subgroups cross process and disk boundaries as plain dictionaries
+def serialize_subgroup(subgroup: ps.Conjunction) -> list[dict]:
+    return [serialize_selector(sel) for sel in subgroup.selectors]
+
+
+def deserialize_subgroup(data: list[dict]) -> ps.Conjunction:
+    return ps.Conjunction([deserialize_selector(sel) for sel in data])
+
+
 # Define a custom quality function for a bidirectional search over the model's errors
 class BidirectionalQFNumeric(ps.StandardQFNumeric):
     @staticmethod
@@ -0,0 +1,36 @@
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from pandas import DataFrame
+
+# Minimum time between two publications of partial results, in seconds
+PUBLISH_INTERVAL = 1.0
+
+
+# Hooks of an anytime search: the best subgroups found so far are handed to on_progress
+# at most once every PUBLISH_INTERVAL seconds, and the search stops once the deadline
+# (as returned by time.time, so it's shared by every process) has passed
+@dataclass
+class SearchProgress:
+    on_progress: Callable[[DataFrame], None] | None = None
+    deadline: float | None = None
+    last_published: float = field(default_factory=time.time)
+
+
+def expired(progress: SearchProgress | None) -> bool:
+    return (
+        progress is not None
+        and progress.deadline is not None
+        and time.time() >= progress.deadline
+    )
+
+
+# results is only called when a publication is due, as building the frame isn't free
+def report(progress: SearchProgress | None, results: Callable[[], DataFrame]) -> None:
+    if progress is None or progress.on_progress is None:
+        return
+    if time.time() - progress.last_published < PUBLISH_INTERVAL:
+        return
+    progress.on_progress(results())
+    progress.last_published = time.time()
@@ -0,0 +1,41 @@
+import numpy as np
+from numpy.typing import NDArray
+from pandas import DataFrame, Series
+from scipy.stats import kendalltau
+
+from src.grouping.beam import describe
+from src.grouping.lib import BidirectionalQFNumeric
+
+
+# The subgroups with their statistics and quality computed again on new errors. Their
+# coverages don't depend on the errors, so no selector is evaluated again. The order is
+# kept, so the ranking can be compared with the one before
+def rescore_subgroups(
+    subgroups_df: DataFrame, errors: NDArray[np.float64], a: float = 0.5
+) -> DataFrame:
+    if subgroups_df.empty:
+        return subgroups_df
+
+    statistics = DataFrame(
+        [describe(x, errors, len(errors)) for x in subgroups_df["covered"]],
+        index=subgroups_df.index,
+    )
+    rescored_df = subgroups_df.copy()
+    rescored_df[statistics.columns] = statistics
+    rescored_df["quality"] = BidirectionalQFNumeric.bidirectional_qf_numeric(
+        a,
+        statistics["mean_dataset"].to_numpy(),
+        statistics["size_sg"].to_numpy(),
+        statistics["mean_sg"].to_numpy(),
+    )
+    return rescored_df
+
+
+# Fraction of the pairs of subgroups whose order by quality changed, from 0 when the
+# ranking is the same to 1 when it's reversed
+def ranking_shift(before: Series, after: Series) -> float:
+    if len(before) < 2:  # noqa: PLR2004
+        return 0.0
+    tau = kendalltau(before, after).statistic
+    # Constant qualities have no order to shift
+    return 0.0 if np.isnan(tau) else float((1 - tau) / 2)
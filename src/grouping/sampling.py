@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pysubgroup as ps
+from numpy.typing import NDArray
+from pandas import DataFrame
+
+from src.grouping.beam import (
+    build_selector_index,
+    coverage_of,
+    intersection_statistics,
+    result_frame,
+)
+from src.grouping.coverage import pack
+from src.grouping.lib import BidirectionalQFNumeric
+
+# Candidates found on the sample and rescored on the full data, per subgroup of the result
+POOL_FACTOR = 5
+# Continuous errors are stratified by this many quantiles
+ERROR_BINS = 10
+
+
+# Stratum of every row: its class, and optionally the bin of its error for current_class.
+# Rows without a class are a stratum of their own
+def strata(
+    merged_df: DataFrame, target_column: str, current_class: str | None = None
+) -> NDArray[np.int64]:
+    codes = pd.factorize(merged_df[target_column], use_na_sentinel=False)[0].astype(
+        np.int64
+    )
+    if current_class is None:
+        return codes
+
+    errors = merged_df[current_class].to_numpy(dtype=float)
+    values = np.unique(errors)
+    if len(values) <= ERROR_BINS:
+        bins = np.searchsorted(values, errors)
+    else:
+        edges = np.quantile(errors, np.linspace(0, 1, ERROR_BINS + 1)[1:-1])
+        bins = np.searchsorted(edges, errors, side="right")
+    return codes * (ERROR_BINS + 1) + bins
+
+
+# Positions of about size rows, drawn from each stratum in proportion to its size, but at
+# least one from each. Rows get a random key within their stratum, and the ones with the
+# smallest keys are taken, so a single sort draws every stratum at once
+def stratified_sample(
+    row_strata: NDArray[np.int64], size: int, seed: int = 0
+) -> NDArray[np.int64]:
+    n_rows = len(row_strata)
+    if size >= n_rows:
+        return np.arange(n_rows)
+
+    counts = np.bincount(row_strata)
+    quotas = np.maximum(np.round(counts * size / n_rows), counts > 0).astype(np.int64)
+
+    keys = row_strata + np.random.default_rng(seed).random(n_rows)
+    order = np.argsort(keys)
+    ranks = np.arange(n_rows) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.sort(order[ranks < np.repeat(quotas, counts)])
+
+
+# Exact quality and statistics of the candidates on the full data, keeping the best
+# set_size. The coverages of every candidate are built from the bitsets of their
+# selectors, and scored together by a single product over the rows
+def rescore(
+    merged_df: DataFrame,
+    candidates: list[ps.Conjunction],
+    current_class: str,
+    set_size: int,
+    a: float = 0.5,
+) -> DataFrame:
+    selectors = list(dict.fromkeys(x for sg in candidates for x in sg.selectors))
+    index = build_selector_index(merged_df, selectors)
+    positions = {x: i for i, x in enumerate(selectors)}
+    selector_ids = {
+        sg: tuple(positions[x] for x in sg.selectors)
+        for sg in dict.fromkeys(candidates)
+    }
+    candidates = list(selector_ids)
+
+    errors = merged_df[current_class].to_numpy(dtype=float)
+    sizes, sums = intersection_statistics(
+        pack(np.ones(index.n_rows, dtype=bool)),
+        np.vstack([coverage_of(index, selector_ids[sg]) for sg in candidates]),
+        errors,
+        index.n_rows,
+    )
+    means = np.divide(sums, sizes, out=np.zeros(sums.shape), where=sizes > 0)
+    qualities = BidirectionalQFNumeric.bidirectional_qf_numeric(
+        a, np.mean(errors), sizes, means
+    )[0]
+
+    best = np.argsort(-qualities, kind="stable")[:set_size]
+    return result_frame(
+        index,
+        errors,
+        [(qualities[i], candidates[i]) for i in best],
+        selector_ids,
+    )
@@ -0,0 +1,29 @@
+from dash import Input, Output, callback
+from dash.dcc import Dropdown
+from dash.html import Div
+
+
+@callback(Output("title", "children"), Input("class-dropdown", "value"))
+def update_title(current_class: str) -> str:
+    return f"Uncertainty Regions for {current_class}"
+
+
+def class_dropdown(classes: list[str]) -> Div:
+    return Div(
+        className="flex justify-center mb-6",
+        # There's nothing to switch between when a single class was analyzed
+        style={"display": "none"} if len(classes) == 1 else {},
+        children=[
+            Div(
+                className="w-[30%]",
+                children=[
+                    Dropdown(
+                        id="class-dropdown",
+                        options=classes,
+                        value=classes[0],
+                        clearable=False,
+                    ),
+                ],
+            ),
+        ],
+    )
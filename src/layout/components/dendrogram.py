@@ -1,39 +1,165 @@
+import weakref
+from dataclasses import dataclass
+
 import numpy as np
 import plotly.figure_factory as ff
 from numpy.typing import NDArray
 from pandas import DataFrame
 from plotly.graph_objs import Figure
-from sklearn.cluster import AgglomerativeClustering
 
 from src.colors import CRUST, WHITE
-from src.layout.components.util import get_clustering
+from src.grouping.clustering import get_linkage
+from src.metrics import timed
 
+# Larger dendrograms only draw their last merges, and each cluster left before them is
+# drawn as a single leaf, labelled by its best subgroup and the number of the others
+MAX_DENDROGRAM_LEAVES = 100
 
-def get_linkage_matrix(clustering: AgglomerativeClustering) -> NDArray:
-    counts = np.zeros(clustering.children_.shape[0])
-    n_samples = len(clustering.labels_)
-    for i, merge in enumerate(clustering.children_):
-        current_count = 0
-        for child_idx in merge:
-            if child_idx < n_samples:
-                current_count += 1
-            else:
-                current_count += counts[child_idx - n_samples]
-        counts[i] = current_count
 
-    return np.column_stack([clustering.children_, clustering.distances_, counts])
+# Representative subgroups left by each threshold. Merges are applied in order up to the
+# first one farther than the threshold, so the number of merges applied is found by
+# bisecting the running maximum of their distances. Every merge keeps the subgroup of
+# higher quality as the representative of the new cluster: a subgroup is shown once it
+# has won a merge (its birth) and until it loses one (its death), and is never shown
+# when it has won none. Levels are numbers of merges applied
+@dataclass
+class ThresholdCuts:
+    levels: NDArray[np.float64]
+    births: NDArray[np.int64]
+    deaths: NDArray[np.int64]
 
 
-def generate_dendrogram_figure(
-    subgroups_df: DataFrame, pos_x: float | None
-) -> tuple[Figure, float, float]:
-    clustering, normal_matrix = get_clustering(subgroups_df)
-    linkage_matrix = get_linkage_matrix(clustering)
+@dataclass
+class Dendrogram:
+    linkage_matrix: NDArray
+    cuts: ThresholdCuts
+    figure: Figure  # without the threshold line
+    min_x: float
+    max_x: float
+
+
+# Dendrograms already built, by the id of their subgroups frame. The weak reference
+# guards against reused ids, and its callback evicts the entry once the frame is gone
+_dendrograms: dict[int, tuple[weakref.ref, Dendrogram]] = {}
+
+
+# Subgroups kept and replaced by each merge: the one of higher quality is kept, and
+# represents the new cluster
+def merge_representatives(
+    linkage_matrix: NDArray, qualities: NDArray[np.float64]
+) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    n_samples = len(linkage_matrix) + 1
+    winners = np.empty(len(linkage_matrix), dtype=np.int64)
+    losers = np.empty(len(linkage_matrix), dtype=np.int64)
+    for i, children in enumerate(linkage_matrix[:, :2].astype(np.int64)):
+        j, k = (x if x < n_samples else winners[x - n_samples] for x in children)
+        winners[i], losers[i] = (j, k) if qualities[j] > qualities[k] else (k, j)
+    return winners, losers
+
+
+def threshold_cuts(
+    linkage_matrix: NDArray, qualities: NDArray[np.float64]
+) -> ThresholdCuts:
+    n_merges = len(linkage_matrix)
+    never = n_merges + 1
+    births = np.full(n_merges + 1, never)
+    deaths = np.full(n_merges + 1, never)
+
+    winners, losers = merge_representatives(linkage_matrix, qualities)
+    levels = np.arange(1, n_merges + 1)
+    # Only the first win of a subgroup counts, and a subgroup loses at most once
+    np.minimum.at(births, winners, levels)
+    deaths[losers] = levels
+
+    return ThresholdCuts(np.maximum.accumulate(linkage_matrix[:, 2]), births, deaths)
+
+
+# Positions of the subgroups shown at the threshold
+def surviving_subgroups(cuts: ThresholdCuts, pos_x: float) -> NDArray[np.intp]:
+    level = np.searchsorted(cuts.levels, pos_x, side="right")
+    return np.flatnonzero((cuts.births <= level) & (level < cuts.deaths))
+
+
+# Linkage of the last n_leaves - 1 merges, whose leaves are the clusters formed by the
+# merges before them, and the labels of those clusters
+def truncate_linkage(
+    linkage_matrix: NDArray,
+    labels: list[str],
+    qualities: NDArray[np.float64],
+    n_leaves: int,
+) -> tuple[NDArray, list[str]]:
+    n_samples = len(labels)
+    n_collapsed = n_samples - n_leaves
+    winners = merge_representatives(linkage_matrix, qualities)[0]
+
+    kept = linkage_matrix[n_collapsed:].copy()
+    children = kept[:, :2].astype(np.int64)
+    # Nodes formed before the kept merges are the new leaves
+    leaves = children[children < n_samples + n_collapsed]
+    # Leaves are numbered first, then the kept merges, as scipy expects
+    node_ids = np.empty(n_samples + len(linkage_matrix), dtype=np.int64)
+    node_ids[leaves] = np.arange(n_leaves)
+    node_ids[n_samples + n_collapsed :] = np.arange(n_leaves, len(kept) + n_leaves)
+    kept[:, :2] = node_ids[children]
+
+    leaf_labels = []
+    for node in leaves:
+        if node < n_samples:
+            leaf_labels.append(labels[node])
+            continue
+        merge = node - n_samples
+        size = int(linkage_matrix[merge, 3])
+        leaf_labels.append(f"{labels[winners[merge]]} (+{size - 1})")
+    return kept, leaf_labels
+
+
+def threshold_line(pos_x: float) -> dict:
+    return {
+        "type": "line",
+        "x0": pos_x,
+        "x1": pos_x,
+        "xref": "x",
+        "y0": 0,
+        "y1": 1,
+        "yref": "y domain",
+        "line": {"color": WHITE, "width": 4},
+    }
+
+
+def style_dendrogram_figure(fig: Figure) -> None:
+    fig.update_layout(
+        title="<b>COVERAGE DIFFERENCE BETWEEN SUBGROUPS</b>",
+        title_x=0.5,
+        width=800,
+        height=600,
+        plot_bgcolor=CRUST,
+        paper_bgcolor="rgba(0,0,0,0)",
+        font_color=WHITE,
+        margin={"l": 0, "r": 0, "t": 30, "b": 0},
+    )
+
 
+# Subgroups still being discovered, or too few of them, can't be clustered
+def has_dendrogram(subgroups_df: DataFrame | None) -> bool:
+    return subgroups_df is not None and len(subgroups_df) > 1
+
+
+def build_dendrogram(subgroups_df: DataFrame, linkage_matrix: NDArray) -> Dendrogram:
+    qualities = subgroups_df["quality"].to_numpy(dtype=float)
+    labels = subgroups_df["subgroup"].astype(str).tolist()
+
+    shown_linkage, shown_labels = linkage_matrix, labels
+    if len(labels) > MAX_DENDROGRAM_LEAVES:
+        shown_linkage, shown_labels = truncate_linkage(
+            linkage_matrix, labels, qualities, MAX_DENDROGRAM_LEAVES
+        )
+
+    # The linkage is already known, so the observations are placeholders, only their
+    # number is used
     fig = ff.create_dendrogram(
-        X=normal_matrix,
+        X=np.empty((len(shown_labels), 1)),
         orientation="left",
-        labels=subgroups_df["subgroup"].astype(str).tolist(),
+        labels=shown_labels,
         colorscale=[
             "#89b4fa",
             "#f9e2af",
@@ -44,24 +170,59 @@ def generate_dendrogram_figure(
             "#eba0ac",
             "#cba6f7",
         ],
-        linkagefun=lambda _: linkage_matrix,
+        distfun=lambda _: None,
+        linkagefun=lambda _: shown_linkage,
     )
 
-    if pos_x is not None:
-        fig.add_vline(x=pos_x, line_width=4, line_color=WHITE)
+    style_dendrogram_figure(fig)
+    min_x = min(linkage_matrix[:, 2])
+    max_x = max(linkage_matrix[:, 2])
+    fig.update_xaxes(range=[max(min_x - 0.1, 0), max_x + 0.05], showticklabels=True)
 
-    fig.update_layout(
-        title="<b>COVERAGE DIFFERENCE BETWEEN SUBGROUPS</b>",
-        title_x=0.5,
-        width=800,
-        height=600,
-        plot_bgcolor=CRUST,
-        paper_bgcolor="rgba(0,0,0,0)",
-        font_color=WHITE,
-        margin={"l": 0, "r": 0, "t": 30, "b": 0},
+    cuts = threshold_cuts(linkage_matrix, qualities)
+
+    return Dendrogram(linkage_matrix, cuts, fig, min_x, max_x)
+
+
+def _remember(subgroups_df: DataFrame, dendrogram: Dendrogram) -> Dendrogram:
+    key = id(subgroups_df)
+    _dendrograms[key] = (
+        weakref.ref(subgroups_df, lambda _: _dendrograms.pop(key, None)),
+        dendrogram,
     )
-    min_x = min(clustering.distances_)
-    max_x = max(clustering.distances_)
-    fig.update_xaxes(range=[max(min_x - 0.1, 0), max_x + 0.05], showticklabels=True)
+    return dendrogram
+
+
+# Clustering a subgroup set is expensive, so it's done once and shared by every callback
+def get_dendrogram(subgroups_df: DataFrame) -> Dendrogram:
+    key = id(subgroups_df)
+    if key in _dendrograms:
+        ref, dendrogram = _dendrograms[key]
+        if ref() is subgroups_df:
+            return dendrogram
+
+    with timed("dendrogram"):
+        dendrogram = build_dendrogram(subgroups_df, get_linkage(subgroups_df))
+    return _remember(subgroups_df, dendrogram)
+
+
+# Subgroups loaded along with their clustering, as from a store, skip computing it
+def add_dendrogram(subgroups_df: DataFrame, linkage_matrix: NDArray) -> None:
+    _remember(subgroups_df, build_dendrogram(subgroups_df, linkage_matrix))
+
+
+def generate_dendrogram_figure(
+    subgroups_df: DataFrame | None, pos_x: float | None
+) -> tuple[Figure, float, float]:
+    if not has_dendrogram(subgroups_df):
+        fig = Figure()
+        style_dendrogram_figure(fig)
+        return fig, 0.0, 1.0
+
+    dendrogram = get_dendrogram(subgroups_df)
+
+    fig = Figure(dendrogram.figure)
+    if pos_x is not None:
+        fig.add_shape(threshold_line(pos_x))
 
-    return fig, min_x, max_x
+    return fig, dendrogram.min_x, dendrogram.max_x
@@ -1,54 +1,140 @@
-from dash import Input, Output, State, callback
+from dash import Input, Output, Patch, State, callback, ctx
 from dash.dash import PreventUpdate
 from dash.dcc import Dropdown
 from dash.html import Button, Div
-from pandas import DataFrame
 from plotly.graph_objs import Figure
 
-from src.layout.components.graph import plot_graph_and_subgroups
+from src.grouping.comparison import model_view
+from src.layout.components.graph import (
+    FigureCache,
+    cached_figure,
+    patch_subgroups,
+    render_graph_and_subgroups,
+)
+from src.layout.components.subgroups.geometry import get_geometry, subgroup_shapes
+from src.metrics import timed_callback
+from src.state import DiscoveryState
 
 
-def subgroups_dropdown(
-    dataset_with_errors_df: DataFrame,
-    subgroups_df: DataFrame,
-    target_column: str,
-) -> Div:
+@callback(Output("subgroups-dropdown", "value"), Input("class-dropdown", "value"))
+@timed_callback
+def clear_selected_subgroups(_: str) -> list[str]:
+    return []
+
+
+def subgroups_dropdown(state: DiscoveryState, figure_cache: FigureCache) -> Div:
+    models = list(state.frames.dataset_with_errors_by_model)
+
     @callback(
         Output("subgroups-plot", "figure"),
+        Output("subgroups-plot-axes", "data"),
+        Output("subgroups-plot-model", "data"),
+        Output("subgroups-plot-generation", "data"),
         Input("plot-subgroups-button", "n_clicks"),
+        Input("model-dropdown", "value"),
         State("subgroups-dropdown", "value"),
+        State("class-dropdown", "value"),
+        State("subgroups-plot-axes", "data"),
+        State("subgroups-plot-model", "data"),
+        State("subgroups-plot-generation", "data"),
     )
-    def click_plot_subgroups(
-        n_clicks: int, selected_subgroups: list[str]
-    ) -> Div | Figure | None:
-        # prevents first update, i.e., should only update on the click of the button
-        if n_clicks is None:
-            raise PreventUpdate
+    @timed_callback
+    def click_plot_subgroups(  # noqa: PLR0913, PLR0917
+        n_clicks: int,
+        model: str,
+        selected_subgroups: list[str],
+        current_class: str,
+        plotted_axes: list[str],
+        plotted_model: str,
+        plotted_generation: int,
+    ) -> tuple[Figure | Patch, list[str], str, int]:
+        subgroups_df = state.subgroups_by_class.get(current_class)
+        # Read once, so the rows and points always come from the same inputs
+        frames = state.frames
+        geometry_df = (
+            None if subgroups_df is None else get_geometry(subgroups_df, frames.axes)
+        )
 
-        # if selected subgroups is empty we do nothing on the press of the button
-        if len(selected_subgroups) == 0:
-            raise PreventUpdate
+        # The points change with the model, so the plot is drawn again on its axes, with
+        # the selected subgroups that are on them
+        if ctx.triggered_id == "model-dropdown":
+            axes = plotted_axes
+            if geometry_df is None:
+                selected_subgroups = []
+            else:
+                x, y = geometry_df["x_column"], geometry_df["y_column"]
+                on_axes = ((x == axes[0]) & (y == axes[1])) | (
+                    (x == axes[1]) & (y == axes[0])
+                )
+                labels = geometry_df["label"]
+                selected_subgroups = labels[
+                    on_axes & labels.isin(selected_subgroups)
+                ].tolist()
+        else:
+            # prevents first update, i.e., should only update on the click of the button
+            if n_clicks is None:
+                raise PreventUpdate
 
-        selected_subgroup_rows = subgroups_df["subgroup"].apply(
-            lambda x: str(x) in selected_subgroups
-        )
+            # if selected subgroups is empty we do nothing on the press of the button
+            if len(selected_subgroups) == 0:
+                raise PreventUpdate
 
-        first_subgroup_filter = subgroups_df["subgroup"].apply(
-            lambda x: str(x) == selected_subgroups[0]
-        )
-        first_subgroup = subgroups_df.loc[first_subgroup_filter]
+            if geometry_df is None:
+                raise PreventUpdate
 
-        columns = first_subgroup.iloc[0].to_dict()
+            first_subgroup = geometry_df[geometry_df["label"] == selected_subgroups[0]]
+            # The subgroup may have been replaced since it was selected, by newer results
+            if first_subgroup.empty:
+                raise PreventUpdate
 
-        return plot_graph_and_subgroups(
-            dataset_with_errors_df,
-            columns["x_column"],
-            columns["y_column"],
-            subgroups_df.loc[
-                selected_subgroup_rows, ["subgroup", "mean_sg", "mean_dataset"]
-            ],
-            target_column,
+            axes = first_subgroup.iloc[0][["x_column", "y_column"]].tolist()
+
+        dataset_with_errors_df = frames.dataset_with_errors_by_model[model]
+        selected_subgroups_df = None
+        if len(selected_subgroups) > 0:
+            selected_rows = geometry_df["label"].isin(selected_subgroups)
+            selected_subgroups_df = subgroup_shapes(
+                geometry_df[selected_rows],
+                model_view(subgroups_df, models, model)[selected_rows],
+                axes[0],
+            )
+
+        # The points are already plotted on these axes, from the inputs being served, so
+        # only the subgroups change
+        if (
+            axes == plotted_axes
+            and model == plotted_model
+            and frames.generation == plotted_generation
+            and selected_subgroups_df is not None
+        ):
+            return (
+                patch_subgroups(*axes, selected_subgroups_df),
+                axes,
+                model,
+                frames.generation,
+            )
+
+        # The statistics of a subgroup depend on the class and model its errors come from,
+        # and on the inputs they were read from
+        key = (
+            *axes,
+            current_class,
+            model,
+            frozenset(selected_subgroups),
+            frames.generation,
+        )
+        fig = cached_figure(
+            figure_cache,
+            key,
+            lambda: render_graph_and_subgroups(
+                dataset_with_errors_df,
+                frames.rows,
+                *axes,
+                selected_subgroups_df,
+                axes=frames.axes,
+            ),
         )
+        return fig, axes, model, frames.generation
 
     return Div(
         className="mt-6 flex items-center place-content-center",
@@ -1,27 +1,83 @@
-from dash.dcc import Graph
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from threading import Lock
+
+import numpy as np
+from dash import Patch
+from dash.dcc import Graph, Store
 from dash.html import Div
+from numpy.typing import NDArray
 from pandas import DataFrame
+from pandas.api.types import is_numeric_dtype
 from plotly.graph_objs import Figure
 
-from src.colors import BACKGROUND, CRUST, GREEN, MANTLE, RED, WHITE
-from src.layout.components.subgroups.util import extract_subgroup_limits
+from src.colors import BACKGROUND, CRUST, MANTLE, WHITE
+from src.layout.components.subgroups.geometry import Axis
 
 RECTANGLE_LINE_WIDTH = 2.5
+# Above this many points, the scatter is drawn with WebGL
+SCATTERGL_THRESHOLD = 20_000
+# Above this many points, they are binned into a grid on the server, and each class is
+# drawn as a heatmap of its mean error, so the figure's size no longer depends on the rows
+HEATMAP_THRESHOLD = 500_000
+GRID_SIZE = 200
+
+# Positions of the rows of each class, in the order the classes first appear
+ClassRows = dict[str, NDArray[np.intp]]
+
+
+# Most recently plotted figures. Callbacks run in several threads, hence the lock
+@dataclass
+class FigureCache:
+    size: int
+    figures: OrderedDict[Hashable, Figure] = field(default_factory=OrderedDict)
+    hits: int = 0
+    misses: int = 0
+    lock: Lock = field(default_factory=Lock)
+
+
+def cached_figure(
+    cache: FigureCache, key: Hashable, render: Callable[[], Figure]
+) -> Figure:
+    with cache.lock:
+        fig = cache.figures.get(key)
+        if fig is not None:
+            cache.hits += 1
+            cache.figures.move_to_end(key)
+            return fig
+        cache.misses += 1
+
+    fig = render()
+    with cache.lock:
+        cache.figures[key] = fig
+        while len(cache.figures) > cache.size:
+            cache.figures.popitem(last=False)
+    return fig
 
 
-def plot_graph_and_subgroups(
+def class_rows(dataset_df: DataFrame, target_column: str) -> ClassRows:
+    indices = dataset_df.groupby(target_column, observed=True, sort=False).indices
+    return {x: indices[x] for x in dataset_df[target_column].dropna().unique()}
+
+
+def plot_graph_and_subgroups(  # noqa: PLR0913
     dataset_with_errors_df: DataFrame,
+    rows: ClassRows,
     x_column: str,
     y_column: str,
     subgroups: DataFrame | None,
-    target_column: str = "target",
+    *,
+    axes: dict[str, Axis] | None = None,
+    generation: int = 0,
 ) -> Figure | Div:
     fig = render_graph_and_subgroups(
         dataset_with_errors_df,
+        rows,
         x_column,
         y_column,
-        target_column,
         subgroups,
+        axes=axes,
     )
 
     # First plot should create html.Div with no plot
@@ -34,6 +90,10 @@ def plot_graph_and_subgroups(
                     figure=fig,
                     className="w-[80%] aspect-[2]",
                 ),
+                # Axes of the points in the plot, which only change with a new figure
+                Store(id="subgroups-plot-axes", data=[x_column, y_column]),
+                # Generation of the inputs its points were read from
+                Store(id="subgroups-plot-generation", data=generation),
             ],
         )
 
@@ -41,12 +101,14 @@ def plot_graph_and_subgroups(
     return fig
 
 
-def render_graph_and_subgroups(
+def render_graph_and_subgroups(  # noqa: PLR0913
     dataset_with_errors_df: DataFrame,
+    rows: ClassRows,
     x_column: str,
     y_column: str,
-    target_column: str,
     subgroups: DataFrame | None,
+    *,
+    axes: dict[str, Axis] | None = None,
 ) -> Figure:
     colors_list = [
         ["#89b4fa", "#1e66f5"],
@@ -59,24 +121,50 @@ def render_graph_and_subgroups(
         ["#eba0ac", "#e64553"],
     ]
     fig = Figure()
-    for class_index, class_name in enumerate(
-        dataset_with_errors_df[target_column].unique()
-    ):
-        class_df = dataset_with_errors_df.query(f"{target_column} == '{class_name}'")
-        errors = class_df[class_name].tolist()
-        colors = colors_list[class_index % len(colors_list)]
-        fig.add_scatter(
-            x=class_df[x_column],
-            y=class_df[y_column],
-            name=f"{class_name}",
-            text=errors,
-            mode="markers",
-            marker={
-                "size": 10,
-                "color": errors,
-                "colorscale": colors,
-            },
+    n_points = len(dataset_with_errors_df)
+    binned = n_points > HEATMAP_THRESHOLD and all(
+        is_numeric_dtype(dataset_with_errors_df[x]) for x in (x_column, y_column)
+    )
+    # Arrays are validated by plotly as a whole, lists one element at a time
+    x_values = dataset_with_errors_df[x_column].to_numpy(
+        dtype=float if binned else None
+    )
+    y_values = dataset_with_errors_df[y_column].to_numpy(
+        dtype=float if binned else None
+    )
+    edges = (bin_edges(x_values), bin_edges(y_values)) if binned else None
+
+    if edges is not None:
+        add_binned_errors(
+            fig,
+            dataset_with_errors_df,
+            rows,
+            x_values,
+            y_values,
+            edges,
+            colors=colors_list[0],
         )
+    else:
+        for class_index, (class_name, positions) in enumerate(rows.items()):
+            errors = dataset_with_errors_df[class_name].to_numpy()[positions]
+            colors = colors_list[class_index % len(colors_list)]
+
+            # WebGL draws many points much faster than SVG, but SVG looks better when few
+            add_scatter = (
+                fig.add_scattergl if n_points > SCATTERGL_THRESHOLD else fig.add_scatter
+            )
+            add_scatter(
+                x=x_values[positions],
+                y=y_values[positions],
+                name=f"{class_name}",
+                text=errors,
+                mode="markers",
+                marker={
+                    "size": 10,
+                    "color": errors,
+                    "colorscale": colors,
+                },
+            )
 
     fig.update_xaxes(
         title=x_column, gridcolor=MANTLE, zerolinecolor=MANTLE, zerolinewidth=3
@@ -85,12 +173,8 @@ def render_graph_and_subgroups(
         title=y_column, gridcolor=MANTLE, zerolinecolor=MANTLE, zerolinewidth=3
     )
 
-    title_warning = ""
-    if subgroups is None:
-        title_warning = " (none selected)"
-
     fig.update_layout(
-        title=f"<b>Subgroups for {x_column} × {y_column}</b>{title_warning}",  # noqa: RUF001
+        title=plot_title(x_column, y_column, subgroups),
         title_x=0.5,
         font_color=WHITE,
         plot_bgcolor=CRUST,
@@ -98,73 +182,136 @@ def render_graph_and_subgroups(
         margin={"l": 0, "r": 0, "t": 30, "b": 0},
     )
 
+    # Categories are placed as the subgroups' geometry expects
+    if axes is not None:
+        for column, update_axes in (
+            (x_column, fig.update_xaxes),
+            (y_column, fig.update_yaxes),
+        ):
+            categories = axes[column].categories
+            if categories is not None:
+                update_axes(categoryorder="array", categoryarray=categories)
+
     # if subgroup is None, plot only the data
     if subgroups is None:
         return fig
 
-    render_subgroups(subgroups, dataset_with_errors_df, x_column, fig)
+    shapes, annotations = subgroup_layout(subgroups)
+    fig.update_layout(shapes=shapes, annotations=annotations)
 
     return fig
 
 
-def render_subgroups(
-    subgroups: DataFrame,
-    dataset_df: DataFrame,
-    x_column: str,
+def plot_title(x_column: str, y_column: str, subgroups: DataFrame | None) -> str:
+    title_warning = ""
+    if subgroups is None:
+        title_warning = " (none selected)"
+
+    return f"<b>Subgroups for {x_column} × {y_column}</b>{title_warning}"  # noqa: RUF001
+
+
+# Replaces the subgroups of a plot whose points are on the same axes, leaving the
+# points as they are, so the update grows with the subgroups rather than the rows
+def patch_subgroups(x_column: str, y_column: str, subgroups: DataFrame) -> Patch:
+    shapes, annotations = subgroup_layout(subgroups)
+
+    patch = Patch()
+    patch["layout"]["title"]["text"] = plot_title(x_column, y_column, subgroups)
+    patch["layout"]["shapes"] = shapes
+    patch["layout"]["annotations"] = annotations
+    return patch
+
+
+def bin_edges(values: NDArray[np.float64]) -> NDArray[np.float64]:
+    return np.linspace(np.nanmin(values), np.nanmax(values), GRID_SIZE + 1)
+
+
+# A single grid for every class, so classes sharing a cell don't hide one another: each
+# cell shows the mean error of all its rows, each on the errors of its own class, and its
+# hover tells how many rows it holds and which class most of them are of. Empty cells are
+# left blank
+def add_binned_errors(  # noqa: PLR0913, PLR0917
     fig: Figure,
+    dataset_with_errors_df: DataFrame,
+    rows: ClassRows,
+    x: NDArray[np.float64],
+    y: NDArray[np.float64],
+    edges: tuple[NDArray[np.float64], NDArray[np.float64]],
+    *,
+    colors: list[str],
 ) -> None:
-    for subgroups_tuple in subgroups.itertuples(index=False):
-        subgroup, mean_subgroup, mean_dataset = subgroups_tuple
-
-        rule1, rule2, attribute = extract_subgroup_limits(subgroup, dataset_df)
-
-        color = RED if mean_subgroup > mean_dataset else GREEN
-
-        if attribute == x_column:
-            x_init = rule1.lower
-            y_init = rule2.lower
-            width = rule1.upper - rule1.lower
-            height = rule2.upper - rule2.lower
-        else:
-            x_init = rule2.lower
-            y_init = rule1.lower
-            width = rule2.upper - rule2.lower
-            height = rule1.upper - rule1.lower
-
-        fig.add_shape(
-            type="rect",
-            x0=x_init,
-            y0=y_init,
-            x1=x_init + width,
-            y1=y_init + height,
-            line={
-                "color": color,
-                "width": RECTANGLE_LINE_WIDTH,
-            },
-        )
-        fig.add_annotation(
-            x=x_init,
-            y=y_init,
-            text=f"<b>{round(mean_subgroup, 4)}</b>",
-            bgcolor=BACKGROUND,
-            showarrow=False,
-            xanchor="right",
-            yanchor="top",
-        )
-        fig.add_annotation(
-            x=x_init + width,
-            y=y_init + height,
-            text=f"<b>{round(mean_dataset, 4)}</b>",
-            bgcolor=BACKGROUND,
-            showarrow=False,
-            xanchor="left",
-            yanchor="bottom",
-        )
-        fig.add_annotation(
-            x=x_init + width / 2,
-            y=y_init + height / 2,
-            text=f"<b>{subgroup!s}</b>",
-            bgcolor=BACKGROUND,
-            opacity=0.5,
-            showarrow=False,
+    x_edges, y_edges = edges
+    class_counts = np.zeros((len(rows), GRID_SIZE, GRID_SIZE))
+    sums = np.zeros((GRID_SIZE, GRID_SIZE))
+    for i, (class_name, positions) in enumerate(rows.items()):
+        errors = dataset_with_errors_df[class_name].to_numpy(dtype=float)[positions]
+        class_x, class_y = x[positions], y[positions]
+        class_counts[i] = np.histogram2d(class_x, class_y, bins=edges)[0]
+        sums += np.histogram2d(class_x, class_y, bins=edges, weights=errors)[0]
+    counts = class_counts.sum(axis=0)
+    means = np.divide(sums, counts, out=np.full(counts.shape, np.nan), where=counts > 0)
+    names = np.array([str(x) for x in rows], dtype=object)
+    dominant = np.where(counts > 0, names[class_counts.argmax(axis=0)], None)
+
+    fig.add_heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        # Heatmaps are indexed by row (y) first
+        z=means.T,
+        customdata=np.dstack([counts.T.astype(np.int64), dominant.T]),
+        name="mean error",
+        colorscale=colors,
+        colorbar={"title": "mean error"},
+        hovertemplate="%{z:.4f} mean error over %{customdata[0]} points, mostly of "
+        "%{customdata[1]}<extra></extra>",
+    )
+
+
+# Rectangles and annotations of the subgroups, as plotly layout objects. Subgroups on
+# values absent from the dataset have no bounds, and aren't drawn
+def subgroup_layout(shapes_df: DataFrame) -> tuple[list[dict], list[dict]]:
+    shapes = []
+    annotations = []
+    drawn = shapes_df.dropna(subset=["x0", "x1", "y0", "y1"])
+    for x0, x1, y0, y1, label, mean_sg, mean_dataset, color in drawn.itertuples(
+        index=False
+    ):
+        shapes.append(
+            {
+                "type": "rect",
+                "x0": x0,
+                "y0": y0,
+                "x1": x1,
+                "y1": y1,
+                "line": {"color": color, "width": RECTANGLE_LINE_WIDTH},
+            }
         )
+        annotations += [
+            {
+                "x": x0,
+                "y": y0,
+                "text": f"<b>{round(mean_sg, 4)}</b>",
+                "bgcolor": BACKGROUND,
+                "showarrow": False,
+                "xanchor": "right",
+                "yanchor": "top",
+            },
+            {
+                "x": x1,
+                "y": y1,
+                "text": f"<b>{round(mean_dataset, 4)}</b>",
+                "bgcolor": BACKGROUND,
+                "showarrow": False,
+                "xanchor": "left",
+                "yanchor": "bottom",
+            },
+            {
+                "x": (x0 + x1) / 2,
+                "y": (y0 + y1) / 2,
+                "text": f"<b>{label}</b>",
+                "bgcolor": BACKGROUND,
+                "opacity": 0.5,
+                "showarrow": False,
+            },
+        ]
+    return shapes, annotations
@@ -0,0 +1,43 @@
+from dash import dcc
+from dash.dcc import Dropdown, RadioItems
+from dash.html import Div
+
+from src.colors import WHITE
+
+# Values of the model view: the statistics of the selected model, or their difference
+# from those of the first model
+ERRORS_VIEW = "errors"
+DELTA_VIEW = "delta"
+
+
+def model_selector(models: list[str]) -> Div:
+    return Div(
+        className=f"flex justify-center items-center mb-6 text-[{WHITE}]",
+        # There's nothing to compare when a single model was given
+        style={"display": "none"} if len(models) == 1 else {},
+        children=[
+            Div(
+                className="w-[30%]",
+                children=[
+                    Dropdown(
+                        id="model-dropdown",
+                        options=models,
+                        value=models[0],
+                        clearable=False,
+                    ),
+                ],
+            ),
+            RadioItems(
+                id="model-view",
+                className="mx-3",
+                options=[
+                    {"label": "Errors", "value": ERRORS_VIEW},
+                    {"label": f"Delta from {models[0]}", "value": DELTA_VIEW},
+                ],
+                value=ERRORS_VIEW,
+                inline=True,
+            ),
+            # Model whose errors are in the subgroup plot
+            dcc.Store(id="subgroups-plot-model", data=models[0]),
+        ],
+    )
@@ -0,0 +1,54 @@
+from dash import Input, Output, State, callback, dcc, no_update
+from dash.html import Div
+
+from src.colors import WHITE
+from src.state import DiscoveryState
+
+# How often the dashboard checks for new subgroups, in milliseconds
+POLL_INTERVAL = 1000
+
+
+def discovery_progress(state: DiscoveryState) -> Div:
+    @callback(
+        Output("discovery-version", "data"),
+        Output("discovery-interval", "disabled"),
+        Output("discovery-status", "children"),
+        Input("discovery-interval", "n_intervals"),
+        State("discovery-version", "data"),
+    )
+    def poll_discovery(_: int, seen_version: int | None) -> tuple:
+        # Read before the version, so the last version is always seen once done is set
+        done = state.done
+        version = state.version
+
+        if not done:
+            status = "Discovering subgroups, showing the best ones found so far..."
+        elif state.interrupted:
+            status = "Time budget reached, showing the best subgroups found"
+            # Searches that started after the deadline have nothing to show
+            missed = [
+                x
+                for x in state.classes
+                if x in state.interrupted and state.subgroups_by_class[x].empty
+            ]
+            if missed:
+                status += f", none in time for {', '.join(missed)}"
+        else:
+            status = ""
+
+        # Every component showing subgroups refreshes when the version changes. Watched
+        # inputs may bring new subgroups at any time, so they're polled until the end
+        return (
+            version if version != seen_version else no_update,
+            done and not state.watching,
+            status,
+        )
+
+    return Div(
+        className=f"flex justify-center mb-6 text-[{WHITE}]",
+        children=[
+            dcc.Interval(id="discovery-interval", interval=POLL_INTERVAL),
+            dcc.Store(id="discovery-version", data=None),
+            Div(id="discovery-status"),
+        ],
+    )
@@ -0,0 +1,121 @@
+import weakref
+from dataclasses import dataclass, field
+
+import numpy as np
+import pysubgroup as ps
+from pandas import DataFrame
+from pandas.api.types import is_numeric_dtype
+
+from src.colors import GREEN, RED
+
+NUM_EXPECTED_RULES = 2
+
+# Rectangle of each subgroup, with its first attribute on the x axis
+GEOMETRY_COLUMNS = ["x_column", "y_column", "x0", "x1", "y0", "y1", "label"]
+
+
+# Where the values of a feature are placed on the axes of the subgroup plot. Numeric
+# features span the range of their values, which bounds the open ends of intervals.
+# Nominal features are drawn as categories, in this order, the i-th one centered at i
+@dataclass
+class Axis:
+    lower: float
+    upper: float
+    categories: list | None = None
+    positions: dict = field(init=False, repr=False)
+
+    def __post_init__(self: "Axis") -> None:
+        self.positions = {x: i for i, x in enumerate(self.categories or [])}
+
+
+# Computed once for every feature, so plotting never scans the dataset again
+def feature_axes(dataset_df: DataFrame, features: list[str]) -> dict[str, Axis]:
+    axes = {}
+    for feature in features:
+        column = dataset_df[feature]
+        if is_numeric_dtype(column):
+            axes[feature] = Axis(float(column.min()), float(column.max()))
+        else:
+            categories = sorted(column.dropna().unique().tolist(), key=str)
+            axes[feature] = Axis(-0.5, len(categories) - 0.5, categories)
+    return axes
+
+
+def selector_bounds(selector: ps.SelectorBase, axis: Axis) -> tuple[float, float]:
+    if isinstance(selector, ps.IntervalSelector):
+        lower, upper = selector.lower_bound, selector.upper_bound
+        return (
+            axis.lower if lower == float("-inf") else float(lower),
+            axis.upper if upper == float("inf") else float(upper),
+        )
+    if isinstance(selector, ps.EqualitySelector):
+        value = selector.attribute_value
+        if axis.categories is None:
+            return float(value), float(value)
+        # A category fills its whole slot. Values absent from the dataset aren't drawn
+        position = axis.positions.get(value, np.nan)
+        return position - 0.5, position + 0.5
+    message = f"Can't draw selector of type {type(selector).__name__}"
+    raise NotImplementedError(message)
+
+
+def subgroup_geometry(subgroups_df: DataFrame, axes: dict[str, Axis]) -> DataFrame:
+    geometry = []
+    for subgroup in subgroups_df["subgroup"]:
+        assert len(subgroup.selectors) == NUM_EXPECTED_RULES
+        first, second = subgroup.selectors
+        geometry.append(
+            (
+                first.attribute_name,
+                second.attribute_name,
+                *selector_bounds(first, axes[first.attribute_name]),
+                *selector_bounds(second, axes[second.attribute_name]),
+                str(subgroup),
+            )
+        )
+    return DataFrame(geometry, columns=GEOMETRY_COLUMNS, index=subgroups_df.index)
+
+
+# Geometries already resolved, by the id of their subgroups frame, as for dendrograms
+_geometries: dict[int, tuple[weakref.ref, dict[str, Axis], DataFrame]] = {}
+
+
+# Resolved once per set of subgroups and axes, and shared by every plot of its subgroups
+def get_geometry(subgroups_df: DataFrame, axes: dict[str, Axis]) -> DataFrame:
+    key = id(subgroups_df)
+    if key in _geometries:
+        ref, geometry_axes, geometry_df = _geometries[key]
+        if ref() is subgroups_df and geometry_axes is axes:
+            return geometry_df
+
+    geometry_df = subgroup_geometry(subgroups_df, axes)
+    _geometries[key] = (
+        weakref.ref(subgroups_df, lambda _: _geometries.pop(key, None)),
+        axes,
+        geometry_df,
+    )
+    return geometry_df
+
+
+# What the plot draws of each subgroup, with x_column on its x axis: the rectangle, swapped
+# when the first attribute of the subgroup is on the y axis, its label, and its means,
+# which color it by whether the subgroup errs more than the dataset
+def subgroup_shapes(
+    geometry_df: DataFrame, means_df: DataFrame, x_column: str
+) -> DataFrame:
+    swapped = (geometry_df["x_column"] != x_column).to_numpy()
+    mean_sg = means_df["mean_sg"].to_numpy()
+    mean_dataset = means_df["mean_dataset"].to_numpy()
+    shapes = {
+        x: np.where(swapped, geometry_df[y], geometry_df[x])
+        for x, y in (("x0", "y0"), ("x1", "y1"), ("y0", "x0"), ("y1", "x1"))
+    }
+    return DataFrame(
+        {
+            **shapes,
+            "label": geometry_df["label"].to_numpy(),
+            "mean_sg": mean_sg,
+            "mean_dataset": mean_dataset,
+            "color": np.where(mean_sg > mean_dataset, RED, GREEN),
+        }
+    )
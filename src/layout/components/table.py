@@ -1,10 +1,16 @@
+from dash import Input, Output, callback
 from dash.dash_table import DataTable
 from pandas import DataFrame
 
 from src.colors import BACKGROUND, CRUST, MANTLE, WHITE
+from src.grouping.comparison import model_view
+from src.layout.components.models import DELTA_VIEW
 
 
-def data_table(subgroups_df: DataFrame) -> DataTable:
+def table_records(subgroups_df: DataFrame | None) -> list[dict]:
+    if subgroups_df is None:
+        return []
+
     table_subgroups_df = DataFrame(
         subgroups_df[["subgroup", "size_sg", "mean_sg", "quality"]]
     ).rename(
@@ -16,11 +22,33 @@ def data_table(subgroups_df: DataFrame) -> DataTable:
         }
     )
     table_subgroups_df["Subgroup"] = table_subgroups_df["Subgroup"].astype(str)
+    return table_subgroups_df.to_dict("records")
+
+
+def data_table(
+    subgroups_by_class: dict[str, DataFrame], current_class: str, models: list[str]
+) -> DataTable:
+    @callback(
+        Output("rules_table", "data"),
+        Input("class-dropdown", "value"),
+        Input("discovery-version", "data"),
+        Input("model-dropdown", "value"),
+        Input("model-view", "value"),
+    )
+    def update_table(
+        selected_class: str, _: int | None, model: str, view: str
+    ) -> list[dict]:
+        subgroups_df = subgroups_by_class.get(selected_class)
+        if subgroups_df is not None:
+            subgroups_df = model_view(
+                subgroups_df, models, model, delta=view == DELTA_VIEW
+            )
+        return table_records(subgroups_df)
 
     return DataTable(
         id="rules_table",
         sort_action="native",
-        data=table_subgroups_df.to_dict("records"),
+        data=table_records(subgroups_by_class.get(current_class)),
         columns=[
             {
                 "name": c,
@@ -28,7 +56,7 @@ def data_table(subgroups_df: DataFrame) -> DataTable:
                 "type": "numeric",
                 "format": {"specifier": ".3f" if c in ("Quality", "Avg Error") else ""},
             }
-            for c in table_subgroups_df.columns
+            for c in ("Subgroup", "Size", "Avg Error", "Quality")
         ],
         style_cell={
             "textAlign": "center",
@@ -1,4 +1,4 @@
-from dash import Input, Output, callback, dcc, html
+from dash import Input, Output, Patch, callback, clientside_callback, ctx, dcc, html
 from dash.exceptions import PreventUpdate
 from dash.html import Div
 from pandas import DataFrame
@@ -6,8 +6,50 @@ from plotly.graph_objs import Figure
 from pysubgroup import Conjunction
 
 from src.colors import WHITE
-from src.layout.components.dendrogram import generate_dendrogram_figure
-from src.layout.components.util import get_clustering
+from src.layout.components.dendrogram import (
+    generate_dendrogram_figure,
+    get_dendrogram,
+    has_dendrogram,
+    surviving_subgroups,
+    threshold_line,
+)
+from src.metrics import timed_callback
+
+# Same as filter_subgroups, run by the browser on the cut table sent by cut_table
+FILTER_SUBGROUPS_JS = """
+function (posX, selectedSubgroups, table) {
+    if (table === null) {
+        return [];
+    }
+    const {subgroups, x_columns, y_columns, levels, births, deaths} = table;
+    let shown = subgroups.map((_, i) => i);
+
+    if (posX !== null && levels.length > 0) {
+        let low = 0, high = levels.length;
+        while (low < high) {
+            const middle = (low + high) >> 1;
+            if (levels[middle] <= posX) low = middle + 1; else high = middle;
+        }
+        shown = shown.filter((i) => births[i] <= low && low < deaths[i]);
+    }
+
+    if (selectedSubgroups.length === 0) {
+        return shown.map((i) => subgroups[i]);
+    }
+    if (selectedSubgroups.length > 1) {
+        throw window.dash_clientside.PreventUpdate;
+    }
+
+    const first = subgroups.indexOf(selectedSubgroups[0]);
+    if (first === -1) {
+        return shown.map((i) => subgroups[i]);
+    }
+    const [x, y] = [x_columns[first], y_columns[first]];
+    return shown
+        .filter((i) => (x_columns[i] === x && y_columns[i] === y) !== (y_columns[i] === x && x_columns[i] === y))
+        .map((i) => subgroups[i]);
+}
+"""
 
 
 def generate_decimals(a: float, b: float) -> list[float]:
@@ -38,6 +80,9 @@ def extract_first_subgroup_and_filter(
         lambda x: str(x) == selected_subgroups[0]
     )
     first_subgroup = current_class_df.loc[first_subgroup_filter]
+    # The subgroup may have been replaced since it was selected, by newer results
+    if first_subgroup.empty:
+        return [str(x) for x in current_groups]
 
     # get first line cause it's the only one
     columns = first_subgroup.iloc[0].to_dict()
@@ -53,91 +98,147 @@ def extract_first_subgroup_and_filter(
 @callback(
     Output("slider-threshold", "value"),
     Input("clear-threshold-button", "n_clicks"),
+    Input("class-dropdown", "value"),
 )
-def click_clear_threshold(_: int) -> None:
+@timed_callback
+def click_clear_threshold(_: int, __: str) -> None:
     return None
 
 
 @callback(Output("clear-threshold-button", "style"), Input("slider-threshold", "value"))
+@timed_callback
 def show_clear_button(pos_x: float | None) -> dict:
     if pos_x is None:
         return {"display": "none"}
     return {}
 
 
-def threshold(subgroups_df: DataFrame, min_x: float, max_x: float) -> Div:  # noqa: C901
-    @callback(Output("dendrogram-graph", "figure"), Input("slider-threshold", "value"))
-    def display_graph(pos_x: float | None) -> Figure:
-        return generate_dendrogram_figure(subgroups_df, pos_x)[0]
+def slider_marks(min_x: float, max_x: float) -> dict[str, str]:
+    return {str(i): f"{i:.2f}" for i in generate_decimals(min_x, max_x)}
+
+
+# Subgroups offered by the dropdown: the ones left by the threshold and, once one is
+# selected, only those on its axes
+def filter_subgroups(
+    subgroups_df: DataFrame | None,
+    pos_x: float | None,
+    selected_subgroups: list[str],
+) -> list[str]:
+    if subgroups_df is None:
+        return []
+    shown_subgroups = subgroups_df["subgroup"].tolist()
+
+    if pos_x is not None and has_dendrogram(subgroups_df):
+        cuts = get_dendrogram(subgroups_df).cuts
+        shown_subgroups = [shown_subgroups[i] for i in surviving_subgroups(cuts, pos_x)]
+
+    if len(selected_subgroups) == 0:
+        return [str(x) for x in shown_subgroups]
+
+    if len(selected_subgroups) > 1:
+        raise PreventUpdate
+
+    return extract_first_subgroup_and_filter(
+        subgroups_df, selected_subgroups, shown_subgroups
+    )
+
 
+def threshold(
+    subgroups_by_class: dict[str, DataFrame],
+    min_x: float,
+    max_x: float,
+    *,
+    clientside: bool = False,
+) -> Div:
     @callback(
-        Output("subgroups-dropdown", "options"),
+        Output("dendrogram-graph", "figure"),
         Input("slider-threshold", "value"),
-        Input("subgroups-dropdown", "value"),
+        Input("class-dropdown", "value"),
+        Input("discovery-version", "data"),
     )
-    def filter_subgroups(pos_x: float, selected_subgroups: list[str]) -> list[str]:
-        all_subgroups = subgroups_df["subgroup"].tolist()
-
-        if pos_x is None:
-            if len(selected_subgroups) == 0:
-                return [str(x) for x in all_subgroups]
-
-            if len(selected_subgroups) > 1:
-                raise PreventUpdate
-
-            return extract_first_subgroup_and_filter(
-                subgroups_df, selected_subgroups, all_subgroups
-            )
-
-        clustering, _ = get_clustering(subgroups_df)
-
-        n_samples = len(clustering.labels_)
-        dict_nodes = {}  # Save the representative subgroup for each merge
-        subgroup_replacements = {}  # Save the original and substitute subgroups
-
-        for i, dist in enumerate(clustering.distances_):
-            if dist > pos_x:
-                break
-
-            j = (
-                dict_nodes[clustering.children_[i][0] - n_samples]
-                if clustering.children_[i][0] >= n_samples
-                else clustering.children_[i][0]
-            )
-            k = (
-                dict_nodes[clustering.children_[i][1] - n_samples]
-                if clustering.children_[i][1] >= n_samples
-                else clustering.children_[i][1]
-            )
-
-            if subgroups_df.loc[j, "quality"] > subgroups_df.loc[k, "quality"]:
-                dict_nodes[i] = j
-                subgroup_replacements[subgroups_df.loc[k, "subgroup"]] = (
-                    subgroups_df.loc[j, "subgroup"]
-                )
-            else:
-                dict_nodes[i] = k
-                subgroup_replacements[subgroups_df.loc[j, "subgroup"]] = (
-                    subgroups_df.loc[k, "subgroup"]
-                )
-
-        filtered_subgroups = set(subgroup_replacements.values()) - set(
-            subgroup_replacements.keys()
+    @timed_callback
+    def display_graph(
+        pos_x: float | None, current_class: str, _: int | None
+    ) -> Figure | Patch:
+        subgroups_df = subgroups_by_class.get(current_class)
+        if ctx.triggered_id != "slider-threshold" or not has_dendrogram(subgroups_df):
+            return generate_dendrogram_figure(subgroups_df, pos_x)[0]
+
+        # Only the threshold line moves, so the rest of the figure is left untouched
+        patched_figure = Patch()
+        patched_figure["layout"]["shapes"] = (
+            [] if pos_x is None else [threshold_line(pos_x)]
         )
+        return patched_figure
 
-        filtered_subgroups_strings = [str(x) for x in filtered_subgroups]
-
-        if len(selected_subgroups) == 0:
-            return filtered_subgroups_strings
-
-        if len(selected_subgroups) > 1:
-            raise PreventUpdate
-
-        return extract_first_subgroup_and_filter(
-            subgroups_df, selected_subgroups, filtered_subgroups
+    @callback(
+        Output("slider-threshold", "min"),
+        Output("slider-threshold", "max"),
+        Output("slider-threshold", "marks"),
+        Input("class-dropdown", "value"),
+        Input("discovery-version", "data"),
+    )
+    @timed_callback
+    def update_slider_range(
+        current_class: str, _: int | None
+    ) -> tuple[float, float, dict[str, str]]:
+        _figure, min_x, max_x = generate_dendrogram_figure(
+            subgroups_by_class.get(current_class), None
+        )
+        return min_x, max_x, slider_marks(min_x, max_x)
+
+    def update_subgroup_options(
+        pos_x: float | None,
+        selected_subgroups: list[str],
+        current_class: str,
+        _: int | None,
+    ) -> list[str]:
+        return filter_subgroups(
+            subgroups_by_class.get(current_class), pos_x, selected_subgroups
         )
 
-    interval_splits = generate_decimals(min_x, max_x)
+    # Everything filter_subgroups needs, so the browser can filter on its own
+    def cut_table(current_class: str, _: int | None) -> dict | None:
+        subgroups_df = subgroups_by_class.get(current_class)
+        if subgroups_df is None or subgroups_df.empty:
+            return None
+
+        table = {
+            "subgroups": subgroups_df["subgroup"].astype(str).tolist(),
+            "x_columns": subgroups_df["x_column"].tolist(),
+            "y_columns": subgroups_df["y_column"].tolist(),
+            "levels": [],
+            "births": [],
+            "deaths": [],
+        }
+        if has_dendrogram(subgroups_df):
+            cuts = get_dendrogram(subgroups_df).cuts
+            table["levels"] = cuts.levels.tolist()
+            table["births"] = cuts.births.tolist()
+            table["deaths"] = cuts.deaths.tolist()
+        return table
+
+    if clientside:
+        callback(
+            Output("threshold-cuts", "data"),
+            Input("class-dropdown", "value"),
+            Input("discovery-version", "data"),
+        )(timed_callback(cut_table))
+        clientside_callback(
+            FILTER_SUBGROUPS_JS,
+            Output("subgroups-dropdown", "options"),
+            Input("slider-threshold", "value"),
+            Input("subgroups-dropdown", "value"),
+            Input("threshold-cuts", "data"),
+        )
+    else:
+        callback(
+            Output("subgroups-dropdown", "options"),
+            Input("slider-threshold", "value"),
+            Input("subgroups-dropdown", "value"),
+            Input("class-dropdown", "value"),
+            Input("discovery-version", "data"),
+        )(timed_callback(update_subgroup_options))
 
     return Div(
         className="flex justify-center items-center mt-8",
@@ -153,7 +254,7 @@ def threshold(subgroups_df: DataFrame, min_x: float, max_x: float) -> Div:  # no
                 min=min_x,
                 max=max_x,
                 step=0.01,
-                marks={i: f"{i:.2f}" for i in interval_splits},
+                marks=slider_marks(min_x, max_x),
             ),
             html.Button(
                 style={"display": "none"},
@@ -161,5 +262,6 @@ def threshold(subgroups_df: DataFrame, min_x: float, max_x: float) -> Div:  # no
                 children=["Clear"],
                 id="clear-threshold-button",
             ),
+            dcc.Store(id="threshold-cuts", data=None),
         ],
     )
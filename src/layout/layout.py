@@ -1,23 +1,32 @@
 from dash import html
 from dash.dcc import Graph
 from dash.html import Div
-from pandas import DataFrame
 
+from src.layout.components.classes import class_dropdown
 from src.layout.components.dendrogram import generate_dendrogram_figure
 from src.layout.components.dropdown import subgroups_dropdown
-from src.layout.components.graph import plot_graph_and_subgroups
+from src.layout.components.graph import FigureCache, plot_graph_and_subgroups
+from src.layout.components.models import model_selector
+from src.layout.components.progress import discovery_progress
 from src.layout.components.table import data_table
 from src.layout.components.threshold import threshold
+from src.state import DiscoveryState
 
 
 def create_layout(
-    dataset_with_errors_df: DataFrame,
     features: list[str],
-    subgroups_df: DataFrame,
-    target_column: str,
-    current_class: str,
+    state: DiscoveryState,
+    figure_cache: FigureCache,
+    *,
+    clientside_threshold: bool = False,
 ) -> Div:
-    dendrogram, min_x, max_x = generate_dendrogram_figure(subgroups_df, None)
+    frames = state.frames
+    models = list(frames.dataset_with_errors_by_model)
+    subgroups_by_class = state.subgroups_by_class
+    current_class = state.classes[0]
+    dendrogram, min_x, max_x = generate_dendrogram_figure(
+        subgroups_by_class.get(current_class), None
+    )
     return Div(
         className="flex-col mt-6",
         children=[
@@ -25,14 +34,22 @@ def create_layout(
                 children=[
                     html.H2(
                         f"Uncertainty Regions for {current_class}",
+                        id="title",
                         className="text-center mb-6",
                     ),
+                    class_dropdown(state.classes),
+                    model_selector(models),
+                    discovery_progress(state),
                     Div(
                         className="flex xl:flex-row-reverse xl:place-content-evenly flex-col",
                         children=[
                             Div(
                                 className="flex justify-center items-center",
-                                children=[data_table(subgroups_df)],
+                                children=[
+                                    data_table(
+                                        subgroups_by_class, current_class, models
+                                    )
+                                ],
                             ),
                             Div(
                                 className="flex flex-col items-center mt-10 xl:mt-0",
@@ -45,18 +62,21 @@ def create_layout(
                             ),
                         ],
                     ),
-                    threshold(subgroups_df, min_x, max_x),
-                    subgroups_dropdown(
-                        dataset_with_errors_df,
-                        subgroups_df,
-                        target_column,
+                    threshold(
+                        subgroups_by_class,
+                        min_x,
+                        max_x,
+                        clientside=clientside_threshold,
                     ),
+                    subgroups_dropdown(state, figure_cache),
                     plot_graph_and_subgroups(
-                        dataset_with_errors_df,
+                        frames.dataset_with_errors_by_model[models[0]],
+                        frames.rows,
                         features[0],
                         features[1],
                         None,
-                        target_column,
+                        axes=frames.axes,
+                        generation=frames.generation,
                     ),
                 ],
             ),
@@ -0,0 +1,171 @@
+import resource
+import sys
+from collections.abc import Collection
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas import DataFrame, Series
+from pandas.api.types import union_categoricals
+from pyarrow import ipc
+
+FORMATS = (".csv", ".parquet", ".arrow", ".feather")
+# Class given to discover the subgroups of every class with errors
+ALL_CLASSES = "all"
+
+# Rows read up front to find which columns hold strings
+SAMPLE_ROWS = 1000
+# Rows parsed at once. The parser needs several times the memory of the values it reads,
+# so reading the file in chunks keeps its peak usage bounded
+CHUNK_ROWS = 100_000
+
+
+def _concat_chunks(chunks: list[DataFrame]) -> DataFrame:
+    # Chunks only agree on the type of a categorical column if they have the same
+    # categories, otherwise it would be concatenated as strings
+    for column in chunks[0].select_dtypes(include="category").columns:
+        categories = union_categoricals(
+            [x[column] for x in chunks], sort_categories=True
+        ).categories
+        for chunk in chunks:
+            chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+# Arrow IPC files (.arrow and .feather) are memory-mapped: the columns of the frame are
+# views of the file's pages, which are only read when used and are shared by every
+# process. That only holds for uncompressed files, as written by the convert command
+def _read_arrow(path: Path, columns: list[str] | None) -> DataFrame:
+    if path.suffix == ".parquet":
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = ipc.open_file(pa.memory_map(str(path))).read_all()
+        if columns is not None:
+            table = table.select(columns)
+    # Splitting blocks lets columns without nulls skip the copy into a 2-D block
+    return table.to_pandas(split_blocks=True, strings_to_categorical=True)
+
+
+def read_columns(path: Path) -> list[str]:
+    if path.suffix == ".csv":
+        return pd.read_csv(path, nrows=0).columns.tolist()
+    if path.suffix == ".parquet":
+        return pq.read_schema(path).names
+    return ipc.open_file(pa.memory_map(str(path))).schema.names
+
+
+def read_dataset(path: Path, target_column: str) -> DataFrame:
+    if path.suffix != ".csv":
+        dataset_df = _read_arrow(path, None)
+        if target_column in dataset_df.columns:
+            dataset_df[target_column] = dataset_df[target_column].astype("category")
+        return dataset_df
+
+    sample_df = pd.read_csv(path, nrows=SAMPLE_ROWS)
+    # Strings repeat a lot, so they are stored once per distinct value
+    categorical = {
+        x: "category"
+        for x in sample_df.columns
+        if x == target_column or sample_df[x].dtype == object
+    }
+    dataset_df = _concat_chunks(
+        list(pd.read_csv(path, dtype=categorical, chunksize=CHUNK_ROWS))
+    )
+
+    # Columns that only turned out to hold strings after the sample
+    for column in dataset_df.select_dtypes(include=object).columns:
+        dataset_df[column] = dataset_df[column].astype("category")
+
+    return dataset_df
+
+
+# Smallest type that represents the errors exactly: binary errors (right or wrong) take
+# a byte, and float32 is only used when no error loses precision. Chunks compacted to
+# different types are concatenated to their common type, which is still exact
+def compact_errors(errors: Series) -> Series:
+    # Compact columns, as read from a converted file, are kept as they are, so they can
+    # stay memory-mapped
+    if errors.dtype in (np.uint8, np.float32):
+        return errors
+    values = errors.to_numpy()
+    if np.isin(values, (0, 1)).all():
+        return errors.astype(np.uint8)
+    if np.array_equal(values.astype(np.float32), values, equal_nan=True):
+        return errors.astype(np.float32)
+    return errors
+
+
+# Only the errors of the given classes are read, as the others are never shown
+def read_errors(path: Path, classes: Collection[str] | None) -> DataFrame:
+    columns = (
+        None if classes is None else [x for x in read_columns(path) if x in classes]
+    )
+    if path.suffix != ".csv":
+        errors_df = _read_arrow(path, columns)
+        # Built column by column, so the memory-mapped ones aren't stacked into a copy
+        return DataFrame(
+            {x: compact_errors(errors_df[x]) for x in errors_df}, copy=False
+        )
+
+    chunks = pd.read_csv(path, usecols=columns, chunksize=CHUNK_ROWS)
+    return _concat_chunks([x.apply(compact_errors) for x in chunks])
+
+
+# Models are named after their errors files, or their whole paths when the names clash
+def model_names(errors_paths: list[Path]) -> list[str]:
+    names = [x.stem for x in errors_paths]
+    if len(set(names)) < len(names):
+        names = [str(x.with_suffix("")) for x in errors_paths]
+    return names
+
+
+# Classes whose subgroups are discovered: the ones with errors that appear in the dataset
+def select_classes(
+    dataset_df: DataFrame, errors_df: DataFrame, target_column: str, current_class: str
+) -> list[str]:
+    dataset_classes = dataset_df[target_column].unique()
+
+    if current_class == ALL_CLASSES:
+        classes = [x for x in errors_df.columns if x in dataset_classes]
+        if len(classes) == 0:
+            msg = "None of the errors dataframe columns appear as a class in dataset"
+            raise ValueError(msg)
+        return classes
+
+    if current_class not in errors_df.columns:
+        msg = f"Missing current column '{current_class}' in errors dataframe"
+        raise ValueError(msg)
+
+    if current_class not in dataset_classes:
+        msg = f"Current class '{current_class}' doesn't appear in dataset"
+        raise ValueError(msg)
+
+    return [current_class]
+
+
+# Arrow IPC files are written uncompressed, so they can be memory-mapped when loaded
+def write_table(df: DataFrame, path: Path) -> None:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if path.suffix == ".parquet":
+        pq.write_table(table, path)
+        return
+    with pa.OSFile(str(path), "wb") as file, ipc.new_file(file, table.schema) as writer:
+        writer.write_table(table)
+
+
+def peak_memory_mib() -> float:
+    # ru_maxrss is in kibibytes on Linux, and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def memory_report(dataset_df: DataFrame, errors_df: DataFrame) -> str:
+    dataset_mib = dataset_df.memory_usage(deep=True).sum() / 2**20
+    errors_mib = errors_df.memory_usage(deep=True).sum() / 2**20
+    return (
+        f"Loaded {len(dataset_df)} rows: dataset takes {dataset_mib:.1f} MiB, "
+        f"errors take {errors_mib:.1f} MiB, peak memory usage is "
+        f"{peak_memory_mib():.1f} MiB"
+    )
@@ -0,0 +1,136 @@
+import cProfile
+import functools
+import itertools
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import ParamSpec, TypeVar
+
+# Served in the text format of Prometheus, by the /metrics route of the dashboard
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "heisenpy"
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Families of timings, with their label and help text
+STAGE = "stage"
+CALLBACK = "callback"
+_FAMILIES = {
+    STAGE: "Time spent in each stage of the pipeline",
+    CALLBACK: "Time spent in each Dash callback",
+}
+
+
+@dataclass
+class Timing:
+    count: int = 0
+    seconds: float = 0.0
+
+
+# Timings are shared by the discovery thread and the callbacks, which run in several
+# threads, hence the lock
+_timings: dict[tuple[str, str], Timing] = {}
+_counters: dict[str, tuple[str, Callable[[], float]]] = {}
+_lock = Lock()
+
+_profile_dir: Path | None = None
+_profile_counts: dict[str, Iterator[int]] = {}
+
+
+def record(family: str, name: str, seconds: float) -> None:
+    with _lock:
+        timing = _timings.setdefault((family, name), Timing())
+        timing.count += 1
+        timing.seconds += seconds
+
+
+def reset() -> None:
+    with _lock:
+        _timings.clear()
+
+
+@contextmanager
+def timed(name: str, family: str = STAGE) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(family, name, time.perf_counter() - start)
+
+
+# Values read when the metrics are served, such as the hits of a cache
+def register_counter(name: str, description: str, read: Callable[[], float]) -> None:
+    _counters[name] = (description, read)
+
+
+# With a directory, profiled blocks dump their cProfile stats there, one file per run
+def enable_profiling(directory: Path | None) -> None:
+    global _profile_dir  # noqa: PLW0603
+    _profile_dir = directory
+    if directory is not None:
+        directory.mkdir(parents=True, exist_ok=True)
+
+
+@contextmanager
+def profiled(name: str) -> Iterator[None]:
+    if _profile_dir is None:
+        yield
+        return
+
+    with _lock:
+        run = next(_profile_counts.setdefault(name, itertools.count()))
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is already active, as in nested profiled blocks on Python 3.12
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(_profile_dir / f"{name}-{run}.prof")
+
+
+# Times every call of a Dash callback, and profiles it when profiling is enabled
+def timed_callback(function: Callable[P, R]) -> Callable[P, R]:
+    @functools.wraps(function)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        with timed(function.__name__, CALLBACK), profiled(function.__name__):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metrics_text() -> str:
+    with _lock:
+        timings = {key: Timing(x.count, x.seconds) for key, x in _timings.items()}
+
+    lines = []
+    for family, description in _FAMILIES.items():
+        metric = f"{PREFIX}_{family}_seconds"
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} summary"]
+        for (timing_family, name), timing in sorted(timings.items()):
+            if timing_family != family:
+                continue
+            label = f'{{{family}="{_label(name)}"}}'
+            lines.append(f"{metric}_count{label} {timing.count}")
+            lines.append(f"{metric}_sum{label} {timing.seconds:.6f}")
+
+    for name, (description, read) in sorted(_counters.items()):
+        metric = f"{PREFIX}_{name}_total"
+        lines += [
+            f"# HELP {metric} {description}",
+            f"# TYPE {metric} counter",
+            f"{metric} {read()}",
+        ]
+    return "\n".join(lines) + "\n"
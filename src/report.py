@@ -0,0 +1,236 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, fields
+from html import escape
+from pathlib import Path
+
+from pandas import DataFrame
+
+from src.args import ReportArgs, get_report_args
+from src.colors import BACKGROUND, BASE, WHITE
+from src.grouping.binning import BINNINGS, DEFAULT_BINS
+from src.grouping.clean import remove_redundant_subgroups
+from src.grouping.clustering import cluster_labels
+from src.grouping.discovery import (
+    ENGINES,
+    create_sampled_search_space,
+    subgroup_discovery,
+)
+from src.loading import FORMATS, read_dataset, read_errors, select_classes, write_table
+
+# Written to the output directory, with the outcome of every job
+SUMMARY_FILE = "report.json"
+
+HTML_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ background: {base}; color: {white}; font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid {background}; padding: 0.3em 0.6em; text-align: right; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+
+# A dataset, errors and class of the manifest, with the same options as the dashboard
+@dataclass
+class ReportJob:
+    name: str
+    data: Path
+    errors: Path
+    current_class: str
+    target: str = "target"
+    size: int = 20
+    engine: str = ENGINES[0]
+    dedup_threshold: float = 1.0
+    sample: int | None = None
+    bins: int = DEFAULT_BINS
+    binning: str = BINNINGS[0]
+
+
+def read_manifest(path: Path) -> list[ReportJob]:
+    # Options are named as the fields of the job, except for the class
+    options = {x.name for x in fields(ReportJob)} - {"current_class"} | {"class"}
+    jobs = []
+    for i, manifest_entry in enumerate(json.loads(path.read_text())):
+        entry = dict(manifest_entry)
+        unknown = set(entry) - options
+        if unknown:
+            msg = f"Job {i} of the manifest has unknown options: {', '.join(sorted(unknown))}"
+            raise ValueError(msg)
+        missing = {"data", "errors", "class"} - set(entry)
+        if missing:
+            msg = f"Job {i} of the manifest is missing: {', '.join(sorted(missing))}"
+            raise ValueError(msg)
+
+        data, errors = Path(entry.pop("data")), Path(entry.pop("errors"))
+        current_class = entry.pop("class")
+        job = ReportJob(
+            name=entry.pop("name", f"{data.stem}-{current_class}"),
+            data=path.parent / data,
+            errors=path.parent / errors,
+            current_class=current_class,
+            **entry,
+        )
+        for input_path in (job.data, job.errors):
+            if input_path.suffix not in FORMATS:
+                msg = f"'{input_path}' isn't one of {', '.join(FORMATS)}"
+                raise ValueError(msg)
+        if job.engine not in ENGINES:
+            msg = f"Unknown engine '{job.engine}', expected one of {', '.join(ENGINES)}"
+            raise ValueError(msg)
+        if job.binning not in BINNINGS:
+            msg = f"Unknown binning '{job.binning}', expected one of {', '.join(BINNINGS)}"
+            raise ValueError(msg)
+        jobs.append(job)
+
+    names = [x.name for x in jobs]
+    if len(set(names)) < len(names):
+        msg = "Jobs of the manifest must have distinct names"
+        raise ValueError(msg)
+    return jobs
+
+
+# Subgroups of a class as plain columns: their descriptions, statistics, and the cluster
+# of each one at the threshold, with its representative, the best subgroup in it
+def report_table(subgroups_df: DataFrame, threshold: float) -> DataFrame:
+    table = subgroups_df.drop(columns="covered").reset_index(drop=True)
+    table["subgroup"] = table["subgroup"].astype(str)
+    table["cluster"] = cluster_labels(subgroups_df, threshold)
+    best = table.loc[table.groupby("cluster")["quality"].idxmax()]
+    table["representative"] = table["cluster"].map(
+        best.set_index("cluster")["subgroup"]
+    )
+    return table
+
+
+def write_html(title: str, tables: dict[str, DataFrame], path: Path) -> None:
+    body = "\n".join(
+        f"<h2>{escape(current_class)}</h2>\n{table.to_html(index=False)}"
+        for current_class, table in tables.items()
+    )
+    path.write_text(
+        HTML_PAGE.format(
+            title=escape(title),
+            body=body,
+            base=BASE,
+            white=WHITE,
+            background=BACKGROUND,
+        )
+    )
+
+
+# Runs in a worker process. The tables are written there, so only the summary of the
+# job is sent back
+def run_job(job: ReportJob, args: ReportArgs) -> dict:
+    start = time.time()
+    dataset_df = read_dataset(job.data, job.target)
+    if job.target not in dataset_df.columns:
+        msg = f"Missing target column '{job.target}' in dataset"
+        raise ValueError(msg)
+    errors_df = read_errors(
+        job.errors, {*dataset_df[job.target].unique(), job.current_class}
+    )
+    classes = select_classes(dataset_df, errors_df, job.target, job.current_class)
+
+    # Every class of the job searches the same selectors
+    search_space = create_sampled_search_space(
+        dataset_df,
+        errors_df,
+        job.target,
+        job.sample,
+        bins=job.bins,
+        binning=job.binning,
+    )
+
+    job_dir = args.output / job.name
+    job_dir.mkdir(parents=True, exist_ok=True)
+    tables = {}
+    summary = {}
+    for current_class in classes:
+        subgroups_df = subgroup_discovery(
+            dataset_df,
+            errors_df,
+            job.size,
+            job.target,
+            current_class,
+            engine=job.engine,
+            sample_size=job.sample,
+            search_space=search_space,
+        )
+        table = report_table(
+            remove_redundant_subgroups(subgroups_df, job.dedup_threshold),
+            args.threshold,
+        )
+        path = job_dir / f"{current_class}.{args.format}"
+        if args.format == "parquet":
+            write_table(table, path)
+        else:
+            table.to_json(path, orient="records", indent=2, double_precision=15)
+        tables[current_class] = table
+        summary[current_class] = {
+            "path": str(path.relative_to(args.output)),
+            "subgroups": len(table),
+            "clusters": int(table["cluster"].nunique()),
+        }
+
+    if args.html:
+        write_html(job.name, tables, job_dir / "index.html")
+
+    return {"classes": summary, "seconds": round(time.time() - start, 3)}
+
+
+def run() -> None:
+    args = get_report_args()
+    try:
+        jobs = read_manifest(args.manifest)
+    except (OSError, json.JSONDecodeError, TypeError, ValueError) as e:
+        print(f"Invalid manifest '{args.manifest}': {e}")
+        raise SystemExit(1) from e
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    results = {}
+    # Each job loads its own inputs, so they run in separate processes
+    with ProcessPoolExecutor(
+        max_workers=args.workers or min(len(jobs), os.cpu_count() or 1) or 1
+    ) as executor:
+        futures = {executor.submit(run_job, job, args): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                results[job.name] = {"status": "done", **future.result()}
+                print(f"Finished job '{job.name}'")
+            except Exception as e:
+                results[job.name] = {"status": "failed", "error": str(e)}
+                print(f"Job '{job.name}' failed: {e}")
+
+    summary = {
+        "threshold": args.threshold,
+        "jobs": [
+            {
+                "name": job.name,
+                "data": str(job.data),
+                "errors": str(job.errors),
+                "class": job.current_class,
+                **results[job.name],
+            }
+            for job in jobs
+        ],
+    }
+    summary_path = args.output / SUMMARY_FILE
+    summary_path.write_text(json.dumps(summary, indent=2))
+    print(f"Wrote '{summary_path}'")
+
+    # Pipelines running the report should notice failed jobs
+    if any(x["status"] == "failed" for x in results.values()):
+        raise SystemExit(1)
@@ -0,0 +1,41 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+from numpy.typing import NDArray
+from pandas import DataFrame
+
+from src.layout.components.subgroups.geometry import Axis
+
+
+# Frames the subgroup plots are drawn from: the dataset joined with the errors of each
+# model, the positions of the rows of each class, and the axis of each feature. Watch
+# mode replaces them as a whole when the inputs change, with a new generation, which is
+# part of the key of every cached figure, so figures of older frames are never served
+@dataclass
+class ServedFrames:
+    dataset_with_errors_by_model: dict[str, DataFrame]
+    rows: dict[str, NDArray[np.intp]]
+    axes: dict[str, Axis]
+    generation: int = 0
+
+
+# Subgroups shown by the dashboard, filled in by the discovery thread while the app runs.
+# Callbacks read subgroups_by_class directly, and poll version to know when to refresh
+@dataclass
+class DiscoveryState:
+    classes: list[str]
+    subgroups_by_class: dict[str, DataFrame] = field(default_factory=dict)
+    version: int = 0
+    done: bool = False
+    # Classes whose search the time budget cut short, with their best subgroups so far,
+    # which may be none when their search started after the deadline
+    interrupted: set[str] = field(default_factory=set)
+    # Whether the inputs are watched, so new subgroups may come after the discovery
+    watching: bool = False
+    frames: ServedFrames | None = None
+
+
+def publish(state: DiscoveryState, current_class: str, subgroups_df: DataFrame) -> None:
+    # Replacing the frame is atomic, so readers see either the old set or the new one
+    state.subgroups_by_class[current_class] = subgroups_df
+    state.version += 1
@@ -0,0 +1,153 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import NDArray
+from pandas import DataFrame
+
+from src.app import discover_subgroups, get_dfs, get_models
+from src.args import get_store_args
+from src.grouping.clustering import get_linkage
+from src.grouping.coverage import coverage_matrix
+from src.grouping.lib import deserialize_subgroup, serialize_subgroup
+from src.loading import read_dataset, read_errors, select_classes, write_table
+from src.metrics import enable_profiling, profiled
+from src.state import DiscoveryState
+
+# Bump whenever the layout of the store changes, so stale stores are rejected
+STORE_VERSION = 2
+MANIFEST_FILE = "store.json"
+DATASET_FILE = "dataset.arrow"
+# Errors of each model, by its position in the manifest
+ERRORS_FILE = "errors-{}.arrow"
+
+
+# Everything the dashboard serves, computed once. The dataset, errors, coverages and
+# linkages are memory-mapped, so every process that reads the store shares their pages
+@dataclass
+class Store:
+    dataset_df: DataFrame
+    errors_by_model: dict[str, DataFrame]
+    target: str
+    subgroups_by_class: dict[str, DataFrame]
+    linkages: dict[str, NDArray[np.float64]]
+
+
+def write_store(
+    path: Path,
+    dataset_df: DataFrame,
+    errors_by_model: dict[str, DataFrame],
+    target_column: str,
+    subgroups_by_class: dict[str, DataFrame],
+) -> None:
+    path.mkdir(parents=True, exist_ok=True)
+    # Arrow IPC files are written uncompressed, so they can be memory-mapped
+    write_table(dataset_df, path / DATASET_FILE)
+    for i, errors_df in enumerate(errors_by_model.values()):
+        write_table(errors_df, path / ERRORS_FILE.format(i))
+
+    classes = []
+    for i, (current_class, subgroups_df) in enumerate(subgroups_by_class.items()):
+        statistics = subgroups_df.drop(columns=["subgroup", "covered"])
+        (path / f"{i}.json").write_text(
+            json.dumps(
+                {
+                    "columns": subgroups_df.columns.tolist(),
+                    "selectors": [
+                        serialize_subgroup(x) for x in subgroups_df["subgroup"]
+                    ],
+                    "statistics": {c: statistics[c].tolist() for c in statistics},
+                }
+            )
+        )
+        # Empty arrays can't be memory-mapped, so they aren't written
+        if not subgroups_df.empty:
+            np.save(path / f"{i}-covered.npy", coverage_matrix(subgroups_df["covered"]))
+        if len(subgroups_df) > 1:
+            np.save(path / f"{i}-linkage.npy", get_linkage(subgroups_df))
+        classes.append(current_class)
+
+    # Written last, so a store interrupted while being written is never read
+    (path / MANIFEST_FILE).write_text(
+        json.dumps(
+            {
+                "version": STORE_VERSION,
+                "target": target_column,
+                "models": list(errors_by_model),
+                "classes": classes,
+            }
+        )
+    )
+
+
+def read_store(path: Path) -> Store:
+    manifest = json.loads((path / MANIFEST_FILE).read_text())
+    if manifest.get("version") != STORE_VERSION:
+        msg = f"'{path}' was written by another version, write it again"
+        raise ValueError(msg)
+
+    target_column = manifest["target"]
+    dataset_df = read_dataset(path / DATASET_FILE, target_column)
+    errors_by_model = {
+        model: read_errors(path / ERRORS_FILE.format(i), None)
+        for i, model in enumerate(manifest["models"])
+    }
+
+    subgroups_by_class = {}
+    linkages = {}
+    for i, current_class in enumerate(manifest["classes"]):
+        stored = json.loads((path / f"{i}.json").read_text())
+        data = {c: np.array(x) for c, x in stored["statistics"].items()}
+        data["subgroup"] = [deserialize_subgroup(x) for x in stored["selectors"]]
+        covered_path = path / f"{i}-covered.npy"
+        data["covered"] = (
+            list(np.load(covered_path, mmap_mode="r")) if covered_path.exists() else []
+        )
+        subgroups_by_class[current_class] = DataFrame(data, columns=stored["columns"])
+
+        linkage_path = path / f"{i}-linkage.npy"
+        if linkage_path.exists():
+            linkages[current_class] = np.load(linkage_path, mmap_mode="r")
+
+    return Store(
+        dataset_df, errors_by_model, target_column, subgroups_by_class, linkages
+    )
+
+
+def run() -> None:
+    store_args = get_store_args()
+    args = store_args.dashboard
+    enable_profiling(args.profile)
+    dfs = get_dfs(args.data, args.errors[0], args.target, args.current_class)
+    if dfs is None:
+        raise SystemExit(1)
+    dataset_df, errors_df = dfs
+
+    if args.target not in dataset_df.columns:
+        print(f"Missing target column '{args.target}' in dataset")
+        raise SystemExit(1)
+    try:
+        classes = select_classes(dataset_df, errors_df, args.target, args.current_class)
+    except ValueError as e:
+        print(e)
+        raise SystemExit(1) from e
+    errors_by_model = get_models(args.errors, dataset_df, errors_df)
+    if errors_by_model is None:
+        raise SystemExit(1)
+
+    state = DiscoveryState(classes)
+    with profiled("discovery"):
+        discover_subgroups(args, dataset_df, errors_by_model, state)
+    if state.interrupted:
+        print("Time budget reached, storing the best subgroups found so far")
+
+    # Classes are stored in the order they are listed, not the one they were found in
+    write_store(
+        store_args.output,
+        dataset_df,
+        errors_by_model,
+        args.target,
+        {x: state.subgroups_by_class[x] for x in classes},
+    )
+    print(f"Wrote '{store_args.output}'")
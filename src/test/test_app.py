@@ -0,0 +1,57 @@
+# ruff: noqa: ANN201
+from pathlib import Path
+
+import pytest
+
+from src.app import run_discovery
+from src.args import Args
+from src.generate import generate_dataset
+from src.state import DiscoveryState
+
+N_ROWS = 500
+CLASSES = ["class_0", "class_1"]
+
+
+@pytest.fixture
+def args(tmp_path: Path):
+    return Args(
+        data=tmp_path / "dataset.csv",
+        errors=[tmp_path / "errors.csv"],
+        target="target",
+        current_class="all",
+        size=10,
+        bins=5,
+        binning="quantile",
+        cache_dir=tmp_path,
+        use_cache=False,
+        dedup_threshold=1.0,
+        engine="exhaustive",
+        # Over before any worker starts
+        time_budget=1e-9,
+        sample=None,
+        figure_cache_size=0,
+        clientside_threshold=False,
+        profile=None,
+        watch=False,
+        watch_interval=1.0,
+        watch_shift=0.1,
+    )
+
+
+def test_budget_reached_before_every_class(
+    args: Args, capsys: pytest.CaptureFixture[str]
+):
+    dataset_df, errors_df = generate_dataset(N_ROWS, 3, 1, 2, 0.2)
+    state = DiscoveryState(CLASSES)
+
+    run_discovery(args, dataset_df, {"model": errors_df}, state)
+
+    assert state.done
+    assert state.interrupted == set(CLASSES)
+    for current_class in CLASSES:
+        subgroups_df = state.subgroups_by_class[current_class]
+        assert subgroups_df.empty
+        assert "quality" in subgroups_df.columns
+    output = capsys.readouterr().out
+    assert "Time budget reached before any subgroup of class 'class_1'" in output
+    assert "No subgroups have been found" not in output
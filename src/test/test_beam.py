@@ -0,0 +1,123 @@
+# ruff: noqa: ANN201
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+from src.grouping import progress
+from src.grouping.discovery import (
+    create_search_space,
+    merge_dataset_and_errors,
+    subgroup_discovery,
+)
+from src.grouping.progress import SearchProgress
+
+N_ROWS = 500
+SET_SIZE = 10
+
+
+@pytest.fixture
+def dfs():
+    rng = np.random.default_rng(0)
+    dataset_df = DataFrame(
+        {
+            "a": rng.normal(size=N_ROWS),
+            "b": rng.normal(size=N_ROWS),
+            "c": rng.integers(0, 3, N_ROWS),
+            "target": rng.choice(["x", "y"], N_ROWS),
+        }
+    )
+    errors_df = DataFrame(
+        {
+            "x": (dataset_df["a"] + rng.normal(size=N_ROWS) > 1).astype(float),
+            "y": rng.random(N_ROWS),
+        }
+    )
+    return dataset_df, errors_df
+
+
+def test_numpy_engine_matches_pysubgroup(dfs: tuple[DataFrame, DataFrame]):
+    expected = subgroup_discovery(*dfs, SET_SIZE, "target", "x", engine="pysubgroup")
+    actual = subgroup_discovery(*dfs, SET_SIZE, "target", "x", engine="numpy")
+
+    assert actual.columns.tolist() == expected.columns.tolist()
+    assert actual["subgroup"].tolist() == expected["subgroup"].tolist()
+    pd.testing.assert_frame_equal(
+        actual.drop(columns=["subgroup", "covered"]),
+        expected.drop(columns=["subgroup", "covered"]),
+        check_dtype=False,
+    )
+    for actual_covered, expected_covered in zip(
+        actual["covered"], expected["covered"], strict=True
+    ):
+        assert (actual_covered == expected_covered).all()
+
+
+def test_exhaustive_engine_finds_best_pairs(dfs: tuple[DataFrame, DataFrame]):
+    dataset_df, errors_df = dfs
+    merged_df = merge_dataset_and_errors(dataset_df, errors_df)
+    search_space = create_search_space(merged_df, errors_df, "target")
+    errors = merged_df["x"].to_numpy()
+
+    expected = []
+    for a, b in combinations(search_space, 2):
+        covered = a.covers(merged_df) & b.covers(merged_df)
+        if a.attribute_name != b.attribute_name and covered.any():
+            expected.append(
+                np.sqrt(covered.sum()) * abs(errors[covered].mean() - errors.mean())
+            )
+    expected = sorted(expected, reverse=True)[:SET_SIZE]
+
+    actual = subgroup_discovery(*dfs, SET_SIZE, "target", "x", engine="exhaustive")
+
+    assert actual["quality"].to_numpy() == pytest.approx(expected)
+    assert all(len(sg.selectors) == 2 for sg in actual["subgroup"])  # noqa: PLR2004
+
+
+def test_exhaustive_engine_without_pairs(dfs: tuple[DataFrame, DataFrame]):
+    dataset_df, errors_df = dfs
+    expected = subgroup_discovery(*dfs, SET_SIZE, "target", "x", engine="numpy")
+
+    # A single feature has no two selectors on distinct attributes
+    actual = subgroup_discovery(
+        dataset_df[["a", "target"]],
+        errors_df,
+        SET_SIZE,
+        "target",
+        "x",
+        engine="exhaustive",
+    )
+
+    assert actual.empty
+    assert actual.columns.tolist() == expected.columns.tolist()
+
+
+def test_progress_publishes_and_stops(
+    dfs: tuple[DataFrame, DataFrame], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(progress, "PUBLISH_INTERVAL", 0)
+    published = []
+    final = subgroup_discovery(
+        *dfs,
+        SET_SIZE,
+        "target",
+        "x",
+        engine="numpy",
+        progress=SearchProgress(on_progress=published.append),
+    )
+    assert len(published) > 0
+    assert published[-1]["subgroup"].tolist() == final["subgroup"].tolist()
+
+    interrupted = subgroup_discovery(
+        *dfs,
+        SET_SIZE,
+        "target",
+        "x",
+        engine="exhaustive",
+        progress=SearchProgress(deadline=time.time()),
+    )
+    assert interrupted.empty
+    assert interrupted.columns.tolist() == final.columns.tolist()
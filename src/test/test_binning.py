@@ -0,0 +1,85 @@
+# ruff: noqa: ANN201
+import numpy as np
+import pysubgroup as ps
+import pytest
+from pandas import DataFrame
+
+from src.grouping.binning import (
+    create_selectors,
+    entropy_edges,
+    quantile_edges,
+    uniform_edges,
+)
+
+N_ROWS = 1000
+# Values where the classes of the entropy test change
+LOW, HIGH = -1.0, 0.5
+
+
+@pytest.fixture
+def dataset_df():
+    rng = np.random.default_rng(0)
+    dataset_df = DataFrame(
+        {
+            "a": rng.normal(size=N_ROWS).round(2),
+            "b": rng.integers(0, 50, N_ROWS),
+            "c": rng.choice(["x", "y", "z"], N_ROWS),
+            "few": rng.integers(0, 3, N_ROWS).astype(float),
+            "target": rng.choice(["p", "q"], N_ROWS),
+        }
+    )
+    dataset_df.loc[::10, "a"] = np.nan
+    return dataset_df
+
+
+def test_quantile_matches_pysubgroup(dataset_df: DataFrame):
+    for bins in (2, 5, 8):
+        expected = ps.create_selectors(dataset_df, nbins=bins, ignore=["target"])
+        selectors = create_selectors(dataset_df, "target", bins=bins)
+
+        assert [str(x) for x in selectors] == [str(x) for x in expected]
+
+
+def test_quantile_edges_skip_repeated_values():
+    values = np.array([1, 1, 1, 1, 1, 1, 1, 1, 2, 3])
+
+    # The cuts of 2/5, 3/5 and 4/5 fall on the first value, already taken, so they move
+    # to the next ones until there are none left
+    assert quantile_edges(values, 5).tolist() == [1, 2, 3]
+
+
+def test_uniform_edges():
+    values = np.sort(np.random.default_rng(1).uniform(0, 10, N_ROWS))
+
+    edges = uniform_edges(values, 4)
+
+    assert np.allclose(np.diff([values[0], *edges, values[-1]]), np.ptp(values) / 4)
+
+
+def test_entropy_edges():
+    values = np.sort(np.random.default_rng(2).normal(size=N_ROWS))
+    labels = np.where(values < LOW, "low", np.where(values < HIGH, "mid", "high"))
+
+    edges = entropy_edges(values, labels, 5)
+
+    # Only the cuts between the classes pay off
+    assert edges.tolist() == [values[values >= LOW][0], values[values >= HIGH][0]]
+
+
+def test_entropy_edges_with_missing_labels():
+    values = np.arange(10)
+
+    # Rows without a label are told apart from the others
+    edges = entropy_edges(values, np.array(["a"] * 5 + [None] * 5, dtype=object), 4)
+    assert edges.tolist() == [5]
+
+    assert len(entropy_edges(values, np.full(10, np.nan, dtype=object), 4)) == 0
+
+
+def test_entropy_falls_back_to_quantiles(dataset_df: DataFrame):
+    # The target is random, so no feature tells the classes apart
+    selectors = create_selectors(dataset_df, "target", binning="entropy")
+
+    assert [str(x) for x in selectors] == [
+        str(x) for x in create_selectors(dataset_df, "target")
+    ]
@@ -0,0 +1,84 @@
+# ruff: noqa: ANN201
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pandas import DataFrame
+from pysubgroup import Conjunction, EqualitySelector, IntervalSelector
+
+from src.grouping.cache import (
+    fingerprint,
+    load_search_space,
+    load_subgroups,
+    save_search_space,
+    save_subgroups,
+)
+from src.grouping.coverage import coverage_column
+
+
+@pytest.fixture
+def subgroups_df():
+    return DataFrame(
+        {
+            "quality": [0.5, 0.25],
+            "subgroup": [
+                Conjunction(
+                    [
+                        IntervalSelector("a", float("-inf"), 2.5),
+                        EqualitySelector("b", "x"),
+                    ]
+                ),
+                Conjunction([IntervalSelector("a", 1, float("inf"))]),
+            ],
+            "size_sg": [3, 2],
+            "mean_sg": [0.75, 0.1],
+            "covered": coverage_column(
+                [
+                    np.array([True, False, True, True, False]),
+                    np.array([False, False, False, True, True]),
+                ]
+            ),
+        }
+    )
+
+
+def test_round_trip(subgroups_df: DataFrame, tmp_path: Path):
+    path = tmp_path / "entry.npz"
+    save_subgroups(subgroups_df, path)
+    loaded = load_subgroups(path)
+
+    assert loaded is not None
+    assert loaded.columns.tolist() == subgroups_df.columns.tolist()
+    assert loaded["subgroup"].tolist() == subgroups_df["subgroup"].tolist()
+    assert loaded["size_sg"].tolist() == subgroups_df["size_sg"].tolist()
+    for loaded_covered, covered in zip(
+        loaded["covered"], subgroups_df["covered"], strict=True
+    ):
+        assert (loaded_covered == covered).all()
+
+
+def test_missing_entry(tmp_path: Path):
+    assert load_subgroups(tmp_path / "missing.npz") is None
+
+
+def test_fingerprint_depends_on_params(tmp_path: Path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,2\n")
+
+    assert fingerprint([path], size=20) == fingerprint([path], size=20)
+    assert fingerprint([path], size=20) != fingerprint([path], size=10)
+
+
+def test_search_space_round_trip(tmp_path: Path):
+    search_space = [
+        EqualitySelector("b", "x"),
+        EqualitySelector("a", np.nan),
+        IntervalSelector("a", float("-inf"), np.float64(2.5)),
+        IntervalSelector("a", np.float64(2.5), float("inf")),
+    ]
+    path = tmp_path / "selectors.json"
+
+    save_search_space(search_space, path)
+
+    assert [str(x) for x in load_search_space(path)] == [str(x) for x in search_space]
+    assert load_search_space(tmp_path / "missing.json") is None
@@ -0,0 +1,41 @@
+# ruff: noqa: ANN201
+import numpy as np
+import pytest
+from pandas import DataFrame
+from pysubgroup import Conjunction, IntervalSelector
+
+from src.grouping.clean import remove_redundant_subgroups
+from src.grouping.coverage import coverage_column
+
+N_ROWS = 1000
+
+
+@pytest.fixture
+def subgroups_df():
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 2, N_ROWS).astype(bool)
+    other = rng.integers(0, 2, N_ROWS).astype(bool)
+    # Differs from base by a single row
+    near_base = base.copy()
+    near_base[np.flatnonzero(~base)[0]] = True
+
+    return DataFrame(
+        {
+            "subgroup": [
+                Conjunction([IntervalSelector(name, 0, 1)]) for name in "abcde"
+            ],
+            "covered": coverage_column([other, base, near_base, base, other]),
+        }
+    )
+
+
+def test_exact_duplicates_keep_first_description(subgroups_df: DataFrame):
+    deduplicated = remove_redundant_subgroups(subgroups_df)
+
+    assert deduplicated.index.tolist() == [0, 1, 2]
+
+
+def test_near_duplicates(subgroups_df: DataFrame):
+    deduplicated = remove_redundant_subgroups(subgroups_df, threshold=0.99)
+
+    assert deduplicated.index.tolist() == [0, 1]
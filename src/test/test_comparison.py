@@ -0,0 +1,64 @@
+# ruff: noqa: ANN201
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+from src.app import prepare_subgroups
+from src.generate import generate_dataset
+from src.grouping.comparison import add_model_statistics, model_column, model_view
+from src.grouping.coverage import coverage_sums, pack, unpack
+from src.grouping.discovery import subgroup_discovery
+
+N_ROWS = 700
+SET_SIZE = 10
+MODELS = ["reference", "other"]
+
+
+@pytest.fixture
+def compared():
+    dataset_df, errors_df = generate_dataset(N_ROWS, 3, 1, 2, 0.2)
+    other_df = generate_dataset(N_ROWS, 3, 1, 2, 0.3, seed=1)[1]
+    errors_by_model = dict(zip(MODELS, [errors_df, other_df], strict=True))
+    subgroups_df = prepare_subgroups(
+        subgroup_discovery(
+            dataset_df, errors_df, SET_SIZE, "target", "class_0", engine="numpy"
+        )
+    )
+    return (
+        add_model_statistics(subgroups_df, errors_by_model, "class_0"),
+        subgroups_df,
+        other_df,
+    )
+
+
+def test_coverage_sums():
+    rng = np.random.default_rng(0)
+    masks = rng.integers(0, 2, (5, N_ROWS)).astype(bool)
+    values = rng.random((N_ROWS, 3))
+
+    assert np.allclose(coverage_sums(pack(masks), values), masks @ values)
+
+
+def test_reference_statistics(compared: tuple[DataFrame, DataFrame, DataFrame]):
+    compared_df, subgroups_df, _ = compared
+
+    # The first model is the one the subgroups were found on
+    for statistic in ("mean_sg", "mean_dataset", "quality"):
+        assert np.allclose(
+            compared_df[model_column(statistic, "reference")], subgroups_df[statistic]
+        )
+
+
+def test_model_view(compared: tuple[DataFrame, DataFrame, DataFrame]):
+    compared_df, _, other_df = compared
+    errors = other_df["class_0"].to_numpy()
+
+    view_df = model_view(compared_df, MODELS, "other")
+    delta_df = model_view(compared_df, MODELS, "other", delta=True)
+
+    covered = unpack(compared_df["covered"].iloc[0], N_ROWS)
+    assert view_df["mean_sg"].iloc[0] == pytest.approx(errors[covered].mean())
+    assert np.allclose(
+        delta_df["mean_sg"],
+        view_df["mean_sg"] - compared_df[model_column("mean_sg", "reference")],
+    )
@@ -0,0 +1,49 @@
+# ruff: noqa: ANN201
+import numpy as np
+import pytest
+
+from src.grouping.coverage import (
+    block_intersections,
+    coverage_column,
+    intersection_size,
+    pack,
+    popcount,
+    union_size,
+    unpack,
+)
+
+N_ROWS = 130
+
+
+@pytest.fixture
+def masks():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 2, (4, N_ROWS)).astype(bool)
+
+
+def test_pack_round_trip(masks: np.ndarray):
+    bits = pack(masks)
+
+    assert bits.dtype == np.uint64
+    assert bits.shape == (4, 3)
+    assert (unpack(bits, N_ROWS) == masks).all()
+
+
+def test_popcount(masks: np.ndarray):
+    assert (popcount(pack(masks)) == masks.sum(axis=1)).all()
+
+
+def test_set_operations(masks: np.ndarray):
+    a, b = coverage_column(list(masks))[:2]
+
+    assert intersection_size(a, b) == (masks[0] & masks[1]).sum()
+    assert union_size(a, b) == (masks[0] | masks[1]).sum()
+
+
+def test_block_intersections(masks: np.ndarray):
+    intersections = block_intersections(pack(masks), 1, 3)
+
+    assert intersections.dtype == np.int64
+    assert intersections.tolist() == [
+        [int((masks[i] & masks[j]).sum()) for j in range(1, len(masks))] for i in (1, 2)
+    ]
@@ -0,0 +1,84 @@
+# ruff: noqa: ANN201
+import numpy as np
+import pytest
+from pandas import DataFrame
+from pysubgroup import Conjunction, IntervalSelector
+from scipy.cluster import hierarchy
+
+from src.grouping.coverage import coverage_column
+from src.layout.components.dendrogram import (
+    get_dendrogram,
+    surviving_subgroups,
+    truncate_linkage,
+)
+
+N_ROWS = 100
+N_SUBGROUPS = 15
+N_LEAVES = 5
+
+
+@pytest.fixture
+def subgroups_df():
+    rng = np.random.default_rng(1)
+    selectors = [IntervalSelector(name, i, i + 1) for name in "abcd" for i in range(4)]
+    subgroups = list(
+        dict.fromkeys(
+            Conjunction([selectors[i] for i in rng.choice(len(selectors), 2, False)])
+            for _ in range(N_SUBGROUPS)
+        )
+    )
+    masks = list(rng.integers(0, 2, (len(subgroups), N_ROWS)).astype(bool))
+    return DataFrame(
+        {
+            "subgroup": subgroups,
+            "quality": rng.random(len(subgroups)),
+            "covered": coverage_column(masks),
+        }
+    )
+
+
+# Representatives found by applying the merges one at a time, up to the threshold
+def walk_merges(subgroups_df: DataFrame, pos_x: float) -> set[int]:
+    linkage_matrix = get_dendrogram(subgroups_df).linkage_matrix
+    n_samples = len(subgroups_df)
+    representatives, replacements = {}, {}
+    for i, (left, right, dist, _) in enumerate(linkage_matrix):
+        if dist > pos_x:
+            break
+        j, k = (
+            int(x) if x < n_samples else representatives[int(x) - n_samples]
+            for x in (left, right)
+        )
+        quality = subgroups_df["quality"]
+        winner, loser = (j, k) if quality[j] > quality[k] else (k, j)
+        representatives[i] = winner
+        replacements[loser] = winner
+    return set(replacements.values()) - set(replacements)
+
+
+def test_cuts_match_merges(subgroups_df: DataFrame):
+    dendrogram = get_dendrogram(subgroups_df)
+    distances = dendrogram.linkage_matrix[:, 2]
+    thresholds = [0.0, *distances, *(distances + 1e-6), distances.max() + 1]
+
+    for pos_x in thresholds:
+        assert set(surviving_subgroups(dendrogram.cuts, pos_x)) == walk_merges(
+            subgroups_df, pos_x
+        )
+
+
+def test_truncate_linkage(subgroups_df: DataFrame):
+    dendrogram = get_dendrogram(subgroups_df)
+    labels = subgroups_df["subgroup"].astype(str).tolist()
+    qualities = subgroups_df["quality"].to_numpy()
+
+    truncated, leaf_labels = truncate_linkage(
+        dendrogram.linkage_matrix, labels, qualities, N_LEAVES
+    )
+
+    hierarchy.is_valid_linkage(truncated, throw=True)
+    assert len(leaf_labels) == N_LEAVES
+    assert (truncated[:, 2:] == dendrogram.linkage_matrix[-(N_LEAVES - 1) :, 2:]).all()
+    # The best subgroup represents the leaf it's collapsed into
+    best = labels[int(np.argmax(qualities))]
+    assert any(x.startswith(best) for x in leaf_labels)
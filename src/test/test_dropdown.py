@@ -0,0 +1,91 @@
+# ruff: noqa: ANN201
+import pytest
+from dash import Dash
+
+from src.app import create_dash_app, prepare_subgroups, serve_frames
+from src.generate import generate_dataset
+from src.grouping.discovery import subgroup_discovery
+from src.state import DiscoveryState, publish
+
+N_ROWS = 500
+SET_SIZE = 10
+CLASS = "class_0"
+MODEL = "model"
+PLOT = (
+    "..subgroups-plot.figure...subgroups-plot-axes.data"
+    "...subgroups-plot-model.data...subgroups-plot-generation.data.."
+)
+
+
+@pytest.fixture
+def dashboard():
+    dataset_df, errors_df = generate_dataset(N_ROWS, 3, 1, 2, 0.2)
+    state = DiscoveryState([CLASS])
+    publish(
+        state,
+        CLASS,
+        prepare_subgroups(
+            subgroup_discovery(
+                dataset_df, errors_df, SET_SIZE, "target", CLASS, engine="numpy"
+            )
+        ),
+    )
+    state.done = True
+    app = create_dash_app(dataset_df, {MODEL: errors_df}, state, "target", 0)
+    app._setup_server()
+    return app, state, dataset_df, errors_df
+
+
+# Clicks the plot button, with the plot showing what the stores say, as the browser would
+def click_plot(app: Dash, subgroup: str, plotted: list) -> dict:
+    callback = app.callback_map[PLOT]
+    values = [1, MODEL, [subgroup], CLASS, *plotted]
+    response = app.server.test_client().post(
+        "/_dash-update-component",
+        json={
+            "output": PLOT,
+            "outputs": [
+                {"id": x.split(".")[0], "property": x.split(".")[1]}
+                for x in PLOT.strip(".").split("...")
+            ],
+            "inputs": [
+                {**x, "value": v}
+                for x, v in zip(callback["inputs"], values[:2], strict=True)
+            ],
+            "state": [
+                {**x, "value": v}
+                for x, v in zip(callback["state"], values[2:], strict=True)
+            ],
+            "changedPropIds": ["plot-subgroups-button.n_clicks"],
+        },
+    )
+    assert response.status_code == 200  # noqa: PLR2004
+    return response.get_json()["response"]
+
+
+def test_plot_is_redrawn_on_new_inputs(dashboard: tuple):
+    app, state, dataset_df, errors_df = dashboard
+    subgroup = str(state.subgroups_by_class[CLASS]["subgroup"].iloc[0])
+
+    first = click_plot(app, subgroup, [None, None, None])
+    plotted = [
+        first[x]["data"]
+        for x in (
+            "subgroups-plot-axes",
+            "subgroups-plot-model",
+            "subgroups-plot-generation",
+        )
+    ]
+    assert "data" in first["subgroups-plot"]["figure"]
+
+    # Only the subgroups change on the same axes, model and inputs
+    patched = click_plot(app, subgroup, plotted)
+    assert "operations" in patched["subgroups-plot"]["figure"]
+
+    # New errors change the points, so they are plotted again
+    state.frames = serve_frames(
+        dataset_df, {MODEL: 1 - errors_df}, "target", generation=1
+    )
+    redrawn = click_plot(app, subgroup, plotted)
+    assert "data" in redrawn["subgroups-plot"]["figure"]
+    assert redrawn["subgroups-plot-generation"]["data"] == 1
@@ -0,0 +1,42 @@
+# ruff: noqa: ANN201
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+from src.generate import generate_dataset
+
+N_ROWS = 20_000
+ERROR_RATE = 0.2
+
+
+@pytest.fixture
+def generated():
+    return generate_dataset(N_ROWS, 3, 2, 4, ERROR_RATE, seed=1)
+
+
+def test_generate_dataset_layout(generated: tuple[DataFrame, DataFrame]):
+    dataset_df, errors_df = generated
+
+    assert list(dataset_df.columns) == [
+        "num_0",
+        "num_1",
+        "num_2",
+        "cat_0",
+        "cat_1",
+        "target",
+    ]
+    assert set(dataset_df["target"]) == set(errors_df.columns)
+    assert len(errors_df) == N_ROWS
+    assert ((errors_df >= 0) & (errors_df <= 1)).all(axis=None)
+
+
+def test_generate_dataset_errors(generated: tuple[DataFrame, DataFrame]):
+    dataset_df, errors_df = generated
+    errors = errors_df.to_numpy()
+    truth = errors_df.columns.get_indexer(dataset_df["target"])
+
+    # The predicted class gets at least half of the probability
+    misclassified = errors[np.arange(N_ROWS), truth] > 0.5  # noqa: PLR2004
+    assert misclassified.mean() == pytest.approx(ERROR_RATE, abs=0.02)
+    region = (dataset_df["num_0"] > 1) & (dataset_df["cat_0"] == "c0")
+    assert misclassified[region].mean() > 2 * misclassified[~region].mean()
@@ -0,0 +1,126 @@
+# ruff: noqa: ANN201
+import numpy as np
+import pytest
+from pandas import DataFrame
+from pysubgroup import Conjunction, EqualitySelector, IntervalSelector
+
+from src.colors import GREEN, RED
+from src.layout.components.subgroups.geometry import (
+    Axis,
+    feature_axes,
+    selector_bounds,
+    subgroup_geometry,
+    subgroup_shapes,
+)
+
+B_LOWER_BOUND = 1.5
+B_UPPER_BOUND = 5.5
+
+A_LOWER_BOUND = 2
+A_UPPER_BOUND = 3
+
+A_MIN = 0.0
+A_MAX = 4.0
+
+
+@pytest.fixture
+def df():
+    return DataFrame(
+        {
+            "a": [A_MIN, 1.0, 2.0, A_MAX],
+            "b": [1.5, 2.5, 5.5, 6.0],
+            "c": ["y", "x", "z", "x"],
+        }
+    )
+
+
+@pytest.fixture
+def axes(df: DataFrame):
+    return feature_axes(df, ["a", "b", "c"])
+
+
+@pytest.fixture
+def interval_a():
+    return IntervalSelector("a", A_LOWER_BOUND, A_UPPER_BOUND)
+
+
+def geometry_of(selectors: list, axes: dict[str, Axis]) -> DataFrame:
+    return subgroup_geometry(DataFrame({"subgroup": [Conjunction(selectors)]}), axes)
+
+
+def test_extract_bounded_subgroups(axes: dict[str, Axis], interval_a: IntervalSelector):
+    selectors: list[IntervalSelector] = [
+        interval_a,
+        IntervalSelector("b", B_LOWER_BOUND, B_UPPER_BOUND),
+    ]
+
+    geometry = geometry_of(selectors, axes).iloc[0]
+
+    assert (geometry["x_column"], geometry["y_column"]) == ("a", "b")
+    assert (geometry["x0"], geometry["x1"]) == (A_LOWER_BOUND, A_UPPER_BOUND)
+    assert (geometry["y0"], geometry["y1"]) == (B_LOWER_BOUND, B_UPPER_BOUND)
+
+
+def test_extract_equality_selection(
+    axes: dict[str, Axis], interval_a: IntervalSelector
+):
+    selectors: list[IntervalSelector | EqualitySelector] = [
+        interval_a,
+        EqualitySelector("b", B_LOWER_BOUND),
+    ]
+
+    geometry = geometry_of(selectors, axes).iloc[0]
+
+    assert (geometry["x0"], geometry["x1"]) == (A_LOWER_BOUND, A_UPPER_BOUND)
+    assert (geometry["y0"], geometry["y1"]) == (B_LOWER_BOUND, B_LOWER_BOUND)
+
+
+def test_unbounded_intervals_span_the_feature(axes: dict[str, Axis]):
+    assert selector_bounds(
+        IntervalSelector("a", float("-inf"), A_UPPER_BOUND), axes["a"]
+    ) == (A_MIN, A_UPPER_BOUND)
+    assert selector_bounds(
+        IntervalSelector("a", A_LOWER_BOUND, float("inf")), axes["a"]
+    ) == (A_LOWER_BOUND, A_MAX)
+
+
+def test_categories_fill_their_slot(axes: dict[str, Axis]):
+    assert axes["c"].categories == ["x", "y", "z"]
+    assert selector_bounds(EqualitySelector("c", "y"), axes["c"]) == (0.5, 1.5)
+
+    lower, upper = selector_bounds(EqualitySelector("c", "w"), axes["c"])
+    assert np.isnan(lower)
+    assert np.isnan(upper)
+
+
+def test_too_many_selectors(axes: dict[str, Axis], interval_a: IntervalSelector):
+    selectors: list[IntervalSelector] = [interval_a, interval_a, interval_a]
+    with pytest.raises(AssertionError):
+        geometry_of(selectors, axes)
+
+
+def test_too_few_selectors(axes: dict[str, Axis]):
+    selectors: list[IntervalSelector] = []
+    with pytest.raises(AssertionError):
+        geometry_of(selectors, axes)
+
+
+def test_shapes_follow_the_plotted_axes(
+    axes: dict[str, Axis], interval_a: IntervalSelector
+):
+    subgroups_df = DataFrame(
+        {
+            "subgroup": [
+                Conjunction([interval_a, EqualitySelector("c", "x")]),
+                Conjunction([EqualitySelector("c", "z"), interval_a]),
+            ],
+            "mean_sg": [0.75, 0.25],
+            "mean_dataset": [0.5, 0.5],
+        }
+    )
+
+    shapes = subgroup_shapes(subgroup_geometry(subgroups_df, axes), subgroups_df, "a")
+
+    assert shapes["x0"].tolist() == [A_LOWER_BOUND, A_LOWER_BOUND]
+    assert shapes["y0"].tolist() == [-0.5, 1.5]
+    assert shapes["color"].tolist() == [RED, GREEN]
@@ -0,0 +1,140 @@
+# ruff: noqa: ANN201
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+from plotly.graph_objs import Figure
+
+from src.layout.components import graph
+from src.layout.components.graph import (
+    FigureCache,
+    cached_figure,
+    class_rows,
+    render_graph_and_subgroups,
+)
+
+CACHE_SIZE = 2
+N_POINTS = 20_000
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    target = rng.choice(["a", "b"], N_POINTS)
+    return DataFrame(
+        {
+            "x": rng.normal(size=N_POINTS),
+            "y": rng.normal(size=N_POINTS),
+            "target": target,
+            "a": rng.random(N_POINTS),
+            "b": rng.random(N_POINTS),
+        }
+    )
+
+
+@pytest.fixture
+def df():
+    return DataFrame(
+        {
+            "x": [1.0, 2.0, 3.0, 4.0],
+            "y": [4.0, 3.0, 2.0, 1.0],
+            "target": pd.Categorical(["it's", "b", "it's", "b"]),
+            "it's": [0.0, 1.0, 1.0, 0.0],
+            "b": [1.0, 1.0, 0.0, 0.0],
+        }
+    )
+
+
+def test_class_rows(df: DataFrame):
+    rows = class_rows(df, "target")
+
+    assert list(rows) == ["it's", "b"]
+    assert np.array_equal(rows["it's"], [0, 2])
+    assert np.array_equal(rows["b"], [1, 3])
+
+
+def test_render_class_errors(df: DataFrame):
+    fig = render_graph_and_subgroups(df, class_rows(df, "target"), "x", "y", None)
+
+    assert [x.name for x in fig.data] == ["it's", "b"]
+    assert np.array_equal(fig.data[0].x, [1.0, 3.0])
+    assert np.array_equal(fig.data[0].marker.color, [0.0, 1.0])
+
+
+# Each regime is reached by lowering the thresholds, rather than plotting more points
+@pytest.mark.parametrize(
+    ("scattergl_threshold", "heatmap_threshold", "trace_types"),
+    [
+        (N_POINTS, N_POINTS, ["scatter", "scatter"]),
+        (0, N_POINTS, ["scattergl", "scattergl"]),
+        (0, 0, ["heatmap"]),
+    ],
+)
+def test_render_regimes(
+    points: DataFrame,
+    monkeypatch: pytest.MonkeyPatch,
+    scattergl_threshold: int,
+    heatmap_threshold: int,
+    trace_types: list[str],
+):
+    monkeypatch.setattr(graph, "SCATTERGL_THRESHOLD", scattergl_threshold)
+    monkeypatch.setattr(graph, "HEATMAP_THRESHOLD", heatmap_threshold)
+
+    fig = render_graph_and_subgroups(
+        points, class_rows(points, "target"), "x", "y", None
+    )
+
+    assert [x.type for x in fig.data] == trace_types
+    payload = len(fig.to_json())
+    if trace_types == ["heatmap"]:
+        # The grid doesn't grow with the points
+        assert np.shape(fig.data[0].z) == (graph.GRID_SIZE, graph.GRID_SIZE)
+        assert payload < N_POINTS * 50
+    else:
+        assert sum(len(x.x) for x in fig.data) == N_POINTS
+        assert payload > N_POINTS * 50
+
+
+def test_binned_classes_share_cells(df: DataFrame, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(graph, "HEATMAP_THRESHOLD", 0)
+    # Both classes fall in the same cells, so neither can hide the other
+    copy = df.assign(target="b", b=1.0)
+    df = pd.concat([df, copy, copy], ignore_index=True)
+
+    fig = render_graph_and_subgroups(df, class_rows(df, "target"), "x", "y", None)
+
+    (heatmap,) = fig.data
+    z = np.array(heatmap.z, dtype=float)
+    customdata = np.array(heatmap.customdata, dtype=object)
+    filled = ~np.isnan(z)
+    assert filled.sum() == len(df) // 3
+    # Each cell holds a row of class "it's" or "b", and two rows of class "b" erring
+    assert sorted(z[filled].tolist()) == pytest.approx([2 / 3, 2 / 3, 1, 1])
+    assert set(customdata[filled][:, 0]) == {3}
+    assert set(customdata[filled][:, 1]) == {"b"}
+
+
+def test_cached_figure():
+    cache = FigureCache(CACHE_SIZE)
+    rendered = []
+
+    def render(key: str) -> Callable[[], Figure]:
+        def render_key() -> Figure:
+            rendered.append(key)
+            return Figure()
+
+        return render_key
+
+    first = cached_figure(cache, "a", render("a"))
+    cached_figure(cache, "b", render("b"))
+    assert cached_figure(cache, "a", render("a")) is first
+
+    # "b" is the least recently used one, so it's evicted first
+    cached_figure(cache, "c", render("c"))
+    cached_figure(cache, "b", render("b"))
+
+    assert rendered == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert list(cache.figures) == ["c", "b"]
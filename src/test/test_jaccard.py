@@ -0,0 +1,46 @@
+# ruff: noqa: ANN201
+from itertools import combinations
+
+import numpy as np
+import pytest
+from pandas import DataFrame
+from pysubgroup import Conjunction, IntervalSelector
+
+from src.grouping import clustering
+from src.grouping.clustering import (
+    calculate_jaccard_similarity,
+    condensed_jaccard_distances,
+)
+from src.grouping.coverage import coverage_column
+
+N_ROWS = 200
+N_SUBGROUPS = 12
+
+
+@pytest.fixture
+def subgroups_df():
+    rng = np.random.default_rng(0)
+    selectors = [IntervalSelector(name, i, i + 1) for name in "abc" for i in range(3)]
+    subgroups = [
+        Conjunction([selectors[i] for i in rng.choice(len(selectors), 2, False)])
+        for _ in range(N_SUBGROUPS)
+    ]
+    masks = list(rng.integers(0, 2, (N_SUBGROUPS, N_ROWS)).astype(bool))
+    # Guarantee that some pairs share their coverage
+    masks[1] = masks[0]
+    return DataFrame({"subgroup": subgroups, "covered": coverage_column(masks)})
+
+
+@pytest.mark.parametrize("block", [clustering._CONDENSED_BLOCK, 5])
+def test_matches_pairwise_similarity(
+    subgroups_df: DataFrame, block: int, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(clustering, "_CONDENSED_BLOCK", block)
+    pairwise = [
+        calculate_jaccard_similarity(a, b)
+        for a, b in combinations(
+            zip(subgroups_df["covered"], subgroups_df["subgroup"], strict=True), 2
+        )
+    ]
+
+    assert (condensed_jaccard_distances(subgroups_df) == pairwise).all()
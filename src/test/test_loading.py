@@ -0,0 +1,74 @@
+# ruff: noqa: ANN201
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+from src import loading
+from src.loading import compact_errors, read_dataset, read_errors, write_table
+
+
+@pytest.fixture
+def csv_paths(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # Small chunks, so the categories of each chunk differ
+    monkeypatch.setattr(loading, "CHUNK_ROWS", 3)
+    dataset_df = DataFrame(
+        {
+            "a": [0.5, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5],
+            "color": ["red", "red", "red", "blue", "green", "blue", "red"],
+            "target": ["x", "x", "x", "y", "y", "x", "y"],
+        }
+    )
+    errors_df = DataFrame(
+        {
+            "x": [0.0, 1.0, 0.0, 0.0, 1.0, 0.0, 0.0],
+            "y": [0.0, 0.0, 0.0, 0.5, 0.25, 0.0, 0.125],
+            "z": [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7],
+        }
+    )
+    dataset_df.to_csv(tmp_path / "data.csv", index=False)
+    errors_df.to_csv(tmp_path / "errors.csv", index=False)
+    return tmp_path / "data.csv", tmp_path / "errors.csv"
+
+
+def test_read_dataset(csv_paths: tuple[Path, Path]):
+    dataset_df = read_dataset(csv_paths[0], "target")
+    expected = pd.read_csv(csv_paths[0])
+
+    assert isinstance(dataset_df["color"].dtype, pd.CategoricalDtype)
+    assert isinstance(dataset_df["target"].dtype, pd.CategoricalDtype)
+    assert dataset_df["a"].dtype == np.float64
+    pd.testing.assert_frame_equal(dataset_df.astype(expected.dtypes), expected)
+
+
+def test_read_errors(csv_paths: tuple[Path, Path]):
+    errors_df = read_errors(csv_paths[1], {"x", "y"})
+    expected = pd.read_csv(csv_paths[1], usecols=["x", "y"])
+
+    assert errors_df.columns.tolist() == ["x", "y"]
+    assert errors_df["x"].dtype == np.uint8
+    assert errors_df["y"].dtype == np.float32
+    pd.testing.assert_frame_equal(errors_df.astype(float), expected)
+
+
+def test_compact_errors_keeps_inexact_values():
+    errors = pd.Series([0.1, 0.2])
+    assert compact_errors(errors).dtype == np.float64
+
+
+@pytest.mark.parametrize("suffix", [".arrow", ".parquet"])
+def test_converted_files_load_the_same(csv_paths: tuple[Path, Path], suffix: str):
+    dataset_path, errors_path = csv_paths
+    write_table(read_dataset(dataset_path, "target"), dataset_path.with_suffix(suffix))
+    write_table(read_errors(errors_path, None), errors_path.with_suffix(suffix))
+
+    pd.testing.assert_frame_equal(
+        read_dataset(dataset_path.with_suffix(suffix), "target"),
+        read_dataset(dataset_path, "target"),
+    )
+    pd.testing.assert_frame_equal(
+        read_errors(errors_path.with_suffix(suffix), {"x", "y"}),
+        read_errors(errors_path, {"x", "y"}),
+    )
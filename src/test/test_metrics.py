@@ -0,0 +1,114 @@
+# ruff: noqa: ANN201
+import pstats
+import time
+from pathlib import Path
+
+import pytest
+from pandas import DataFrame
+
+from src import app, metrics
+from src.app import discover_subgroups
+from src.args import Args
+from src.generate import generate_dataset
+from src.grouping import progress
+from src.metrics import (
+    STAGE,
+    enable_profiling,
+    metrics_text,
+    register_counter,
+    reset,
+    timed,
+    timed_callback,
+)
+from src.state import DiscoveryState
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    reset()
+    yield
+    reset()
+    enable_profiling(None)
+    metrics._counters.clear()
+
+
+# Longer than the whole search, so counting it in the discovery stage would show
+DEDUP_SECONDS = 0.2
+
+
+@timed_callback
+def plot(n_clicks: int) -> int:
+    return n_clicks
+
+
+def test_metrics_text():
+    with timed("discovery"):
+        pass
+    plot(1)
+    plot(2)
+    register_counter("plots", "Plots drawn", lambda: 3)
+
+    lines = metrics_text().splitlines()
+
+    assert 'heisenpy_stage_seconds_count{stage="discovery"} 1' in lines
+    assert 'heisenpy_callback_seconds_count{callback="plot"} 2' in lines
+    assert "# TYPE heisenpy_plots_total counter" in lines
+    assert "heisenpy_plots_total 3" in lines
+
+
+def test_failed_stages_are_timed():
+    with pytest.raises(ZeroDivisionError), timed("failing"):
+        _ = 1 / 0
+
+    assert 'heisenpy_stage_seconds_count{stage="failing"} 1' in metrics_text()
+
+
+def test_profiled_callback(tmp_path: Path):
+    enable_profiling(tmp_path)
+
+    assert plot(1) == 1
+    plot(2)
+
+    assert sorted(x.name for x in tmp_path.iterdir()) == ["plot-0.prof", "plot-1.prof"]
+    stats = pstats.Stats(str(tmp_path / "plot-0.prof"))
+    assert any(name == "plot" for _, _, name in stats.stats)
+
+
+def test_discovery_excludes_publishing(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    dataset_df, errors_df = generate_dataset(500, 3, 1, 2, 0.2)
+    args = Args(
+        data=tmp_path / "dataset.csv",
+        errors=[tmp_path / "errors.csv"],
+        target="target",
+        current_class="class_0",
+        size=10,
+        bins=5,
+        binning="quantile",
+        cache_dir=tmp_path,
+        use_cache=False,
+        dedup_threshold=1.0,
+        engine="numpy",
+        time_budget=None,
+        sample=None,
+        figure_cache_size=0,
+        clientside_threshold=False,
+        profile=None,
+        watch=False,
+        watch_interval=1.0,
+        watch_shift=0.1,
+    )
+    remove_redundant_subgroups = app.remove_redundant_subgroups
+
+    def slow_dedup(subgroups_df: DataFrame, threshold: float) -> DataFrame:
+        time.sleep(DEDUP_SECONDS)
+        return remove_redundant_subgroups(subgroups_df, threshold)
+
+    monkeypatch.setattr(app, "remove_redundant_subgroups", slow_dedup)
+    monkeypatch.setattr(progress, "PUBLISH_INTERVAL", 0)
+    state = DiscoveryState(["class_0"])
+
+    discover_subgroups(args, dataset_df, {"model": errors_df}, state)
+
+    # Partial results were deduplicated while the search ran
+    assert metrics._timings[STAGE, "dedup"].count > 1
+    assert metrics._timings[STAGE, "discovery"].seconds < DEDUP_SECONDS
@@ -0,0 +1,103 @@
+# ruff: noqa: ANN201
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+from src.args import ReportArgs
+from src.report import read_manifest, run_job
+
+N_ROWS = 300
+SET_SIZE = 8
+
+
+@pytest.fixture
+def manifest_path(tmp_path: Path):
+    rng = np.random.default_rng(0)
+    dataset_df = DataFrame(
+        {
+            "a": rng.normal(size=N_ROWS),
+            "b": rng.normal(size=N_ROWS),
+            "target": rng.choice(["x", "y"], N_ROWS),
+        }
+    )
+    errors_df = DataFrame(
+        {
+            "x": (dataset_df["a"] + rng.normal(size=N_ROWS) > 1).astype(float),
+            "y": rng.random(N_ROWS),
+        }
+    )
+    dataset_df.to_csv(tmp_path / "data.csv", index=False)
+    errors_df.to_csv(tmp_path / "errors.csv", index=False)
+
+    path = tmp_path / "manifest.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"data": "data.csv", "errors": "errors.csv", "class": "all"},
+                {
+                    "name": "only-x",
+                    "data": "data.csv",
+                    "errors": "errors.csv",
+                    "class": "x",
+                    "size": SET_SIZE,
+                    "engine": "numpy",
+                },
+            ]
+        )
+    )
+    return path
+
+
+def test_read_manifest(manifest_path: Path):
+    all_classes, only_x = read_manifest(manifest_path)
+
+    assert all_classes.name == "data-all"
+    assert all_classes.data == manifest_path.parent / "data.csv"
+    assert (only_x.name, only_x.current_class, only_x.size) == ("only-x", "x", SET_SIZE)
+
+
+def test_invalid_manifest(tmp_path: Path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps([{"data": "data.csv", "errors": "errors.csv"}]))
+
+    with pytest.raises(ValueError, match="missing: class"):
+        read_manifest(path)
+
+
+def test_run_job(manifest_path: Path, tmp_path: Path):
+    args = ReportArgs(
+        manifest=manifest_path,
+        output=tmp_path / "out",
+        workers=1,
+        format="json",
+        html=True,
+        threshold=0.5,
+    )
+    job = read_manifest(manifest_path)[1]
+
+    summary = run_job(job, args)
+
+    table = pd.read_json(args.output / summary["classes"]["x"]["path"])
+    assert len(table) == summary["classes"]["x"]["subgroups"] <= SET_SIZE
+    # The representative of every cluster is its subgroup of highest quality
+    best = table.loc[table.groupby("cluster")["quality"].idxmax()]
+    assert set(table["representative"]) == set(best["subgroup"])
+    assert (args.output / "only-x" / "index.html").exists()
+
+
+def test_report_does_not_import_dash():
+    imported = subprocess.run(
+        [sys.executable, "-c", "import sys, src.report; print(sorted(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert "'dash'" not in imported
+    assert "'src.layout" not in imported
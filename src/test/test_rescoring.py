@@ -0,0 +1,61 @@
+# ruff: noqa: ANN201
+import numpy as np
+import pytest
+from pandas import DataFrame, Series
+
+from src.app import prepare_subgroups
+from src.generate import generate_dataset
+from src.grouping.coverage import unpack
+from src.grouping.discovery import subgroup_discovery
+from src.grouping.rescoring import ranking_shift, rescore_subgroups
+
+N_ROWS = 600
+SET_SIZE = 10
+
+
+@pytest.fixture
+def subgroups():
+    dataset_df, errors_df = generate_dataset(N_ROWS, 3, 1, 2, 0.2)
+    subgroups_df = prepare_subgroups(
+        subgroup_discovery(
+            dataset_df, errors_df, SET_SIZE, "target", "class_0", engine="numpy"
+        )
+    )
+    return subgroups_df, errors_df["class_0"].to_numpy(dtype=float)
+
+
+def test_rescore_same_errors(subgroups: tuple[DataFrame, np.ndarray]):
+    subgroups_df, errors = subgroups
+
+    rescored_df = rescore_subgroups(subgroups_df, errors)
+
+    for column in ("quality", "size_sg", "mean_sg", "std_sg", "median_lift"):
+        assert np.allclose(rescored_df[column], subgroups_df[column])
+    assert ranking_shift(subgroups_df["quality"], rescored_df["quality"]) == 0
+
+
+def test_rescore_new_errors(subgroups: tuple[DataFrame, np.ndarray]):
+    subgroups_df, _ = subgroups
+    new_errors = np.random.default_rng(1).random(N_ROWS)
+
+    rescored_df = rescore_subgroups(subgroups_df, new_errors)
+
+    # Only the statistics change, the subgroups and their order are kept
+    assert rescored_df["subgroup"].tolist() == subgroups_df["subgroup"].tolist()
+    covered = unpack(rescored_df["covered"].iloc[0], N_ROWS)
+    size = covered.sum()
+    mean_sg = new_errors[covered].mean()
+    assert rescored_df["mean_sg"].iloc[0] == pytest.approx(mean_sg)
+    assert rescored_df["quality"].iloc[0] == pytest.approx(
+        size**0.5 * abs(mean_sg - new_errors.mean())
+    )
+
+
+def test_ranking_shift():
+    before = Series([4.0, 3.0, 2.0, 1.0])
+
+    assert ranking_shift(before, before * 2) == 0
+    assert ranking_shift(before, -before) == 1
+    # One of the six pairs swapped
+    assert ranking_shift(before, Series([4.0, 3.0, 1.0, 2.0])) == pytest.approx(1 / 6)
+    assert ranking_shift(before.head(1), before.head(1)) == 0
@@ -0,0 +1,79 @@
+# ruff: noqa: ANN201
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+from src.grouping.discovery import merge_dataset_and_errors, subgroup_discovery
+from src.grouping.sampling import rescore, strata, stratified_sample
+
+N_ROWS = 500
+SET_SIZE = 10
+
+
+@pytest.fixture
+def dfs():
+    rng = np.random.default_rng(0)
+    dataset_df = DataFrame(
+        {
+            "a": rng.normal(size=N_ROWS),
+            "b": rng.normal(size=N_ROWS),
+            "target": rng.choice(["x", "y"], N_ROWS),
+        }
+    )
+    errors_df = DataFrame(
+        {
+            "x": (dataset_df["a"] + rng.normal(size=N_ROWS) > 1).astype(float),
+            "y": rng.random(N_ROWS),
+        }
+    )
+    return dataset_df, errors_df
+
+
+def test_stratified_sample_is_proportional():
+    row_strata = np.repeat([0, 1, 2], [9000, 990, 10])
+    rows = stratified_sample(row_strata, 1000)
+
+    assert np.all(np.diff(rows) > 0)
+    assert np.bincount(row_strata[rows]).tolist() == [900, 99, 1]
+
+
+def test_missing_classes_are_stratified(dfs: tuple[DataFrame, DataFrame]):
+    dataset_df, errors_df = dfs
+    dataset_df.loc[::10, "target"] = None
+    merged_df = merge_dataset_and_errors(dataset_df, errors_df)
+
+    row_strata = strata(merged_df, "target", "x")
+    assert (row_strata >= 0).all()
+    assert not np.isin(row_strata[::10], np.delete(row_strata, np.s_[::10])).any()
+
+    df_rules = subgroup_discovery(
+        dataset_df,
+        errors_df,
+        SET_SIZE,
+        "target",
+        "x",
+        engine="numpy",
+        sample_size=N_ROWS // 2,
+    )
+    assert len(df_rules) == SET_SIZE
+
+
+def test_rescore_matches_full_search(dfs: tuple[DataFrame, DataFrame]):
+    expected = subgroup_discovery(*dfs, SET_SIZE, "target", "x")
+    actual = rescore(
+        merge_dataset_and_errors(*dfs), expected["subgroup"].tolist(), "x", SET_SIZE
+    )
+
+    assert actual["subgroup"].tolist() == expected["subgroup"].tolist()
+    assert actual["quality"].to_numpy() == pytest.approx(expected["quality"])
+    assert actual["mean_sg"].to_numpy() == pytest.approx(expected["mean_sg"])
+
+
+def test_sampled_discovery(dfs: tuple[DataFrame, DataFrame]):
+    df_rules = subgroup_discovery(
+        *dfs, SET_SIZE, "target", "x", engine="numpy", sample_size=N_ROWS // 2
+    )
+
+    # Statistics are those of the full dataset, not of the sample
+    assert (df_rules["size_dataset"] == N_ROWS).all()
+    assert len(df_rules) == SET_SIZE
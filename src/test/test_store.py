@@ -0,0 +1,64 @@
+# ruff: noqa: ANN201
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+from src.app import prepare_subgroups
+from src.generate import generate_dataset
+from src.grouping.clustering import get_linkage
+from src.grouping.discovery import subgroup_discovery
+from src.store import MANIFEST_FILE, read_store, write_store
+
+N_ROWS = 500
+SET_SIZE = 10
+
+
+@pytest.fixture
+def store_path(tmp_path: Path):
+    dataset_df, errors_df = generate_dataset(N_ROWS, 3, 1, 2, 0.2)
+    subgroups_by_class = {
+        x: prepare_subgroups(
+            subgroup_discovery(
+                dataset_df, errors_df, SET_SIZE, "target", x, engine="numpy"
+            )
+        )
+        for x in errors_df.columns
+    }
+    write_store(
+        tmp_path, dataset_df, {"model": errors_df}, "target", subgroups_by_class
+    )
+    return tmp_path, subgroups_by_class
+
+
+def test_read_store(store_path: tuple[Path, dict[str, DataFrame]]):
+    path, subgroups_by_class = store_path
+
+    store = read_store(path)
+
+    assert store.target == "target"
+    assert len(store.dataset_df) == len(store.errors_by_model["model"]) == N_ROWS
+    assert list(store.subgroups_by_class) == list(subgroups_by_class)
+    for current_class, subgroups_df in subgroups_by_class.items():
+        stored_df = store.subgroups_by_class[current_class]
+        assert stored_df["subgroup"].tolist() == subgroups_df["subgroup"].tolist()
+        assert np.allclose(stored_df["quality"], subgroups_df["quality"])
+        assert stored_df["x_column"].tolist() == subgroups_df["x_column"].tolist()
+        # Coverages and linkages are read from memory-mapped files
+        assert all(isinstance(x, np.memmap) for x in stored_df["covered"])
+        assert all(
+            np.array_equal(x, y)
+            for x, y in zip(stored_df["covered"], subgroups_df["covered"], strict=True)
+        )
+        assert np.array_equal(store.linkages[current_class], get_linkage(subgroups_df))
+
+
+def test_stale_store(store_path: tuple[Path, dict[str, DataFrame]]):
+    path, _ = store_path
+    manifest = json.loads((path / MANIFEST_FILE).read_text())
+    (path / MANIFEST_FILE).write_text(json.dumps({**manifest, "version": 0}))
+
+    with pytest.raises(ValueError, match="another version"):
+        read_store(path)
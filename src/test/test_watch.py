@@ -0,0 +1,23 @@
+# ruff: noqa: ANN201
+import time
+from pathlib import Path
+
+from src.watch import signatures, watch_files
+
+WATCH_INTERVAL = 0.01
+
+
+def test_watch_files(tmp_path: Path):
+    watched, other = tmp_path / "errors.csv", tmp_path / "data.csv"
+    watched.write_text("a\n1\n")
+    other.write_text("b\n1\n")
+    changes = watch_files(signatures([watched, other]), WATCH_INTERVAL)
+
+    watched.write_text("a\n1\n2\n")
+    # Missing files are only reported once they're back
+    other.unlink()
+
+    assert next(changes) == [watched]
+    time.sleep(WATCH_INTERVAL)
+    other.write_text("b\n2\n")
+    assert next(changes) == [other]
@@ -0,0 +1,40 @@
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+# A file is taken to have changed when its modification time or size did
+Signature = tuple[int, int] | None
+
+
+def file_signature(path: Path) -> Signature:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def signatures(paths: list[Path]) -> dict[Path, Signature]:
+    return {x: file_signature(x) for x in paths}
+
+
+# Polls the files forever, yielding those that changed since they were last seen. A
+# change is only yielded once the file stayed the same for a whole interval, so files
+# still being written, or replaced by several writes, aren't read halfway
+def watch_files(seen: dict[Path, Signature], interval: float) -> Iterator[list[Path]]:
+    seen = dict(seen)
+    previous = seen
+    while True:
+        time.sleep(interval)
+        current = signatures(list(seen))
+        changed = [
+            x
+            for x, signature in current.items()
+            if signature is not None
+            and signature == previous[x]
+            and signature != seen[x]
+        ]
+        previous = current
+        if changed:
+            seen.update({x: current[x] for x in changed})
+            yield changed
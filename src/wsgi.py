@@ -0,0 +1,50 @@
+import os
+from pathlib import Path
+
+from flask import Flask
+
+from src.app import create_dash_app
+from src.args import DEFAULT_FIGURE_CACHE_SIZE
+from src.layout.components.dendrogram import add_dendrogram
+from src.state import DiscoveryState
+from src.store import read_store
+
+# Store served when the factory isn't given one
+STORE_ENV = "HEISENPY_STORE"
+
+
+# App factory for WSGI servers. Every worker attaches to the same store, written once by
+# the store command, so no worker runs the discovery and the data isn't copied per worker:
+#     gunicorn --workers 4 'src.wsgi:create_server("path/to/store")'
+def create_server(
+    store: str | Path | None = None,
+    *,
+    figure_cache_size: int = DEFAULT_FIGURE_CACHE_SIZE,
+    clientside_threshold: bool = False,
+) -> Flask:
+    if store is None:
+        if STORE_ENV not in os.environ:
+            msg = f"Pass the path of a store, or set {STORE_ENV}"
+            raise ValueError(msg)
+        store = os.environ[STORE_ENV]
+
+    loaded = read_store(Path(store))
+    for current_class, linkage_matrix in loaded.linkages.items():
+        add_dendrogram(loaded.subgroups_by_class[current_class], linkage_matrix)
+
+    # Nothing is left to discover, so the dashboard shows the stored subgroups right away
+    state = DiscoveryState(
+        list(loaded.subgroups_by_class),
+        subgroups_by_class=loaded.subgroups_by_class,
+        version=1,
+        done=True,
+    )
+    app = create_dash_app(
+        loaded.dataset_df,
+        loaded.errors_by_model,
+        state,
+        loaded.target,
+        figure_cache_size,
+        clientside_threshold=clientside_threshold,
+    )
+    return app.server